@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据模型内存/实例化基准测试
+对比普通dataclass（带__dict__）与当前slots模型创建N条FitnessRecord的耗时和内存占用
+
+用法：python benchmarks/bench_model_memory.py [--records 100000] [--repeat 3]
+"""
+
+import argparse
+import dataclasses
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.model.exercise_model import FitnessRecord
+
+# 字段与默认值完全相同、但不带slots的对照类（即改动前的模型）
+LegacyFitnessRecord = dataclasses.make_dataclass(
+    "LegacyFitnessRecord",
+    [(f.name, f.type, f) for f in dataclasses.fields(FitnessRecord)]
+)
+
+
+def make_values(n: int) -> list:
+    """预先生成字段值，测量时只统计模型实例本身"""
+    base = datetime(2025, 1, 1)
+    return [
+        dict(id=i, user_id=i % 500 + 1, date=base + timedelta(minutes=i), exercise_type="跑步",
+             duration=30.0, distance=5.0, calories=300, notes=None)
+        for i in range(n)
+    ]
+
+
+def measure(cls, values: list, repeat: int) -> dict:
+    # 耗时：取多次中的最小值
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        records = [cls(**v) for v in values]
+        seconds.append(time.perf_counter() - t0)
+        del records
+
+    # 内存：创建实例前后的已分配内存差（列表本身两者相同，一并计入）
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [cls(**v) for v in values]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del records
+    return {"name": cls.__name__, "seconds": min(seconds), "bytes": used}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据模型内存/实例化基准测试")
+    parser.add_argument("--records", type=int, default=100000, help="记录条数")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数")
+    args = parser.parse_args()
+
+    values = make_values(args.records)
+    results = [measure(cls, values, args.repeat) for cls in (LegacyFitnessRecord, FitnessRecord)]
+
+    print(f"\n{args.records} 条 FitnessRecord")
+    print(f"{'模型':<22}{'创建耗时(ms)':>14}{'内存(MB)':>12}{'每条(字节)':>12}")
+    for r in results:
+        print(f"{r['name']:<22}{r['seconds'] * 1000:>14.1f}{r['bytes'] / 1024 / 1024:>12.2f}"
+              f"{r['bytes'] / args.records:>12.0f}")
+    legacy, slotted = results
+    print(f"内存减少 {1 - slotted['bytes'] / legacy['bytes']:.0%}，"
+          f"创建耗时变化 {slotted['seconds'] / legacy['seconds'] - 1:+.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询结果行映射基准测试
+对比原先的逐行映射（sqlite3.Row按列名取值 + 每行datetime.fromisoformat + 每行try/except）
+与row_mapper生成的按下标映射函数（普通元组 + 缓存日期解析），并校验两者输出完全相同
+
+用法：python benchmarks/bench_row_mapping.py [--rows 1000000] [--repeat 3]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from self_health_mis.data.model.exercise_model import FitnessRecord
+from self_health_mis.data.model.goal_model import FitnessGoal
+from self_health_mis.data.dal.row_mapper import (
+    get_row_mapper, map_rows, fetch_tuples, select_columns, parse_iso_datetime
+)
+
+EXERCISE_TYPES = ["跑步", "游泳", "篮球", "羽毛球", "骑行", "瑜伽", "力量训练", "跳绳"]
+GOAL_TYPES = ["每周跑步次数", "每周锻炼总时长(分钟)", "每月跑步距离", "力量训练次数"]
+
+
+def seed(conn: sqlite3.Connection, rows: int) -> None:
+    """写入测试数据：约八成记录为表单录入的当天零点，其余带具体时间"""
+    conn.executescript('''
+        CREATE TABLE fitness_records (
+            id INTEGER PRIMARY KEY, user_id INTEGER, date TEXT, exercise_type TEXT, duration REAL,
+            distance REAL, calories INTEGER, is_official BOOLEAN, notes TEXT,
+            is_checkin BOOLEAN, intensity REAL, recovery_quality REAL
+        );
+        CREATE TABLE fitness_goals (
+            id INTEGER PRIMARY KEY, user_id INTEGER, goal_type TEXT, target_value REAL, current_value REAL,
+            start_date TEXT, end_date TEXT, is_completed BOOLEAN
+        );
+    ''')
+    rng = random.Random(7)
+    base = datetime(2023, 1, 1)
+
+    def record_date():
+        day = base + timedelta(days=rng.randint(0, 3 * 365))
+        if rng.random() < 0.8:
+            return day
+        return day + timedelta(minutes=rng.randint(0, 24 * 60 - 1))
+
+    conn.executemany(
+        "INSERT INTO fitness_records VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((rng.randint(1, 500), record_date().isoformat(), rng.choice(EXERCISE_TYPES), float(rng.randint(10, 90)),
+          rng.choice([None, round(rng.uniform(0, 10), 2)]), rng.choice([None, rng.randint(50, 600)]),
+          rng.random() < 0.3, rng.choice([None, "备注"]), rng.random() < 0.5,
+          rng.choice([None, float(rng.randint(1, 10))]), None)
+         for _ in range(rows))
+    )
+    conn.executemany(
+        "INSERT INTO fitness_goals VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)",
+        ((rng.randint(1, 500), rng.choice(GOAL_TYPES), 10.0, float(rng.randint(0, 10)),
+          (base + timedelta(days=d)).isoformat(), (base + timedelta(days=d + 30)).isoformat(), rng.random() < 0.5)
+         for d in (rng.randint(0, 3 * 365) for _ in range(rows)))
+    )
+    conn.commit()
+
+
+# ========== 原先的实现（对照） ==========
+def legacy_records(conn: sqlite3.Connection) -> list:
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute("SELECT * FROM fitness_records").fetchall()
+    conn.row_factory = None
+    records = []
+    for row in rows:
+        try:
+            records.append(FitnessRecord(
+                id=row["id"],
+                user_id=row["user_id"],
+                date=datetime.fromisoformat(row["date"]),
+                exercise_type=row["exercise_type"],
+                duration=row["duration"],
+                distance=row["distance"],
+                calories=row["calories"],
+                is_official=bool(row["is_official"]),
+                notes=row["notes"],
+                is_checkin=bool(row["is_checkin"]),
+                intensity=row["intensity"],
+                recovery_quality=row["recovery_quality"]
+            ))
+        except Exception as parse_error:
+            print(f"❌ 解析锻炼记录时出错：{str(parse_error)}")
+            continue
+    return records
+
+
+def legacy_goals(conn: sqlite3.Connection) -> list:
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute("SELECT * FROM fitness_goals").fetchall()
+    conn.row_factory = None
+    goals = []
+    for row in rows:
+        try:
+            goals.append(FitnessGoal(
+                id=row["id"],
+                user_id=row["user_id"],
+                goal_type=row["goal_type"],
+                target_value=row["target_value"],
+                current_value=row["current_value"],
+                start_date=datetime.fromisoformat(row["start_date"]),
+                end_date=datetime.fromisoformat(row["end_date"]),
+                is_completed=bool(row["is_completed"])
+            ))
+        except Exception as parse_error:
+            print(f"❌ 解析锻炼目标时出错：{str(parse_error)}")
+            continue
+    return goals
+
+
+# ========== 当前实现 ==========
+def mapped_records(conn: sqlite3.Connection) -> list:
+    rows = fetch_tuples(conn, f"SELECT {select_columns(FitnessRecord)} FROM fitness_records")
+    return map_rows(get_row_mapper(FitnessRecord), rows, "锻炼记录")
+
+
+def mapped_goals(conn: sqlite3.Connection) -> list:
+    rows = fetch_tuples(conn, f"SELECT {select_columns(FitnessGoal)} FROM fitness_goals")
+    return map_rows(get_row_mapper(FitnessGoal), rows, "锻炼目标")
+
+
+def timed(func, conn, repeat: int):
+    """返回(最小耗时, 最后一次的结果)；每次都从空的日期缓存开始"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        result = None
+        parse_iso_datetime.cache_clear()
+        gc.collect()
+        t0 = time.perf_counter()
+        result = func(conn)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询结果行映射基准测试")
+    parser.add_argument("--rows", type=int, default=1000000, help="记录/目标各自的行数")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(":memory:")
+    seed(conn, args.rows)
+
+    print(f"\n{args.rows} 行，取{args.repeat}次中的最小耗时（含读取与转换）")
+    print(f"{'表':<16}{'原实现(s)':>12}{'映射函数(s)':>14}{'加速':>8}{'输出一致':>10}")
+    for table, legacy, mapped in (("fitness_records", legacy_records, mapped_records),
+                                  ("fitness_goals", legacy_goals, mapped_goals)):
+        legacy_seconds, expected = timed(legacy, conn, args.repeat)
+        mapped_seconds, actual = timed(mapped, conn, args.repeat)
+        identical = expected == actual
+        del expected, actual
+        print(f"{table:<16}{legacy_seconds:>12.2f}{mapped_seconds:>14.2f}"
+              f"{legacy_seconds / mapped_seconds:>7.2f}x{'是' if identical else '否':>10}")
+        if not identical:
+            raise SystemExit("❌ 两种实现输出不一致")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
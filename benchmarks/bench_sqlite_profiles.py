@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite调优配置基准测试
+多个读线程 + 一个持续写入的线程，对比各配置下的读延迟
+
+用法：python benchmarks/bench_sqlite_profiles.py [--readers 8] [--seconds 5] [--rows 20000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from self_health_mis.config.settings import SQLITE_PROFILES
+from self_health_mis.data.sqlite_conn import SQLiteDatabase
+from self_health_mis.data.dal.base_dal import to_ts
+
+EXERCISE_TYPES = ["跑步", "游泳", "篮球", "羽毛球", "骑行", "瑜伽", "力量训练", "跳绳"]
+# 与get_fitness_records相同的查询形状：按整数时间戳过滤和排序
+READ_QUERY = """
+    SELECT * FROM fitness_records
+    WHERE user_id = ? AND ts >= ? AND ts <= ?
+    ORDER BY ts DESC, id DESC
+"""
+
+
+def seed(db: SQLiteDatabase, rows: int, users: int) -> None:
+    """写入测试数据"""
+    base = datetime(2024, 1, 1)
+    data = [
+        (
+            random.randint(1, users),
+            (base + timedelta(minutes=random.randint(0, 60 * 24 * 365))).isoformat(),
+            random.choice(EXERCISE_TYPES),
+            float(random.randint(10, 90)),
+            round(random.uniform(0, 10), 2),
+            random.randint(50, 600),
+        )
+        for _ in range(rows)
+    ]
+    with db._connect() as conn:
+        conn.executemany('''
+            INSERT INTO fitness_records (user_id, date, exercise_type, duration, distance, calories)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', data)
+
+
+def run_profile(profile: str, readers: int, seconds: float, rows: int, users: int) -> dict:
+    """在指定配置下运行读写混合负载，返回读延迟统计"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = SQLiteDatabase(db_name=os.path.join(tmp_dir, "bench.db"),
+                            pool_size=readers + 1, profile=profile)
+        seed(db, rows, users)
+
+        stop = threading.Event()
+        latencies = []
+        latencies_lock = threading.Lock()
+        writes = [0]
+
+        def reader():
+            local = []
+            while not stop.is_set():
+                user_id = random.randint(1, users)
+                start = datetime(2024, random.randint(1, 12), 1)
+                end = start + timedelta(days=30)
+                t0 = time.perf_counter()
+                with db._connect() as conn:
+                    conn.execute(READ_QUERY, (user_id, to_ts(start), to_ts(end))).fetchall()
+                local.append(time.perf_counter() - t0)
+            with latencies_lock:
+                latencies.extend(local)
+
+        def writer():
+            while not stop.is_set():
+                with db._connect() as conn:
+                    conn.execute('''
+                        INSERT INTO fitness_records (user_id, date, exercise_type, duration)
+                        VALUES (?, ?, ?, ?)
+                    ''', (random.randint(1, users), datetime.now().isoformat(),
+                          random.choice(EXERCISE_TYPES), 30.0))
+                writes[0] += 1
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        db.close()
+
+    latencies.sort()
+    return {
+        "profile": profile,
+        "reads": len(latencies),
+        "writes": writes[0],
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite调优配置读延迟基准测试")
+    parser.add_argument("--readers", type=int, default=8, help="并发读线程数")
+    parser.add_argument("--seconds", type=float, default=5.0, help="每个配置的运行秒数")
+    parser.add_argument("--rows", type=int, default=20000, help="预置记录条数")
+    parser.add_argument("--users", type=int, default=200, help="用户数")
+    args = parser.parse_args()
+
+    results = [run_profile(name, args.readers, args.seconds, args.rows, args.users)
+               for name in SQLITE_PROFILES]
+
+    print(f"\n{args.readers}个读线程 + 1个写线程，每个配置运行{args.seconds}秒")
+    print(f"{'配置':<12}{'读次数':>8}{'写次数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    for r in results:
+        print(f"{r['profile']:<12}{r['reads']:>8}{r['writes']:>8}{r['p50_ms']:>10.2f}"
+              f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
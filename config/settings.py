@@ -0,0 +1,36 @@
+# config/settings.py
+import os
+
+# ========== SQLite 连接调优配置 ==========
+# 每个新建的数据库连接都会按所选配置依次执行 PRAGMA
+# safe：WAL + 完整同步，断电也不丢已提交事务，适合单机开发/演示
+# throughput：WAL + NORMAL同步 + mmap + 大页缓存，适合多会话并发的线上部署
+SQLITE_PROFILES = {
+    "safe": {
+        "busy_timeout": 5000,  # 毫秒，写锁冲突时等待而不是立即报错
+        "journal_mode": "WAL",  # 读写互不阻塞
+        "synchronous": "FULL",
+        "temp_store": "DEFAULT",
+        "cache_size": -8000,  # 负数表示KB，约8MB
+        "mmap_size": 0,
+    },
+    "throughput": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # WAL下只在checkpoint时fsync
+        "temp_store": "MEMORY",
+        "cache_size": -64000,  # 约64MB
+        "mmap_size": 268435456,  # 256MB
+    },
+}
+
+# 通过环境变量切换配置，默认使用高吞吐配置
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "throughput")
+
+# 连接池配置
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "10"))
+
+# 登录预取配置：登录成功后并发读取首页数据的线程数（不宜超过连接池大小），以及最多等待的秒数
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+PREFETCH_TIMEOUT = float(os.getenv("PREFETCH_TIMEOUT", "2"))
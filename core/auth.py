@@ -1,6 +1,8 @@
 # core/auth.py
 from typing import Optional, Tuple, Dict, Any
-from data.dal.user_dal import register_user, login_user
+from self_health_mis.data.dal.user_dal import register_user, login_user, get_user_profile as _get_user_profile
+from self_health_mis.data.model.user_model import UserProfile
+from self_health_mis.core.read_cache import cached_per_user
 
 
 def validate_user_credentials(username: str, password: str) -> Dict[str, Any]:
@@ -89,4 +91,18 @@ def user_login(username: str, password: str) -> Dict[str, Any]:
             return {"status": False, "user_id": None, "message": "用户名或密码错误"}
         return {"status": True, "user_id": user_id, "message": "登录成功"}
     except Exception as e:
-        return {"status": False, "user_id": None, "message": f"登录过程中发生错误: {str(e)}"}
\ No newline at end of file
+        return {"status": False, "user_id": None, "message": f"登录过程中发生错误: {str(e)}"}
+
+# 获取用户资料（按用户缓存，资料更新后自动失效）
+@cached_per_user("user_profile")
+def get_user_profile(user_id: int) -> Optional[UserProfile]:
+    """
+    获取用户个人资料
+    
+    Args:
+        user_id: 用户ID
+        
+    Returns:
+        UserProfile: 用户资料，不存在或出错时返回None
+    """
+    return _get_user_profile(user_id)
@@ -0,0 +1,95 @@
+# core/data_context.py
+"""
+一次脚本运行（Streamlit rerun）内的数据上下文
+同一次运行中，资料/记录/目标/汇总等数据集各最多读取一次，各标签页、组件共用同一份结果；
+跨rerun、跨页面、跨会话的共享由按用户读缓存（core/read_cache.py）负责，写入后按用户失效。
+"""
+import copy
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import pandas as pd
+
+from self_health_mis.core.auth import get_user_profile
+from self_health_mis.core.exercise_service import (
+    get_user_exercise_records, get_user_fitness_goals, get_user_daily_stats, get_user_stats_totals
+)
+from self_health_mis.core.read_cache import read_cache
+from self_health_mis.data.sqlite_conn import query_counter
+
+# 首页按天汇总覆盖的天数（含今天）
+DASHBOARD_DAYS = 30
+
+
+def dashboard_requests(days: int = DASHBOARD_DAYS) -> List[Tuple[str, Callable[..., Any], tuple]]:
+    """
+    首页首屏读取的数据集：(名称, 读取函数, 除user_id外的参数)
+    登录预取与RerunDataContext使用相同的函数和参数形式，预取结果与首页读取命中同一读缓存项
+    """
+    end = date.today()
+    return [
+        ("profile", get_user_profile, ()),
+        ("goals", get_user_fitness_goals, (False,)),
+        ("stats_totals", get_user_stats_totals, (None, None)),
+        ("daily_stats", get_user_daily_stats, (end - timedelta(days=days - 1), end)),
+    ]
+
+
+class RerunDataContext:
+    """
+    每次rerun开始时新建；创建时把当前线程的SQL计数清零，query_count()即为本次rerun发出的查询数
+    本次运行中该用户的数据有写入时（读缓存的失效版本变化），已读取的数据集自动作废
+    """
+
+    def __init__(self, user_id: Optional[int]):
+        self.user_id = user_id
+        self._datasets: Dict[Hashable, Any] = {}
+        self._cache_version = read_cache.version(user_id)
+        self.loads = 0
+        self.reused = 0
+        query_counter.reset()
+
+    def _get(self, name: str, loader: Callable[..., Any], *args) -> Any:
+        version = read_cache.version(self.user_id)
+        if version != self._cache_version:
+            self.invalidate()
+            self._cache_version = version
+        key = (name,) + args
+        if key in self._datasets:
+            self.reused += 1
+        else:
+            self._datasets[key] = loader(self.user_id, *args)
+            self.loads += 1
+        # 与读缓存一致返回浅拷贝，某个组件修改列表/DataFrame不影响其他组件
+        return copy.copy(self._datasets[key])
+
+    def profile(self):
+        """用户资料（UserProfile或None）"""
+        return self._get("profile", get_user_profile)
+
+    def records(self) -> List[Any]:
+        """全部锻炼记录"""
+        return self._get("records", get_user_exercise_records)
+
+    def goals(self, include_completed: bool = False) -> List[Any]:
+        """锻炼目标，默认只含未完成的目标"""
+        return self._get("goals", get_user_fitness_goals, include_completed)
+
+    def daily_stats(self, start_date: date, end_date: date) -> pd.DataFrame:
+        """[start_date, end_date]内的按天汇总（没有记录的日期补0）"""
+        return self._get("daily_stats", get_user_daily_stats, start_date, end_date)
+
+    def stats_totals(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, float]:
+        """日期区间内的合计，区间为None时统计全部记录"""
+        return self._get("stats_totals", get_user_stats_totals, start_date, end_date)
+
+    def invalidate(self) -> None:
+        """丢弃本次运行中已读取的数据集（写入后调用；DAL写入也会自动触发）"""
+        self._datasets.clear()
+
+    def query_count(self) -> int:
+        """本次rerun到目前为止执行的SQL语句数"""
+        return query_counter.count()
+
+    def summary(self) -> Dict[str, int]:
+        return {"queries": self.query_count(), "loads": self.loads, "reused": self.reused}
@@ -2,15 +2,17 @@
 from typing import List, Optional, Dict, Any, Union, TypedDict, Final
 from datetime import datetime
 import pandas as pd
-from data.dal.exercise_dal import (
-    add_fitness_record, get_fitness_records, add_fitness_goal,
-    get_fitness_goals, get_exercise_stats, auto_update_goal_progress,
+from self_health_mis.data.dal.exercise_dal import (
+    add_fitness_record, add_fitness_records_bulk, get_fitness_records, add_fitness_goal,
+    get_fitness_goals, get_exercise_stats, STATS_PERIODS, GRANULARITIES,
     update_goal_progress, update_goal_target
 )
 from self_health_mis.data.model.exercise_model import FitnessRecord
 from self_health_mis.data.model.goal_model import FitnessGoal
 
+from self_health_mis.data.dal.stats_dal import get_daily_stats, get_stats_totals
 from self_health_mis.data.sqlite_conn import db_instance
+from self_health_mis.core.read_cache import cached_per_user
 
 class ExerciseServiceError(Exception):
     """
@@ -38,6 +40,7 @@ class ExerciseRecordData(TypedDict, total=False):
     """
     锻炼记录数据的类型定义
     """
+    user_id: int  # 用户ID，仅批量添加时必填
     date: datetime  # 锻炼日期，必填
     exercise_type: str  # 锻炼类型，必填
     duration: Union[int, float]  # 锻炼时长(分钟)，必填
@@ -200,6 +203,33 @@ def validate_goal_data(goal_data: Union[Dict[str, Any], FitnessGoalData]) -> Non
         raise ValidationError(f"目标有效期不能超过{max_goal_duration_days}天")
 
 
+def build_fitness_record(user_id: int, record_data: Union[Dict[str, Any], ExerciseRecordData]) -> FitnessRecord:
+    """
+    将已通过校验的锻炼记录数据封装为FitnessRecord对象
+    """
+    # 确保is_official和notes的默认值正确处理
+    is_official = record_data.get("is_official", False)
+    if not isinstance(is_official, bool):
+        is_official = False
+        
+    notes = record_data.get("notes", "")
+    if notes is not None:
+        notes = str(notes).strip()
+    else:
+        notes = ""
+    
+    return FitnessRecord(
+        user_id=user_id,
+        date=record_data["date"],
+        exercise_type=str(record_data["exercise_type"]).strip(),
+        duration=float(record_data["duration"]),
+        distance=float(record_data["distance"]) if record_data.get("distance") is not None else None,
+        calories=int(record_data["calories"]) if record_data.get("calories") is not None else None,
+        is_official=is_official,
+        notes=notes
+    )
+
+
 def add_user_exercise_record(user_id: int, record_data: Union[Dict[str, Any], ExerciseRecordData]) -> Optional[int]:
     """
     添加用户锻炼记录，包含完整的业务规则校验
@@ -225,40 +255,61 @@ def add_user_exercise_record(user_id: int, record_data: Union[Dict[str, Any], Ex
     validate_user_id(user_id)
     validate_exercise_data(record_data)
 
-    # 确保is_official和notes的默认值正确处理
-    is_official = record_data.get("is_official", False)
-    if not isinstance(is_official, bool):
-        is_official = False
-        
-    notes = record_data.get("notes", "")
-    if notes is not None:
-        notes = str(notes).strip()
-    else:
-        notes = ""
-    
     # 封装为FitnessRecord对象
-    record = FitnessRecord(
-        user_id=user_id,
-        date=record_data["date"],
-        exercise_type=str(record_data["exercise_type"]).strip(),
-        duration=float(record_data["duration"]),
-        distance=float(record_data["distance"]) if record_data.get("distance") is not None else None,
-        calories=int(record_data["calories"]) if record_data.get("calories") is not None else None,
-        is_official=is_official,
-        notes=notes
-    )
+    record = build_fitness_record(user_id, record_data)
 
     try:
-        # 调用DAL添加记录
-        record_id = add_fitness_record(record)
-        if record_id > 0:
-            # 添加成功后自动更新目标进度
-            auto_update_goal_progress(user_id)
-        return record_id
+        # 调用DAL添加记录（目标进度已在同一事务内原子更新，无需再全量重算）
+        return add_fitness_record(record)
     except Exception as e:
         # 捕获数据库操作相关错误
         raise DatabaseError(f"添加锻炼记录失败: {str(e)}") from e
 
+def add_exercise_records_bulk(records_data: List[Union[Dict[str, Any], ExerciseRecordData]]) -> List[Dict[str, Any]]:
+    """
+    批量添加锻炼记录（如导入整个班级一学期的记录）
+    逐条做业务规则校验，合法记录在一个事务中批量写入，每个用户的目标进度只重算一次
+    
+    参数:
+        records_data: List[dict] - 锻炼记录数据列表，每条除add_user_exercise_record所需字段外，
+            还必须包含 user_id: int
+    
+    返回:
+        List[Dict[str, Any]] - 与输入一一对应的结果，{"id": 记录ID或None, "error": 错误信息或None}
+    
+    异常:
+        DatabaseError - 当批量写入发生未预期的错误时抛出
+    """
+    results: List[Dict[str, Any]] = [{"id": None, "error": None} for _ in records_data]
+    records = []
+    positions = []
+    for i, record_data in enumerate(records_data):
+        try:
+            if not isinstance(record_data, dict):
+                raise ValidationError("锻炼记录数据必须是字典类型")
+            user_id = record_data.get("user_id")
+            validate_user_id(user_id)
+            validate_exercise_data(record_data)
+            records.append(build_fitness_record(user_id, record_data))
+            positions.append(i)
+        except ValidationError as e:
+            results[i]["error"] = str(e)
+        except Exception as e:
+            results[i]["error"] = f"数据格式错误: {str(e)}"
+
+    if not records:
+        return results
+
+    try:
+        dal_results = add_fitness_records_bulk(records)
+    except Exception as e:
+        raise DatabaseError(f"批量添加锻炼记录失败: {str(e)}") from e
+
+    for i, dal_result in zip(positions, dal_results):
+        results[i] = dal_result
+    return results
+
+@cached_per_user("exercise_records")
 def get_user_exercise_records(
     user_id: int,
     start_date: Optional[datetime] = None,
@@ -323,6 +374,7 @@ def add_user_fitness_goal(user_id: int, goal_data: Union[Dict[str, Any], Fitness
         # 捕获数据库操作相关错误
         raise DatabaseError(f"添加锻炼目标失败: {str(e)}") from e
 
+@cached_per_user("fitness_goals")
 def get_user_fitness_goals(user_id: int, include_completed: bool = True) -> List[Dict[str, Any]]:
     """
     获取用户锻炼目标，封装DAL层调用，简化使用
@@ -342,16 +394,18 @@ def get_user_fitness_goals(user_id: int, include_completed: bool = True) -> List
     except Exception as e:
         raise DatabaseError(f"查询锻炼目标失败: {str(e)}") from e
 
-def get_user_exercise_stats(user_id: int, period: str = "month") -> Dict[str, Any]:
+@cached_per_user("exercise_stats")
+def get_user_exercise_stats(user_id: int, period: str = "month", granularity: Optional[str] = None) -> Dict[str, Any]:
     """
     获取用户锻炼统计数据，封装DAL层调用，简化使用
     
     参数:
         user_id: int - 用户ID，必须为正整数
         period: str - 统计周期，可以是'day'、'week'、'month'或'year'，默认为'month'
+        granularity: Optional[str] - 分桶粒度，可以是'day'、'week'、'isoweek'、'month'或'year'，默认随周期而定
     
     返回:
-        Dict[str, Any] - 锻炼统计数据字典，若参数无效或查询失败返回空字典
+        Dict[str, Any] - 锻炼统计数据字典：period、granularity及buckets（每个分桶×锻炼类型一项）
     """
     validate_user_id(user_id)
     
@@ -359,17 +413,20 @@ def get_user_exercise_stats(user_id: int, period: str = "month") -> Dict[str, An
     valid_periods = {'day', 'week', 'month', 'year'}
     if not isinstance(period, str) or period.lower() not in valid_periods:
         raise ValidationError(f"无效的统计周期: {period}，必须是{valid_periods}之一")
+    period = period.lower()
+    if granularity is not None and granularity not in GRANULARITIES:
+        raise ValidationError(f"无效的统计粒度: {granularity}，必须是{set(GRANULARITIES)}之一")
     
     try:
-        # 调用数据访问层获取统计数据
-        stats = get_exercise_stats(user_id, period.lower())
-        # 确保返回的是字典类型
-        if hasattr(stats, 'to_dict'):
-            return stats.to_dict()
-        elif isinstance(stats, dict):
-            return stats
-        else:
-            return {}
+        # 调用数据访问层获取分桶统计
+        stats = get_exercise_stats(user_id, period, granularity)
+        buckets = stats.assign(bucket=stats["bucket"].dt.strftime("%Y-%m-%d")).to_dict("records") \
+            if not stats.empty else []
+        return {
+            "period": period,
+            "granularity": granularity or STATS_PERIODS[period][1],
+            "buckets": buckets,
+        }
     except ExerciseServiceError:
         # 直接传递服务层异常
         raise
@@ -378,6 +435,19 @@ def get_user_exercise_stats(user_id: int, period: str = "month") -> Dict[str, An
 
 
 
+@cached_per_user("fitness_metrics")
 def get_user_fitness_metrics(user_id: int):
     """业务层封装：获取用户健身核心指标"""
-    return db_instance.calculate_core_metrics(user_id)
\ No newline at end of file
+    return db_instance.calculate_core_metrics(user_id)
+
+
+@cached_per_user("daily_stats")
+def get_user_daily_stats(user_id: int, start_date, end_date, fill_missing: bool = True) -> pd.DataFrame:
+    """业务层封装：获取用户按天汇总（见stats_dal.get_daily_stats）"""
+    return get_daily_stats(user_id, start_date, end_date, fill_missing)
+
+
+@cached_per_user("stats_totals")
+def get_user_stats_totals(user_id: int, start_date=None, end_date=None) -> Dict[str, float]:
+    """业务层封装：获取用户日期区间内的合计（见stats_dal.get_stats_totals）"""
+    return get_stats_totals(user_id, start_date, end_date)
\ No newline at end of file
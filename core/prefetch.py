@@ -0,0 +1,52 @@
+# core/prefetch.py
+"""
+登录预取：登录成功后把首页首屏需要的几个互不依赖的读取并发提交到一个小线程池，
+每个读取各自从连接池借出连接；结果写入按用户读缓存，首页渲染时直接命中。
+首屏等待时间从各查询耗时之和变为最慢的一个；超过超时时间不再等待，
+未完成的读取在后台继续执行并写入缓存（首页同时发起的相同读取由single-flight合并到它上面）。
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+
+from self_health_mis.config.settings import PREFETCH_WORKERS, PREFETCH_TIMEOUT
+from self_health_mis.core.data_context import dashboard_requests
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+
+def prefetch_user_data(user_id: int, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    并发预取用户首页数据并预热缓存
+
+    Args:
+        user_id: 用户ID
+        timeout: 最多等待的秒数，默认取配置PREFETCH_TIMEOUT
+
+    Returns:
+        Dict: loaded（已完成的数据集名称）、failed（出错的数据集 → 错误信息）、
+              pending（超时仍在后台执行的数据集名称）、seconds（本次等待的秒数）
+    """
+    timeout = PREFETCH_TIMEOUT if timeout is None else timeout
+    started = time.perf_counter()
+    futures = {
+        _executor.submit(loader, user_id, *args): name
+        for name, loader, args in dashboard_requests()
+    }
+    done, not_done = wait(futures, timeout=timeout)
+
+    report: Dict[str, Any] = {"loaded": [], "failed": {}, "pending": sorted(futures[f] for f in not_done)}
+    for future in done:
+        name = futures[future]
+        error = future.exception()
+        if error is None:
+            report["loaded"].append(name)
+        else:
+            report["failed"][name] = str(error)
+            print(f"❌ 预取{name}失败：{str(error)}")
+    report["loaded"].sort()
+    report["seconds"] = time.perf_counter() - started
+    if report["pending"]:
+        print(f"⚠️ 预取超时（{timeout} 秒），后台继续：{', '.join(report['pending'])}")
+    print(f"✅ 用户{user_id}首页数据预取完成：{len(report['loaded'])} 项，用时 {report['seconds']:.3f} 秒")
+    return report
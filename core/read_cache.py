@@ -0,0 +1,224 @@
+# core/read_cache.py
+"""
+按用户划分的读缓存（read-through，LRU + TTL）
+Streamlit每次交互都会重新执行整个脚本，资料/记录/目标/统计等读取结果在此缓存；
+DAL中任何写函数完成后会通知涉及的用户（data/dal/write_events.py），只失效这些用户的缓存项；
+其他进程的写入由用户数据版本（data/dal/data_version.py）发现，读取时比对版本，不一致则丢弃该用户的缓存项。
+"""
+import copy
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+import pandas as pd
+
+from self_health_mis.data.dal.write_events import add_write_listener
+from self_health_mis.data.dal.data_version import version_tracker
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL_SECONDS = 300.0
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """估算缓存值占用的字节数（DataFrame按pandas统计，容器与模型对象逐项累加）"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    elif is_dataclass(value) and not isinstance(value, type):
+        size += sum(estimate_size(getattr(value, f.name), _depth + 1) for f in fields(value))
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value: Any, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class UserReadCache:
+    """
+    键为(user_id, 查询名, 参数)；超过max_entries时淘汰最久未使用的项，超过ttl_seconds的项视为过期
+    version_source返回用户当前的数据版本（None表示无法校验），缓存项加载时记下版本，读取时版本变化即失效
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic,
+                 version_source: Optional[Callable[[int], Optional[int]]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._version_source = version_source
+        # 用户 → 其缓存项加载时的数据版本
+        self._data_versions: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._by_user: Dict[int, Set[Tuple]] = {}
+        self._bytes = 0
+        # 失效版本：加载期间发生写入时，加载结果不再写入缓存
+        self._global_version = 0
+        self._user_versions: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    def _remove(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+                self._data_versions.pop(key[0], None)
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self._clock():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry.value
+
+    def put(self, key: Tuple, value: Any) -> None:
+        entry = _Entry(value, self._clock() + self.ttl_seconds, estimate_size(value))
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._by_user.setdefault(key[0], set()).add(key)
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _version(self, user_id: int) -> Tuple[int, int]:
+        return self._global_version, self._user_versions.get(user_id, 0)
+
+    def version(self, user_id: int) -> Tuple[int, int]:
+        """用户缓存的失效版本，该用户（或全部用户）的缓存每被失效一次就会变化"""
+        with self._lock:
+            return self._version(user_id)
+
+    def get_or_load(self, user_id: int, query: str, args: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        读取缓存，未命中时调用loader并写入缓存；返回值是缓存值的浅拷贝，调用方修改列表/DataFrame不会影响缓存
+        """
+        key = (user_id, query, args)
+        # 版本在加载之前读取：加载期间的写入只会让缓存项提前失效，不会让过时结果通过校验
+        data_version = self._version_source(user_id) if self._version_source is not None else None
+        with self._lock:
+            cached_version = self._data_versions.get(user_id)
+            if data_version is not None and cached_version is not None and cached_version != data_version:
+                # 其他进程修改过该用户的数据
+                self.stale += 1
+                self._invalidate_user(user_id)
+            found, value = self.get(key)
+            version = self._version(user_id)
+        if not found:
+            value = loader()
+            with self._lock:
+                # 加载期间该用户有写入时，结果可能已过时，只返回不缓存
+                if self._version(user_id) == version:
+                    self.put(key, value)
+                    if data_version is not None:
+                        self._data_versions[user_id] = data_version
+        return copy.copy(value)
+
+    def _invalidate_user(self, user_id: int) -> None:
+        self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+        for key in list(self._by_user.get(user_id, ())):
+            self._remove(key)
+        self._data_versions.pop(user_id, None)
+
+    def invalidate_users(self, user_ids: Optional[frozenset]) -> None:
+        """失效指定用户的全部缓存项，user_ids为None时清空全部"""
+        with self._lock:
+            self.invalidations += 1
+            if user_ids is None:
+                self._global_version += 1
+                self._entries.clear()
+                self._by_user.clear()
+                self._data_versions.clear()
+                self._bytes = 0
+                return
+            for user_id in user_ids:
+                self._invalidate_user(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._data_versions.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = self.invalidations = self.stale = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率与内存占用"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "users": len(self._by_user),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale": self.stale,
+                "memory_bytes": self._bytes,
+            }
+
+
+# 全局实例：本进程的DAL写入后按用户失效，其他进程的写入通过数据版本发现
+read_cache = UserReadCache(version_source=version_tracker.get)
+add_write_listener(read_cache.invalidate_users)
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def cached_per_user(query: str) -> Callable:
+    """
+    读函数装饰器：第一个参数为user_id，其余参数一起作为缓存键
+    user_id无效或参数不可哈希时直接调用，不缓存；函数抛出异常时不缓存
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(user_id, *args, **kwargs):
+            if not isinstance(user_id, int) or user_id <= 0:
+                return fn(user_id, *args, **kwargs)
+            key_args = (_freeze(args), tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())))
+            try:
+                hash(key_args)
+            except TypeError:
+                return fn(user_id, *args, **kwargs)
+            return read_cache.get_or_load(user_id, query, key_args, lambda: fn(user_id, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
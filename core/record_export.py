@@ -0,0 +1,245 @@
+# core/record_export.py
+"""
+锻炼记录流式导出（单个用户或整个班级/年级）
+按固定大小分块遍历数据库游标，逐块写出CSV / JSONL / Parquet（列式），内存占用与表大小无关。
+
+用法：
+    python -m core.record_export out.csv --users 1,2,3 --start 2025-03-01 --end 2025-06-30
+    python -m core.record_export out.parquet --columns user_id,date,duration --official
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import IO, Iterable, Iterator, List, Optional
+
+from self_health_mis.data.dal.exercise_dal import EXPORT_COLUMNS, iter_fitness_record_chunks
+from self_health_mis.data.dal.record_batch import COLUMN_SPECS
+
+DEFAULT_CHUNK_SIZE = 5000
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+MIME_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+# 数据库中以0/1存储的布尔列，导出JSONL时还原为true/false
+BOOL_COLUMNS = {"is_official", "is_checkin"}
+
+
+def _guess_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return {"ndjson": "jsonl", "pq": "parquet"}.get(ext, ext or "csv")
+
+
+# ========== 各格式写出器：逐块写入二进制流，返回写出的行数 ==========
+def _write_csv(columns: List[str], chunks: Iterable[List[tuple]], out: IO[bytes], header: bool = True) -> int:
+    # 带BOM的utf-8，Excel打开中文不乱码；续写时不再输出BOM和表头
+    text = io.TextIOWrapper(out, encoding="utf-8-sig" if header else "utf-8", newline="", write_through=True)
+    total = 0
+    try:
+        writer = csv.writer(text)
+        if header:
+            writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            total += len(rows)
+    finally:
+        # 与调用方共享底层流，不能随包装器一起关闭
+        text.detach()
+    return total
+
+
+def _write_jsonl(columns: List[str], chunks: Iterable[List[tuple]], out: IO[bytes], header: bool = True) -> int:
+    bool_indexes = [i for i, c in enumerate(columns) if c in BOOL_COLUMNS]
+    total = 0
+    for rows in chunks:
+        lines = []
+        for row in rows:
+            item = dict(zip(columns, row))
+            for i in bool_indexes:
+                if row[i] is not None:
+                    item[columns[i]] = bool(row[i])
+            lines.append(json.dumps(item, ensure_ascii=False))
+        if lines:
+            out.write(("\n".join(lines) + "\n").encode("utf-8"))
+        total += len(rows)
+    return total
+
+
+def _arrow_schema(pa, columns: List[str]):
+    """导出列的Arrow表结构，列类型与record_batch.COLUMN_SPECS一致（不依赖数据推断，整列为空也有确定类型）"""
+    types = {"int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_(),
+             "category": pa.string(), "object": pa.string()}
+    # date导出的是数据库中的日期文本（record_batch读取的是整数时间戳ts），保持为字符串
+    return pa.schema([(c, pa.string() if c == "date" else types[COLUMN_SPECS[c][1]]) for c in columns])
+
+
+def _write_parquet(columns: List[str], chunks: Iterable[List[tuple]], out: IO[bytes], header: bool = True) -> int:
+    # pyarrow为可选依赖，仅导出列式格式时需要
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("导出parquet需要安装pyarrow：pip install pyarrow") from None
+
+    schema = _arrow_schema(pa, columns)
+    bool_indexes = [i for i, c in enumerate(columns) if c in BOOL_COLUMNS]
+    total = 0
+    # 没有数据时也输出只含表结构的空文件
+    writer = pq.ParquetWriter(out, schema)
+    try:
+        for rows in chunks:
+            # 每块按列转置后写成一个row group
+            data = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+            for i in bool_indexes:
+                data[i] = [None if value is None else bool(value) for value in data[i]]
+            writer.write_table(pa.table(dict(zip(columns, data)), schema=schema))
+            total += len(rows)
+    finally:
+        writer.close()
+    return total
+
+
+WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+def _check_format(fmt: str) -> None:
+    if fmt not in WRITERS:
+        raise ValueError(f"不支持的导出格式: {fmt}（可选：{', '.join(EXPORT_FORMATS)}）")
+
+
+def export_records(
+    out: IO[bytes],
+    fmt: str = "csv",
+    columns: Optional[List[str]] = None,
+    user_ids: Optional[List[int]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    is_official: Optional[bool] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    将锻炼记录流式写入二进制流（文件、BytesIO、临时文件等）
+
+    :param out: 以二进制方式打开的输出流
+    :param fmt: csv / jsonl / parquet
+    :param columns: 导出列（投影），默认全部可导出列
+    :param user_ids: 用户ID集合，默认全部用户
+    :param start_date / end_date / is_official: 过滤条件
+    :param chunk_size: 每块读取/写出的行数
+    :return: 导出的行数
+    """
+    _check_format(fmt)
+    columns = list(columns or EXPORT_COLUMNS)
+    chunks = iter_fitness_record_chunks(columns, user_ids, start_date, end_date, is_official, chunk_size)
+    return WRITERS[fmt](columns, chunks, out)
+
+
+def export_records_to_file(path: str, fmt: Optional[str] = None, **filters) -> int:
+    """
+    导出到文件：先写临时文件，成功后再替换，失败时不会留下半截文件
+    """
+    fmt = fmt or _guess_format(path)
+    _check_format(fmt)
+    tmp_path = path + ".part"
+    started = time.perf_counter()
+    try:
+        with open(tmp_path, "wb") as f:
+            total = export_records(f, fmt, **filters)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    seconds = time.perf_counter() - started
+    print(f"✅ 导出完成：{total} 行 → {path}，用时 {seconds:.2f} 秒"
+          f"（{total / seconds if seconds > 0 else 0:.0f} 行/秒）")
+    return total
+
+
+def iter_export_bytes(
+    fmt: str = "csv",
+    columns: Optional[List[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **filters
+) -> Iterator[bytes]:
+    """
+    以字节块的形式产出导出内容（每个数据块对应一段字节），便于边生成边发送或写入临时文件
+
+    parquet的元数据位于文件尾部，只能整体写完后一次产出
+    """
+    _check_format(fmt)
+    columns = list(columns or EXPORT_COLUMNS)
+    buffer = io.BytesIO()
+    if fmt == "parquet":
+        export_records(buffer, fmt, columns, chunk_size=chunk_size, **filters)
+        yield buffer.getvalue()
+        return
+
+    write = WRITERS[fmt]
+    if fmt == "csv":
+        # 表头单独作为第一段输出，保证空结果也有表头
+        write(columns, [], buffer)
+        yield buffer.getvalue()
+    for rows in iter_fitness_record_chunks(columns, chunk_size=chunk_size, **filters):
+        buffer.seek(0)
+        buffer.truncate()
+        write(columns, [rows], buffer, header=False)
+        yield buffer.getvalue()
+
+
+def export_to_spooled_file(fmt: str = "csv", max_memory: int = 8 * 1024 * 1024, **kwargs):
+    """
+    导出到临时文件（小于max_memory时留在内存，超过后自动落盘），返回已回到开头的文件对象，
+    可直接作为st.download_button的data参数
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    for part in iter_export_bytes(fmt, **kwargs):
+        spooled.write(part)
+    spooled.seek(0)
+    return spooled
+
+
+def _parse_end_date(text: Optional[str]) -> Optional[datetime]:
+    if not text:
+        return None
+    # 只给日期时包含当天全天
+    return datetime.fromisoformat(text + "T23:59:59" if len(text) == 10 else text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式导出锻炼记录（CSV/JSONL/Parquet）")
+    parser.add_argument("path", help="输出文件路径")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None, help="导出格式（默认按扩展名判断）")
+    parser.add_argument("--users", default=None, help="用户ID列表，逗号分隔（默认全部用户）")
+    parser.add_argument("--start", default=None, help="开始日期，如 2025-03-01")
+    parser.add_argument("--end", default=None, help="结束日期，如 2025-06-30（含当天）")
+    parser.add_argument("--columns", default=None,
+                        help=f"导出列，逗号分隔（可选：{','.join(EXPORT_COLUMNS)}）")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块行数")
+    official = parser.add_mutually_exclusive_group()
+    official.add_argument("--official", dest="is_official", action="store_const", const=True,
+                          help="仅导出官方记录")
+    official.add_argument("--unofficial", dest="is_official", action="store_const", const=False,
+                          help="仅导出自主锻炼记录")
+    args = parser.parse_args()
+
+    export_records_to_file(
+        args.path,
+        fmt=args.format,
+        columns=args.columns.split(",") if args.columns else None,
+        user_ids=[int(u) for u in args.users.split(",")] if args.users else None,
+        start_date=datetime.fromisoformat(args.start) if args.start else None,
+        end_date=_parse_end_date(args.end),
+        is_official=args.is_official,
+        chunk_size=args.chunk_size
+    )
+
+
+if __name__ == "__main__":
+    main()
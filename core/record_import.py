@@ -0,0 +1,319 @@
+# core/record_import.py
+"""
+锻炼记录流式导入（学校官方成绩、历史日志等大文件）
+文件按 解析 → 批量校验 → 分块批量写入 的生成器流水线处理，内存占用与文件大小无关；
+每写入一块就更新断点文件，进程中断后重新执行同一命令即可从断点继续。
+每块记录与导入进度（import_progress）在同一事务内提交，即使中断发生在提交之后、断点文件保存之前，
+续传时也不会重复写入该块。
+
+支持的文件格式：
+    CSV（带表头）或 JSONL（每行一个JSON对象），字段：
+    username 或 user_id, date, exercise_type, duration, distance, calories, is_official, notes
+
+用法：
+    python -m core.record_import records.csv --official --chunk-size 2000
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from self_health_mis.data.dal.exercise_dal import (
+    add_fitness_records_bulk, auto_update_goal_progress, get_import_progress, clear_import_progress
+)
+from self_health_mis.data.dal.user_dal import get_user_id_map
+from self_health_mis.core.exercise_service import (
+    ValidationError, validate_user_id, validate_exercise_data, build_fitness_record
+)
+
+DEFAULT_CHUNK_SIZE = 1000
+TRUE_VALUES = {"1", "true", "yes", "y", "是", "官方"}
+
+
+@dataclass
+class ImportReport:
+    """导入结果统计"""
+    source: str
+    rows_read: int = 0  # 本次运行读取的行数（不含断点前已处理的行）
+    inserted: int = 0
+    rejected: int = 0
+    resumed_from: int = 0  # 从第几行（数据行序号）继续
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows_read / self.seconds if self.seconds > 0 else 0.0
+
+
+# ========== 1. 读取：逐行产出 (行号, 原始字典) ==========
+def read_rows(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    逐行读取CSV/JSONL文件，行号为数据行序号（从1开始，不含CSV表头）
+    :param fmt: "csv" 或 "jsonl"，默认按扩展名判断
+    """
+    fmt = fmt or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv")
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            for line_no, row in enumerate(csv.DictReader(f), start=1):
+                yield line_no, row
+        elif fmt == "jsonl":
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                # 空行也占用行号，保证断点续传时行号稳定
+                yield line_no, (json.loads(line) if line else {})
+        else:
+            raise ValueError(f"不支持的文件格式: {fmt}")
+
+
+# ========== 2. 解析：原始字符串 → 业务层数据结构 ==========
+def _optional(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def parse_row(raw: Dict[str, Any], user_ids: Dict[str, int],
+              force_official: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    将文件中的一行转换为validate_exercise_data可接受的字典
+    :param user_ids: 用户名（小写）到用户ID的映射
+    :param force_official: 不为None时覆盖文件中的is_official
+    """
+    if not raw:
+        raise ValidationError("空行")
+
+    user_id = _optional(raw.get("user_id"))
+    if user_id is not None:
+        user_id = int(user_id)
+    else:
+        username = _optional(raw.get("username"))
+        if username is None:
+            raise ValidationError("缺少username或user_id")
+        user_id = user_ids.get(str(username).lower())
+        if user_id is None:
+            raise ValidationError(f"用户不存在: {username}")
+
+    date_value = _optional(raw.get("date"))
+    if date_value is None:
+        raise ValidationError("缺少必填字段: date")
+    try:
+        date_value = date_value if isinstance(date_value, datetime) else datetime.fromisoformat(str(date_value))
+    except ValueError:
+        raise ValidationError(f"日期格式错误: {date_value}") from None
+
+    try:
+        duration = _optional(raw.get("duration"))
+        distance = _optional(raw.get("distance"))
+        calories = _optional(raw.get("calories"))
+        record = {
+            "user_id": user_id,
+            "date": date_value,
+            "exercise_type": str(_optional(raw.get("exercise_type")) or ""),
+            "duration": float(duration) if duration is not None else None,
+            "distance": float(distance) if distance is not None else None,
+            "calories": int(float(calories)) if calories is not None else None,
+            "notes": _optional(raw.get("notes")),
+        }
+    except (TypeError, ValueError) as e:
+        raise ValidationError(f"数值格式错误: {str(e)}") from None
+
+    if record["duration"] is None:
+        raise ValidationError("缺少必填字段: duration")
+
+    if force_official is not None:
+        record["is_official"] = force_official
+    else:
+        is_official = raw.get("is_official")
+        record["is_official"] = (is_official if isinstance(is_official, bool)
+                                 else str(is_official or "").strip().lower() in TRUE_VALUES)
+    return record
+
+
+# ========== 3. 批量校验 ==========
+def validate_batch(rows: List[Tuple[int, Dict[str, Any]]], user_ids: Dict[str, int],
+                   force_official: Optional[bool] = None):
+    """
+    解析并校验一块数据
+    :return: (合法记录列表[(行号, FitnessRecord)], 拒绝列表[(行号, 原始行, 错误信息)])
+    """
+    accepted = []
+    rejected = []
+    for line_no, raw in rows:
+        try:
+            record_data = parse_row(raw, user_ids, force_official)
+            validate_user_id(record_data["user_id"])
+            validate_exercise_data(record_data)
+            accepted.append((line_no, build_fitness_record(record_data["user_id"], record_data)))
+        except ValidationError as e:
+            rejected.append((line_no, raw, str(e)))
+        except Exception as e:
+            rejected.append((line_no, raw, f"数据格式错误: {str(e)}"))
+    return accepted, rejected
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ========== 断点文件 ==========
+def _load_checkpoint(checkpoint_path: str, source: str) -> Dict[str, Any]:
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return {}
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != source:
+        raise ValueError(f"断点文件属于另一个导入文件: {checkpoint.get('source')}")
+    return checkpoint
+
+
+def _save_checkpoint(checkpoint_path: str, checkpoint: Dict[str, Any]) -> None:
+    # 先写临时文件再替换，避免写到一半崩溃留下损坏的断点
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _write_rejects(reject_file, rejected: List[Tuple[int, Any, str]]) -> None:
+    for line_no, raw, error in rejected:
+        reject_file.write(json.dumps({"line": line_no, "error": error, "row": raw},
+                                     ensure_ascii=False, default=str) + "\n")
+    reject_file.flush()
+
+
+# ========== 导入入口 ==========
+def import_records(
+    path: str,
+    fmt: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    checkpoint_path: Optional[str] = None,
+    reject_path: Optional[str] = None,
+    force_official: Optional[bool] = None
+) -> ImportReport:
+    """
+    流式导入锻炼记录文件
+
+    :param path: CSV/JSONL文件路径
+    :param fmt: 文件格式，默认按扩展名判断
+    :param chunk_size: 每个事务写入的行数
+    :param checkpoint_path: 断点文件路径，默认 <文件名>.checkpoint.json
+    :param reject_path: 被拒绝行的输出文件（JSONL），默认 <文件名>.rejects.jsonl
+    :param force_official: True/False时统一设置is_official（如学校官方成绩），None时读取文件中的值
+    :return: ImportReport
+    """
+    source = os.path.abspath(path)
+    checkpoint_path = checkpoint_path or source + ".checkpoint.json"
+    reject_path = reject_path or source + ".rejects.jsonl"
+
+    checkpoint = _load_checkpoint(checkpoint_path, source)
+    rows_done = checkpoint.get("rows_done", 0)
+    affected_users = set(checkpoint.get("affected_users", []))
+    # 数据库中的进度与记录同一事务提交；比断点文件新时，说明上次在两者之间中断
+    committed = max(get_import_progress(source), rows_done)
+    report = ImportReport(source=source, resumed_from=committed)
+    if committed:
+        print(f"↩️ 从断点继续导入：跳过前 {committed} 行")
+
+    # 一次性加载用户名映射，避免逐行查询
+    user_ids = get_user_id_map()
+    started = time.perf_counter()
+
+    rows = islice(read_rows(path, fmt), rows_done, None)
+    with open(reject_path, "a" if rows_done else "w", encoding="utf-8") as reject_file:
+        if "rejects_size" in checkpoint:
+            # 拒绝文件回退到断点保存时的长度，去掉中断前已写出、但断点未记录的部分
+            reject_file.truncate(checkpoint["rejects_size"])
+            reject_file.seek(checkpoint["rejects_size"])
+
+        if committed > rows_done:
+            # 这些行已随记录提交，不再写入：只重新校验，补回拒绝行和涉及的用户
+            accepted, rejected = validate_batch(list(islice(rows, committed - rows_done)),
+                                                user_ids, force_official)
+            affected_users.update(record.user_id for _, record in accepted)
+            _write_rejects(reject_file, rejected)
+            rows_done = committed
+            _save_checkpoint(checkpoint_path, {
+                "source": source,
+                "rows_done": rows_done,
+                "affected_users": sorted(affected_users),
+                "rejects_size": reject_file.tell(),
+            })
+
+        for chunk in chunked(rows, chunk_size):
+            accepted, rejected = validate_batch(chunk, user_ids, force_official)
+
+            if accepted:
+                results = add_fitness_records_bulk([record for _, record in accepted], update_goals=False,
+                                                   progress=(source, rows_done + report.rows_read + len(chunk)))
+                for (line_no, record), result in zip(accepted, results):
+                    if result["error"] is None:
+                        report.inserted += 1
+                        affected_users.add(record.user_id)
+                    else:
+                        rejected.append((line_no, asdict(record), result["error"]))
+
+            _write_rejects(reject_file, rejected)
+            report.rejected += len(rejected)
+            report.rows_read += len(chunk)
+
+            # 本块已提交，推进断点
+            _save_checkpoint(checkpoint_path, {
+                "source": source,
+                "rows_done": rows_done + report.rows_read,
+                "affected_users": sorted(affected_users),
+                "rejects_size": reject_file.tell(),
+            })
+            elapsed = time.perf_counter() - started
+            print(f"📥 已处理 {rows_done + report.rows_read} 行，"
+                  f"写入 {report.inserted}，拒绝 {report.rejected}，"
+                  f"{report.rows_read / elapsed if elapsed > 0 else 0:.0f} 行/秒")
+
+    # 全部写入后，每个用户只重算一次目标进度
+    for user_id in sorted(affected_users):
+        auto_update_goal_progress(user_id)
+
+    report.seconds = time.perf_counter() - started
+    # 先删除数据库中的进度：之后中断时断点文件仍在，续传只会重算目标进度
+    clear_import_progress(source)
+    os.remove(checkpoint_path)
+    print(f"✅ 导入完成：读取 {report.rows_read} 行，写入 {report.inserted}，拒绝 {report.rejected}，"
+          f"用时 {report.seconds:.2f} 秒（{report.rows_per_sec:.0f} 行/秒）")
+    if report.rejected:
+        print(f"⚠️ 被拒绝的行已写入：{reject_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式导入锻炼记录（CSV/JSONL）")
+    parser.add_argument("path", help="待导入的文件路径")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None, help="文件格式（默认按扩展名判断）")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每个事务写入的行数")
+    parser.add_argument("--checkpoint", default=None, help="断点文件路径")
+    parser.add_argument("--rejects", default=None, help="被拒绝行的输出文件路径")
+    official = parser.add_mutually_exclusive_group()
+    official.add_argument("--official", dest="force_official", action="store_const", const=True,
+                          help="全部标记为官方记录（is_official=1）")
+    official.add_argument("--unofficial", dest="force_official", action="store_const", const=False,
+                          help="全部标记为非官方记录")
+    args = parser.parse_args()
+
+    import_records(args.path, fmt=args.format, chunk_size=args.chunk_size,
+                   checkpoint_path=args.checkpoint, reject_path=args.rejects,
+                   force_official=args.force_official)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# data/dal/base_dal.py
+# DAL公共工具函数
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Union
+
+# 以下换算须与data/migrate.py中回填/触发器使用的SQL表达式保持一致
+EPOCH_DATE = date(1970, 1, 1)
+
+
+def to_day_key(value: Union[datetime, date]) -> int:
+    """
+    日期转换为天序号（1970-01-01起的天数），按记录中的本地日期计算
+    同一天的记录day_key相同，"同一天"判断变为整数比较
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - EPOCH_DATE).days
+
+
+def to_ts(value: Union[datetime, date]) -> int:
+    """
+    时间转换为秒级时间戳
+    不带时区的时间按字面值换算（与SQLite的strftime('%s', ...)一致），带时区的先换算为UTC
+    """
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if value.tzinfo is not None:
+        return calendar.timegm(value.utctimetuple())
+    return calendar.timegm(value.timetuple())
+
+
+def day_key_to_date(day_key: int) -> date:
+    """天序号转换回日期"""
+    return EPOCH_DATE + timedelta(days=day_key)
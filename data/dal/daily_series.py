@@ -0,0 +1,257 @@
+# data/dal/daily_series.py
+# 每个用户的按天累计指标序列（树状数组），任意日期区间求和只需两次前缀查询
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 序列中每天保存的指标（列顺序固定）
+METRICS = ("count", "duration", "distance", "calories")
+_METRIC_INDEX = {name: i for i, name in enumerate(METRICS)}
+
+
+class DailyFenwick:
+    """
+    以天序号为下标的树状数组（Fenwick tree），每个下标存一组指标
+    补录历史记录时单点更新和前缀查询均为O(log n)；日期超出当前范围时按倍数扩容后重建
+    """
+
+    def __init__(self, base_day: int, values: np.ndarray):
+        self.base_day = base_day
+        self.values = values            # 每天的原始值，形状(容量, 指标数)
+        self.tree = self._build(values)  # 树状数组，下标从1开始
+
+    @classmethod
+    def empty(cls, base_day: int, capacity: int = 64) -> "DailyFenwick":
+        return cls(base_day, np.zeros((capacity, len(METRICS))))
+
+    @staticmethod
+    def _build(values: np.ndarray) -> np.ndarray:
+        # 向量化O(n)建树：tree[i] = prefix[i] - prefix[i - lowbit(i)]
+        n = len(values)
+        prefix = np.zeros((n + 1, values.shape[1]))
+        np.cumsum(values, axis=0, out=prefix[1:])
+        index = np.arange(1, n + 1)
+        tree = np.zeros_like(prefix)
+        tree[1:] = prefix[index] - prefix[index - (index & -index)]
+        return tree
+
+    @property
+    def end_day(self) -> int:
+        return self.base_day + len(self.values) - 1
+
+    def _ensure_range(self, day: int) -> None:
+        if self.base_day <= day <= self.end_day:
+            return
+        capacity = len(self.values)
+        if day > self.end_day:
+            new_capacity = max(capacity * 2, day - self.base_day + 1)
+            values = np.zeros((new_capacity, len(METRICS)))
+            values[:capacity] = self.values
+            self.values = values
+        else:
+            shift = max(capacity, self.base_day - day)
+            values = np.zeros((capacity + shift, len(METRICS)))
+            values[shift:] = self.values
+            self.values = values
+            self.base_day -= shift
+        self.tree = self._build(self.values)
+
+    def add(self, day: int, delta: Sequence[float]) -> None:
+        self._ensure_range(day)
+        delta = np.asarray(delta, dtype=float)
+        i = day - self.base_day
+        self.values[i] += delta
+        i += 1
+        n = len(self.values)
+        while i <= n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, day: int) -> np.ndarray:
+        """截至day（含）的累计值"""
+        result = np.zeros(len(METRICS))
+        if day < self.base_day:
+            return result
+        i = min(day - self.base_day + 1, len(self.values))
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def range_sum(self, start_day: int, end_day: int) -> np.ndarray:
+        """[start_day, end_day]区间合计"""
+        if end_day < start_day:
+            return np.zeros(len(METRICS))
+        return self.prefix(end_day) - self.prefix(start_day - 1)
+
+    def total(self) -> np.ndarray:
+        return self.prefix(self.end_day)
+
+
+class UserDailySeries:
+    """
+    一个用户的全部按天序列：每种锻炼类型一棵树状数组，另有一棵汇总全部类型
+    version为该用户的数据版本（data_versions），序列内容与数据库中该版本的记录一致
+    序列由缓存在线程间共享：增量更新和各查询方法都持有序列自身的锁，查询不会读到扩容到一半的树状数组
+    """
+
+    ALL = "*"
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.by_type: Dict[str, DailyFenwick] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple], version: int = 0) -> "UserDailySeries":
+        """
+        由按(day_key, exercise_type)分组的聚合行构建：(day_key, exercise_type, count, duration, distance, calories)
+        version须与rows在同一读事务内读取
+        """
+        series = cls(version)
+        rows = list(rows)
+        if not rows:
+            return series
+        days = np.array([row[0] for row in rows], dtype=np.int64)
+        types = [row[1] for row in rows]
+        metrics = np.array([[value or 0 for value in row[2:6]] for row in rows], dtype=float)
+        base_day, end_day = int(days.min()), int(days.max())
+        capacity = end_day - base_day + 1
+
+        def build(mask):
+            values = np.zeros((capacity, len(METRICS)))
+            np.add.at(values, days[mask] - base_day, metrics[mask])
+            return DailyFenwick(base_day, values)
+
+        series.by_type[cls.ALL] = build(np.ones(len(rows), dtype=bool))
+        type_array = np.array(types, dtype=object)
+        for exercise_type in set(types):
+            series.by_type[exercise_type] = build(type_array == exercise_type)
+        return series
+
+    def __copy__(self) -> "UserDailySeries":
+        # 序列是缓存持有、随写入增量更新的共享对象（读写均加锁）；读请求合并层拷贝结果时返回自身
+        return self
+
+    def add(self, day: int, exercise_type: str, delta: Sequence[float]) -> None:
+        with self._lock:
+            for key in (self.ALL, exercise_type):
+                tree = self.by_type.get(key)
+                if tree is None:
+                    tree = self.by_type[key] = DailyFenwick.empty(day)
+                tree.add(day, delta)
+
+    def range_sums(self, start_day: int, end_day: int,
+                   exercise_types: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        区间内各指标合计，exercise_types为None时统计全部类型
+        """
+        keys = [self.ALL] if exercise_types is None else exercise_types
+        result = np.zeros(len(METRICS))
+        with self._lock:
+            for key in keys:
+                tree = self.by_type.get(key)
+                if tree is not None:
+                    result += tree.range_sum(start_day, end_day)
+        return dict(zip(METRICS, result.tolist()))
+
+    def range_sum(self, metric: str, start_day: int, end_day: int,
+                  exercise_types: Optional[Iterable[str]] = None) -> float:
+        return self.range_sums(start_day, end_day, exercise_types)[metric]
+
+    def totals(self) -> Dict[str, float]:
+        with self._lock:
+            tree = self.by_type.get(self.ALL)
+            values = tree.total() if tree is not None else np.zeros(len(METRICS))
+        return dict(zip(METRICS, values.tolist()))
+
+    def exercise_types(self) -> List[str]:
+        with self._lock:
+            return [key for key in self.by_type if key != self.ALL]
+
+
+class DailySeriesCache:
+    """
+    进程内的用户序列缓存：首次访问时加载，本进程写入记录后增量更新
+    取用时与该用户当前的数据版本比较，不一致说明有其他进程（或绕过DAL）新增、修改或删除过数据，重新加载
+    按LRU最多保留max_entries个用户的序列，超出时淘汰最久未访问的用户
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self._lock = threading.RLock()
+        self._series: "OrderedDict[int, UserDailySeries]" = OrderedDict()
+        self.max_entries = max_entries
+        self.evictions = 0
+
+    def get(self, user_id: int, current_version: int,
+            loader: Callable[[], UserDailySeries]) -> UserDailySeries:
+        """
+        current_version与loader须在同一读事务内读取
+        加载在锁外执行，一个用户的冷加载不阻塞其他用户；加载完成后，只有缓存中没有更新的序列时才放入
+        """
+        with self._lock:
+            series = self._series.get(user_id)
+            if series is not None and series.version == current_version:
+                self._series.move_to_end(user_id)
+                return series
+
+        loaded = loader()
+        with self._lock:
+            series = self._series.get(user_id)
+            if series is not None and series.version == loaded.version:
+                # 其他线程已加载了同一版本
+                self._series.move_to_end(user_id)
+                return series
+            # 版本单调递增：缓存中已是更新版本（如本进程写入后的增量更新）时保留它，
+            # 本次调用仍返回与调用方事务快照一致的序列
+            if series is None or series.version < loaded.version:
+                self._series[user_id] = loaded
+                self._series.move_to_end(user_id)
+                while len(self._series) > self.max_entries:
+                    self._series.popitem(last=False)
+                    self.evictions += 1
+            return loaded
+
+    def apply_records(self, user_id: int, version_before: int, version_after: int,
+                      records: Iterable[Tuple[int, str, float, Optional[float], Optional[int]]]) -> None:
+        """
+        本进程已提交的新记录计入序列：records为(day_key, exercise_type, duration, distance, calories)
+        version_before/version_after为写入事务内插入前后读到的数据版本；
+        序列正好是插入前的版本时增量更新并推进到插入后的版本，否则（中间还有其他写入）丢弃该用户的序列
+        """
+        with self._lock:
+            series = self._series.get(user_id)
+            if series is None:
+                return
+            if series.version != version_before:
+                self._series.pop(user_id, None)
+                return
+            for day, exercise_type, duration, distance, calories in records:
+                series.add(day, exercise_type, (1, duration or 0, distance or 0, calories or 0))
+            series.version = version_after
+
+    def advance(self, user_id: int, version_before: int, version_after: int) -> None:
+        """本进程已提交的写入没有改动锻炼记录（如只更新目标进度）：序列内容不变，只推进版本"""
+        self.apply_records(user_id, version_before, version_after, ())
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._series.clear()
+            else:
+                self._series.pop(user_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._series)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self.evictions = 0
+
+
+# 全局缓存实例（所有DAL模块共用）
+series_cache = DailySeriesCache()
@@ -0,0 +1,90 @@
+# data/dal/data_version.py
+# 按用户的数据版本：表data_versions由迁移v7中的触发器在每次写入的同一事务内递增，
+# 多个进程共用同一个fitness.db时，进程内缓存据此判断其他进程是否改过某个用户的数据
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from self_health_mis.data import sqlite_conn
+
+DATA_VERSION_QUERY = "SELECT version FROM data_versions WHERE user_id = ?"
+
+
+def read_data_version(conn, user_id: int) -> int:
+    """在给定连接（可处于读事务中）上读取用户的数据版本，从未写入过的用户为0"""
+    row = conn.execute(DATA_VERSION_QUERY, (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+class DataVersionTracker:
+    """
+    读取用户数据版本，供缓存校验
+    使用一个专用的只读连接：先查PRAGMA data_version（只有其他连接提交过写入时才会变化），
+    数据库整体未变时直接返回上次读到的版本，不访问data_versions；变化后再按用户重新读取（主键查询）
+    """
+
+    def __init__(self, db_getter: Callable[[], Any] = lambda: sqlite_conn.db_instance):
+        self._db_getter = db_getter
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_name: Optional[str] = None
+        self._pragma_version: Optional[int] = None
+        self._versions: Dict[int, int] = {}
+        self.checks = 0
+        self.db_changes = 0
+        self.version_reads = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        db_name = self._db_getter().db_name
+        if self._conn is None or db_name != self._db_name:
+            self._close()
+            # isolation_level=None：每条语句单独提交，不长期持有读事务
+            self._conn = sqlite3.connect(db_name, check_same_thread=False, isolation_level=None)
+            self._db_name = db_name
+        return self._conn
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+        self._pragma_version = None
+        self._versions.clear()
+
+    def get(self, user_id: int) -> Optional[int]:
+        """
+        获取用户当前的数据版本
+
+        Returns:
+            int: 数据版本；数据库尚未迁移到v7或读取出错时返回None（调用方不做校验）
+        """
+        with self._lock:
+            self.checks += 1
+            try:
+                conn = self._connection()
+                pragma_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if pragma_version != self._pragma_version:
+                    # 其他连接（本进程或其他进程）提交过写入，之前读到的版本都可能过期
+                    self._pragma_version = pragma_version
+                    self._versions.clear()
+                    self.db_changes += 1
+                version = self._versions.get(user_id)
+                if version is None:
+                    version = self._versions[user_id] = read_data_version(conn, user_id)
+                    self.version_reads += 1
+                return version
+            except sqlite3.Error:
+                self._close()
+                return None
+
+    def stats(self) -> Dict[str, int]:
+        """校验次数、发现数据库变化的次数、实际读取data_versions的次数"""
+        with self._lock:
+            return {"checks": self.checks, "db_changes": self.db_changes, "version_reads": self.version_reads}
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+# 全局实例（跟随全局db_instance）
+version_tracker = DataVersionTracker()
@@ -1,12 +1,54 @@
 # data/dal/exercise_dal.py
-from typing import List, Optional
+from typing import List, Optional, Tuple, Any, Dict, Iterable, Iterator
 from datetime import datetime
+from functools import lru_cache
 import pandas as pd
 from self_health_mis.data.sqlite_conn import db_instance
 from self_health_mis.data.model.exercise_model import FitnessRecord
 from self_health_mis.data.model.goal_model import FitnessGoal
+from self_health_mis.data.model.goal_types import GoalType, get_goal_type, get_goal_types, registry_version
+from self_health_mis.data.dal.base_dal import to_day_key, to_ts
+from self_health_mis.data.dal.daily_series import UserDailySeries, series_cache
+from self_health_mis.data.dal.stats_buckets import GRANULARITIES, bucketize, stats_cache
+from self_health_mis.data.dal.record_batch import RecordBatch, COLUMN_SPECS, DEFAULT_COLUMNS
+from self_health_mis.data.dal.row_mapper import get_row_mapper, map_rows, fetch_tuples, select_columns
+from self_health_mis.data.dal.single_flight import coalesced
+from self_health_mis.data.dal.write_events import notifies_write
+from self_health_mis.data.dal.data_version import read_data_version
+
+# 查询记录/目标时的列清单（顺序与row_mapper生成的映射函数一致）
+RECORD_SELECT = select_columns(FitnessRecord)
+GOAL_SELECT = select_columns(FitnessGoal)
+
+# 锻炼记录插入语句（单条/批量共用）
+INSERT_FITNESS_RECORD_SQL = '''
+    INSERT INTO fitness_records
+    (user_id, date, exercise_type, duration, distance, calories, is_official, notes,
+     is_checkin, intensity, recovery_quality, day_key, ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def _record_insert_params(record: FitnessRecord) -> Tuple:
+    return (
+        record.user_id, record.date.isoformat(), record.exercise_type,
+        record.duration, record.distance, record.calories,
+        record.is_official, record.notes,
+        record.is_checkin, record.intensity, record.recovery_quality,
+        to_day_key(record.date), to_ts(record.date)
+    )
+
+# 校验锻炼记录，返回错误信息，合法时返回None
+def _validate_record(record: FitnessRecord) -> Optional[str]:
+    if record is None or record.user_id is None or record.user_id <= 0:
+        return "无效的用户ID或记录数据"
+    if not record.exercise_type or record.duration is None or record.duration <= 0:
+        return "锻炼类型不能为空且时长必须大于0"
+    if not isinstance(record.date, datetime):
+        return "锻炼日期必须为datetime类型"
+    return None
 
 # 添加锻炼记录
+@notifies_write(lambda a: [a["record"].user_id])
 def add_fitness_record(record: FitnessRecord) -> int:
     """
     添加一条锻炼记录到数据库
@@ -18,40 +60,23 @@ def add_fitness_record(record: FitnessRecord) -> int:
         int: 成功返回记录ID，失败返回-1
     """
     # 参数验证
-    if record is None or record.user_id is None or record.user_id <= 0:
-        print("❌ 无效的用户ID或记录数据")
-        return -1
-        
-    if not record.exercise_type or record.duration <= 0:
-        print("❌ 锻炼类型不能为空且时长必须大于0")
+    error = _validate_record(record)
+    if error:
+        print(f"❌ {error}")
         return -1
         
     try:
         with db_instance._connect() as conn:
-            conn.execute('BEGIN TRANSACTION')
+            # IMMEDIATE：插入记录和目标进度递增在同一个写事务内完成
+            conn.execute('BEGIN IMMEDIATE TRANSACTION')
             try:
-                cursor = conn.execute('''
-                    INSERT INTO fitness_records
-                    (user_id, date, exercise_type, duration, distance, calories, is_official, notes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    record.user_id, record.date.isoformat(), record.exercise_type,
-                    record.duration, record.distance, record.calories,
-                    record.is_official, record.notes
-                ))
+                version_before = read_data_version(conn, record.user_id)
+                cursor = conn.execute(INSERT_FITNESS_RECORD_SQL, _record_insert_params(record))
                 record_id = cursor.lastrowid
+                # 同一事务内原子递增相关目标进度
+                _apply_record_to_goals(conn, record)
+                version_after = read_data_version(conn, record.user_id)
                 conn.execute('COMMIT')
-                
-                # 添加记录成功后，自动更新相关目标进度
-                update_goals_from_record(
-                    user_id=record.user_id,
-                    exercise_type=record.exercise_type,
-                    duration=record.duration,
-                    distance=record.distance,
-                    calories=record.calories
-                )
-                
-                return record_id  # 返回新增记录ID
             except Exception:
                 conn.execute('ROLLBACK')
                 raise
@@ -60,7 +85,168 @@ def add_fitness_record(record: FitnessRecord) -> int:
         print(f"❌ 添加锻炼记录失败：{str(e)}")
         return -1
 
+    # 事务已提交：更新缓存出错不影响写入结果
+    _apply_to_daily_series(record.user_id, version_before, version_after, [record])
+    return record_id  # 返回新增记录ID
+
+# 批量添加锻炼记录
+@notifies_write(lambda a: {r.user_id for r in a["records"] if r is not None})
+def add_fitness_records_bulk(records: List[FitnessRecord], update_goals: bool = True,
+                             progress: Optional[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    批量添加锻炼记录：先整体校验，再在一个事务内executemany插入，
+    最后对涉及的每个用户只重算一次目标进度
+    
+    Args:
+        records: 锻炼记录对象列表
+        update_goals: 是否在插入后重算目标进度（分块导入时可关闭，导入结束后统一重算）
+        progress: 分块导入时的(导入来源, 已处理行数)，与记录在同一事务内写入import_progress
+        
+    Returns:
+        List[Dict[str, Any]]: 与输入一一对应的结果，{"id": 记录ID或None, "error": 错误信息或None}
+    """
+    results = [{"id": None, "error": _validate_record(record)} for record in records]
+    valid_indexes = [i for i, result in enumerate(results) if result["error"] is None]
+    if not valid_indexes:
+        return results
+
+    try:
+        with db_instance._connect() as conn:
+            # IMMEDIATE：开始即持有写锁，保证批次内的自增ID连续
+            conn.execute('BEGIN IMMEDIATE TRANSACTION')
+            try:
+                user_ids = sorted({records[i].user_id for i in valid_indexes})
+                versions_before = {user_id: read_data_version(conn, user_id) for user_id in user_ids}
+                seq_before = _current_record_seq(conn)
+                conn.executemany(INSERT_FITNESS_RECORD_SQL,
+                                 [_record_insert_params(records[i]) for i in valid_indexes])
+                seq_after = _current_record_seq(conn)
+                if seq_after - seq_before != len(valid_indexes):
+                    raise RuntimeError("批量插入的记录ID不连续")
+                versions_after = {user_id: read_data_version(conn, user_id) for user_id in user_ids}
+                if progress is not None:
+                    conn.execute(UPSERT_IMPORT_PROGRESS_SQL, (*progress, datetime.now().isoformat()))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+    except Exception as e:
+        print(f"❌ 批量添加锻炼记录失败：{str(e)}")
+        for i in valid_indexes:
+            results[i]["error"] = f"数据库写入失败：{str(e)}"
+        return results
+
+    for offset, i in enumerate(valid_indexes):
+        results[i]["id"] = seq_before + offset + 1
+    for user_id in user_ids:
+        _apply_to_daily_series(user_id, versions_before[user_id], versions_after[user_id],
+                               [records[i] for i in valid_indexes if records[i].user_id == user_id])
+    print(f"✅ 批量添加锻炼记录完成：成功 {len(valid_indexes)} 条，失败 {len(records) - len(valid_indexes)} 条")
+
+    if update_goals:
+        # 每个用户只重算一次目标进度
+        for user_id in user_ids:
+            auto_update_goal_progress(user_id)
+    return results
+
+# ========== 文件导入进度 ==========
+UPSERT_IMPORT_PROGRESS_SQL = '''
+    INSERT INTO import_progress (source, rows_done, updated_at) VALUES (?, ?, ?)
+    ON CONFLICT (source) DO UPDATE SET rows_done = excluded.rows_done, updated_at = excluded.updated_at
+'''
+
+# 获取导入来源已提交的行数
+def get_import_progress(source: str) -> int:
+    """
+    获取分块导入中已随记录一起提交的行数
+    
+    Args:
+        source: 导入来源（文件绝对路径）
+        
+    Returns:
+        int: 已提交的行数，没有进度记录或出错返回0
+    """
+    try:
+        with db_instance._connect() as conn:
+            row = conn.execute("SELECT rows_done FROM import_progress WHERE source = ?", (source,)).fetchone()
+            return row[0] if row else 0
+    except Exception as e:
+        print(f"❌ 获取导入进度失败：{str(e)}")
+        return 0
+
+# 导入完成后删除进度记录
+def clear_import_progress(source: str) -> bool:
+    """
+    删除导入来源的进度记录（导入全部完成后调用）
+    
+    Args:
+        source: 导入来源（文件绝对路径）
+        
+    Returns:
+        bool: 成功返回True，失败返回False
+    """
+    try:
+        with db_instance._connect() as conn:
+            conn.execute("DELETE FROM import_progress WHERE source = ?", (source,))
+            return True
+    except Exception as e:
+        print(f"❌ 删除导入进度失败：{str(e)}")
+        return False
+
+def _current_record_seq(conn) -> int:
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'fitness_records'").fetchone()
+    return row[0] if row else 0
+
+# 拼接锻炼记录的过滤条件（按整数时间戳比较，避免日期文本精度不一致）
+def _fitness_records_filters(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    is_official: Optional[bool] = None
+) -> Tuple[str, List[Any]]:
+    where = "user_id = ?"
+    params: List[Any] = [user_id]
+    if start_date:
+        where += " AND ts >= ?"
+        params.append(to_ts(start_date))
+    if end_date:
+        where += " AND ts <= ?"
+        params.append(to_ts(end_date))
+    if is_official is not None:
+        where += " AND is_official = ?"
+        params.append(1 if is_official else 0)
+    return where, params
+
+# 构造锻炼记录查询语句（单独抽出，便于用EXPLAIN QUERY PLAN校验索引命中）
+def _build_fitness_records_query(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    is_official: Optional[bool] = None
+) -> Tuple[str, List[Any]]:
+    where, params = _fitness_records_filters(user_id, start_date, end_date, is_official)
+    return f"SELECT {RECORD_SELECT} FROM fitness_records WHERE {where} ORDER BY ts DESC, id DESC", params
+
+# 构造分页查询语句：按(ts, id)倒序的键集分页，after为上一页最后一条记录的(日期, ID)
+def _build_fitness_records_page_query(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    is_official: Optional[bool] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 50
+) -> Tuple[str, List[Any]]:
+    where, params = _fitness_records_filters(user_id, start_date, end_date, is_official)
+    if after is not None:
+        # 行值比较可直接作为(user_id, ts, rowid)索引上的范围条件，无需OFFSET跳过前面的行
+        where += " AND (ts, id) < (?, ?)"
+        params.extend([to_ts(after[0]), after[1]])
+    # 多取一条，用来判断是否还有下一页
+    params.append(limit + 1)
+    return f"SELECT {RECORD_SELECT} FROM fitness_records WHERE {where} ORDER BY ts DESC, id DESC LIMIT ?", params
+
 # 查询锻炼记录
+@coalesced
 def get_fitness_records(
     user_id: int,
     start_date: Optional[datetime] = None,
@@ -89,51 +275,198 @@ def get_fitness_records(
         print("❌ 结束日期不能早于开始日期")
         return []
     
-    query = "SELECT * FROM fitness_records WHERE user_id = ?"
-    params = [user_id]
+    query, params = _build_fitness_records_query(user_id, start_date, end_date, is_official)
+
+    try:
+        with db_instance._connect() as conn:
+            rows = fetch_tuples(conn, query, params)
+
+        # 转换为FitnessRecord列表
+        return map_rows(get_row_mapper(FitnessRecord), rows, "锻炼记录")
+    except Exception as e:
+        print(f"❌ 查询锻炼记录失败：{str(e)}")
+        return []
+
+# 分页查询锻炼记录
+@coalesced
+def get_fitness_records_page(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    is_official: Optional[bool] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 50
+) -> Tuple[List[FitnessRecord], Optional[Tuple[datetime, int]]]:
+    """
+    按时间倒序分页查询用户锻炼记录（键集分页，过滤条件全部下推到SQL）
+    
+    Args:
+        user_id: 用户ID
+        start_date: 开始日期（可选）
+        end_date: 结束日期（可选）
+        is_official: 是否为官方记录（可选）
+        after: 游标，上一页返回的next_cursor；None表示第一页
+        limit: 每页条数
+        
+    Returns:
+        (本页记录列表, next_cursor)，没有下一页时next_cursor为None；出错返回([], None)
+    """
+    if user_id is None or user_id <= 0:
+        print("❌ 无效的用户ID")
+        return [], None
+    if limit is None or limit <= 0:
+        print("❌ 每页条数必须大于0")
+        return [], None
+    if start_date and end_date and end_date < start_date:
+        print("❌ 结束日期不能早于开始日期")
+        return [], None
+
+    query, params = _build_fitness_records_page_query(user_id, start_date, end_date, is_official, after, limit)
+
+    try:
+        with db_instance._connect() as conn:
+            rows = fetch_tuples(conn, query, params)
+
+        has_more = len(rows) > limit
+        mapper = get_row_mapper(FitnessRecord)
+        records = [mapper(row) for row in rows[:limit]]
+        next_cursor = (records[-1].date, records[-1].id) if has_more and records else None
+        return records, next_cursor
+    except Exception as e:
+        print(f"❌ 分页查询锻炼记录失败：{str(e)}")
+        return [], None
+
+# 列式读取每次从游标取出的行数
+COLUMNAR_FETCH_SIZE = 10000
+
+# 按列查询锻炼记录（返回RecordBatch）
+@coalesced
+def get_fitness_records_columnar(
+    user_id: int,
+    columns: Optional[List[str]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    is_official: Optional[bool] = None
+) -> RecordBatch:
+    """
+    按列查询用户锻炼记录（按时间正序），结果直接由游标分块填入NumPy数组，不创建FitnessRecord对象；
+    batch.to_pandas()得到与之共享内存的DataFrame
+    
+    Args:
+        user_id: 用户ID
+        columns: 需要的列，可选值见record_batch.COLUMN_SPECS，默认DEFAULT_COLUMNS
+        start_date / end_date / is_official: 过滤条件，与get_fitness_records相同
+        
+    Returns:
+        RecordBatch: 列式结果，出错返回空批
+    """
+    columns = list(columns or DEFAULT_COLUMNS)
+    unknown = [c for c in columns if c not in COLUMN_SPECS]
+    if unknown:
+        print(f"❌ 不支持的列: {', '.join(unknown)}")
+        return RecordBatch.empty()
+    if user_id is None or user_id <= 0:
+        print("❌ 无效的用户ID")
+        return RecordBatch.empty(columns)
+    if start_date and end_date and end_date < start_date:
+        print("❌ 结束日期不能早于开始日期")
+        return RecordBatch.empty(columns)
 
-    # 拼接查询条件
+    where, params = _fitness_records_filters(user_id, start_date, end_date, is_official)
+    select = ", ".join(COLUMN_SPECS[c][0] for c in columns)
+    try:
+        with db_instance._connect() as conn:
+            # 计数与读取在同一读事务内，行数一致，可一次分配好数组
+            conn.execute('BEGIN')
+            total = conn.execute(f"SELECT COUNT(*) FROM fitness_records WHERE {where}", params).fetchone()[0]
+            cursor = conn.execute(f"SELECT {select} FROM fitness_records WHERE {where} ORDER BY ts, id", params)
+            chunks = iter(lambda: cursor.fetchmany(COLUMNAR_FETCH_SIZE), [])
+            return RecordBatch.from_chunks(columns, chunks, total)
+    except Exception as e:
+        print(f"❌ 按列查询锻炼记录失败：{str(e)}")
+        return RecordBatch.empty(columns)
+
+# 可导出的列（投影只允许在此白名单内选择，防止拼接任意SQL）
+EXPORT_COLUMNS = (
+    "id", "user_id", "date", "exercise_type", "duration", "distance", "calories",
+    "is_official", "notes", "is_checkin", "intensity", "recovery_quality"
+)
+
+def _build_export_query(
+    columns: Optional[List[str]] = None,
+    user_ids: Optional[List[int]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    is_official: Optional[bool] = None
+) -> Tuple[str, List[Any]]:
+    columns = list(columns or EXPORT_COLUMNS)
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"不支持导出的列: {', '.join(unknown)}")
+
+    conditions = []
+    params: List[Any] = []
+    if user_ids:
+        user_ids = sorted(set(user_ids))
+        conditions.append(f"user_id IN ({', '.join('?' * len(user_ids))})")
+        params.extend(user_ids)
     if start_date:
-        query += " AND date >= ?"
-        params.append(start_date.isoformat())
+        conditions.append("ts >= ?")
+        params.append(to_ts(start_date))
     if end_date:
-        query += " AND date <= ?"
-        params.append(end_date.isoformat())
+        conditions.append("ts <= ?")
+        params.append(to_ts(end_date))
     if is_official is not None:
-        query += " AND is_official = ?"
+        conditions.append("is_official = ?")
         params.append(1 if is_official else 0)
 
-    query += " ORDER BY date DESC"
+    query = f"SELECT {', '.join(columns)} FROM fitness_records"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    # 指定用户时沿(user_id, ts)索引顺序输出，全表导出时按主键顺序输出，均无需额外排序
+    query += " ORDER BY user_id, ts, id" if user_ids else " ORDER BY id"
+    return query, params
+
+# 分块流式读取锻炼记录（导出用）
+def iter_fitness_record_chunks(
+    columns: Optional[List[str]] = None,
+    user_ids: Optional[List[int]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    is_official: Optional[bool] = None,
+    chunk_size: int = 5000
+) -> Iterator[List[tuple]]:
+    """
+    按固定大小分块遍历游标，内存占用与表大小无关
+
+    Args:
+        columns: 导出的列（默认全部可导出列）
+        user_ids: 用户ID集合（可选，不传时导出全部用户）
+        start_date / end_date / is_official: 与get_fitness_records相同的过滤条件
+        chunk_size: 每块行数
+
+    Yields:
+        List[tuple]: 每块的行元组，字段顺序与columns一致
 
+    与其他查询不同，出错时会在打印后重新抛出异常：导出文件不能被静默截断
+    """
+    query, params = _build_export_query(columns, user_ids, start_date, end_date, is_official)
     try:
         with db_instance._connect() as conn:
+            # 整个导出在同一个读事务里完成，导出期间的写入不会造成前后不一致
+            conn.execute("BEGIN")
             cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
-
-        # 转换为FitnessRecord列表
-        records = []
-        for row in rows:
-            try:
-                records.append(FitnessRecord(
-                    id=row["id"],
-                    user_id=row["user_id"],
-                    date=datetime.fromisoformat(row["date"]),
-                    exercise_type=row["exercise_type"],
-                    duration=row["duration"],
-                    distance=row["distance"] if row["distance"] is not None else None,
-                    calories=row["calories"] if row["calories"] is not None else None,
-                    is_official=bool(row["is_official"]),
-                    notes=row["notes"] if row["notes"] is not None else None
-                ))
-            except Exception as parse_error:
-                print(f"❌ 解析锻炼记录时出错：{str(parse_error)}")
-                continue
-        return records
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [tuple(row) for row in rows]
     except Exception as e:
-        print(f"❌ 查询锻炼记录失败：{str(e)}")
-        return []
+        print(f"❌ 导出锻炼记录失败：{str(e)}")
+        raise
 
 # 添加锻炼目标
+@notifies_write(lambda a: [a["goal"].user_id])
 def add_fitness_goal(goal: FitnessGoal) -> int:
     """
     添加一条锻炼目标到数据库
@@ -163,11 +496,13 @@ def add_fitness_goal(goal: FitnessGoal) -> int:
             try:
                 cursor = conn.execute('''
                     INSERT INTO fitness_goals
-                    (user_id, goal_type, target_value, current_value, start_date, end_date, is_completed)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    (user_id, goal_type, target_value, current_value, start_date, end_date, is_completed,
+                     start_day_key, end_day_key)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     goal.user_id, goal.goal_type, goal.target_value, goal.current_value,
-                    goal.start_date.isoformat(), goal.end_date.isoformat(), goal.is_completed
+                    goal.start_date.isoformat(), goal.end_date.isoformat(), goal.is_completed,
+                    to_day_key(goal.start_date), to_day_key(goal.end_date)
                 ))
                 goal_id = cursor.lastrowid
                 conn.execute('COMMIT')
@@ -180,7 +515,18 @@ def add_fitness_goal(goal: FitnessGoal) -> int:
         print(f"❌ 添加锻炼目标失败：{str(e)}")
         return -1
 
+# 构造锻炼目标查询语句
+def _build_fitness_goals_query(user_id: int, include_completed: bool = True) -> Tuple[str, List[Any]]:
+    query = f"SELECT {GOAL_SELECT} FROM fitness_goals WHERE user_id = ?"
+    params = [user_id]
+
+    if not include_completed:
+        query += " AND is_completed = 0"
+    query += " ORDER BY end_date"
+    return query, params
+
 # 查询锻炼目标
+@coalesced
 def get_fitness_goals(user_id: int, include_completed: bool = True) -> List[FitnessGoal]:
     """
     查询用户锻炼目标
@@ -197,40 +543,19 @@ def get_fitness_goals(user_id: int, include_completed: bool = True) -> List[Fitn
         print("❌ 无效的用户ID")
         return []
     
-    query = "SELECT * FROM fitness_goals WHERE user_id = ?"
-    params = [user_id]
-
-    if not include_completed:
-        query += " AND is_completed = 0"
-    query += " ORDER BY end_date"
+    query, params = _build_fitness_goals_query(user_id, include_completed)
 
     try:
         with db_instance._connect() as conn:
-            cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
+            rows = fetch_tuples(conn, query, params)
 
-        goals = []
-        for row in rows:
-            try:
-                goals.append(FitnessGoal(
-                    id=row["id"],
-                    user_id=row["user_id"],
-                    goal_type=row["goal_type"],
-                    target_value=row["target_value"],
-                    current_value=row["current_value"],
-                    start_date=datetime.fromisoformat(row["start_date"]),
-                    end_date=datetime.fromisoformat(row["end_date"]),
-                    is_completed=bool(row["is_completed"])
-                ))
-            except Exception as parse_error:
-                print(f"❌ 解析锻炼目标时出错：{str(parse_error)}")
-                continue
-        return goals
+        return map_rows(get_row_mapper(FitnessGoal), rows, "锻炼目标")
     except Exception as e:
         print(f"❌ 查询锻炼目标失败：{str(e)}")
         return []
 
 # 更新目标进度
+@notifies_write(lambda a: [a["user_id"]])
 def update_goal_progress(goal_id: int, user_id: int, progress: float) -> bool:
     """
     更新锻炼目标的进度
@@ -296,6 +621,7 @@ def update_goal_progress(goal_id: int, user_id: int, progress: float) -> bool:
         return False
 
 # 更新目标值
+@notifies_write(lambda a: [a["user_id"]])
 def update_goal_target(goal_id: int, user_id: int, new_target: float) -> bool:
     try:
         with db_instance._connect() as conn:
@@ -310,38 +636,256 @@ def update_goal_target(goal_id: int, user_id: int, new_target: float) -> bool:
         print(f"❌ 更新目标值失败：{str(e)}")
         return False
 
+# ========== 按天累计序列 ==========
+# 按(day_key, exercise_type)分组的每日合计，由覆盖索引idx_fitness_records_user_day_stats满足
+DAILY_SERIES_QUERY = '''
+    SELECT day_key, exercise_type, COUNT(*), SUM(duration), SUM(distance), SUM(calories)
+    FROM fitness_records
+    WHERE user_id = ?
+    GROUP BY day_key, exercise_type
+'''
+
+def _get_daily_series(conn, user_id: int) -> UserDailySeries:
+    # 用户的数据版本用于发现其他进程的新增/修改/删除；须在调用方开启的事务内调用，加载与版本读取同一快照
+    version = read_data_version(conn, user_id)
+    return series_cache.get(
+        user_id, version,
+        lambda: UserDailySeries.from_rows(conn.execute(DAILY_SERIES_QUERY, (user_id,)), version=version)
+    )
+
+# 提交后把本事务新增的记录计入已加载的序列；version_before/version_after为事务内插入前后的数据版本
+# 更新失败时丢弃该用户的序列（下次取用时重新加载），不向调用方抛出
+def _apply_to_daily_series(user_id: int, version_before: int, version_after: int,
+                           records: List[FitnessRecord]) -> None:
+    try:
+        series_cache.apply_records(user_id, version_before, version_after, [
+            (to_day_key(r.date), r.exercise_type, r.duration, r.distance, r.calories) for r in records
+        ])
+    except Exception as e:
+        print(f"⚠️ 更新锻炼序列缓存失败，已丢弃用户 {user_id} 的序列：{str(e)}")
+        series_cache.invalidate(user_id)
+
+# 获取用户按天累计序列
+@coalesced
+def get_daily_series(user_id: int) -> Optional[UserDailySeries]:
+    """
+    获取用户按天累计的指标序列（条数/时长/距离/卡路里，按锻炼类型分开），
+    首次访问时加载，之后随写入增量更新；任意日期区间合计只需两次前缀查询
+    
+    Args:
+        user_id: 用户ID
+        
+    Returns:
+        UserDailySeries: 用户序列，出错返回None
+    """
+    if user_id is None or user_id <= 0:
+        print("❌ 无效的用户ID")
+        return None
+    try:
+        with db_instance._connect() as conn:
+            conn.execute('BEGIN')
+            return _get_daily_series(conn, user_id)
+    except Exception as e:
+        print(f"❌ 获取锻炼序列失败：{str(e)}")
+        return None
+
+# 锻炼统计查询：按(day_key, exercise_type)预聚合，只读取覆盖索引idx_fitness_records_user_day_stats中的列
+EXERCISE_STATS_QUERY = '''
+    SELECT day_key, exercise_type, COUNT(*), SUM(duration), SUM(distance), SUM(calories)
+    FROM fitness_records
+    WHERE user_id = ? AND day_key >= ? AND day_key <= ?
+    GROUP BY day_key, exercise_type
+'''
+
+# 统计周期：(统计天数（含今天）, 默认粒度)
+STATS_PERIODS = {
+    "day": (1, "day"),
+    "week": (7, "day"),
+    "month": (30, "day"),
+    "year": (365, "month"),
+}
+
 # 获取锻炼统计数据（返回DataFrame）
-def get_exercise_stats(user_id: int, period: str = "month") -> pd.DataFrame:
-    end_date = datetime.now().date()
-    # 计算统计起始日期
-    if period == "month":
-        start_date = end_date - datetime.timedelta(days=30)
-    elif period == "week":
-        start_date = end_date - datetime.timedelta(days=7)
-    else:
-        start_date = end_date - datetime.timedelta(days=365)
-    end_date += datetime.timedelta(days=1)  # 包含当天
+@coalesced
+def get_exercise_stats(user_id: int, period: str = "month", granularity: Optional[str] = None) -> pd.DataFrame:
+    """
+    获取用户最近一个统计周期内按粒度、锻炼类型分桶的统计
+    结果按(用户, 周期, 粒度, 日期范围, 数据版本)缓存，该用户的数据有任何写入（含其他进程）后自动失效
+    
+    Args:
+        user_id: 用户ID
+        period: 统计周期，day / week / month / year
+        granularity: 分桶粒度，day / week / isoweek / month / year，默认随周期而定
+        
+    Returns:
+        DataFrame: 列为bucket（分桶起始日期）、label、exercise_type、sessions、duration、distance、calories；
+                   出错返回空DataFrame
+    """
+    if period not in STATS_PERIODS:
+        print(f"❌ 不支持的统计周期: {period}")
+        return pd.DataFrame()
+    days, default_granularity = STATS_PERIODS[period]
+    granularity = granularity or default_granularity
+    if granularity not in GRANULARITIES:
+        print(f"❌ 不支持的统计粒度: {granularity}")
+        return pd.DataFrame()
 
+    end_key = to_day_key(datetime.now())
+    start_key = end_key - days + 1
     try:
         with db_instance._connect() as conn:
-            df = pd.read_sql_query('''
-                SELECT date, exercise_type, duration, distance, calories
-                FROM fitness_records
-                WHERE user_id = ? AND date >= ? AND date <= ?
-            ''', conn, params=[user_id, start_date.isoformat(), end_date.isoformat()])
-
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date']).dt.date
-        return df
+            conn.execute('BEGIN')
+            # 用户数据版本由触发器在写入的同一事务内递增；版本与查询在同一读事务内取得
+            key = (user_id, period, granularity, start_key, end_key, read_data_version(conn, user_id))
+            df = stats_cache.get(key)
+            if df is None:
+                rows = conn.execute(EXERCISE_STATS_QUERY, (user_id, start_key, end_key)).fetchall()
+                df = bucketize(rows, granularity)
+                stats_cache.put(key, df)
+        return df.copy()
     except Exception as e:
         print(f"❌ 获取锻炼统计失败：{str(e)}")
         return pd.DataFrame()
 
-# 自动更新目标进度
+# ========== 目标类型 → SQL ==========
+# 目标类型在goal_types注册表中声明，这里统一生成聚合重算和增量更新两条路径的SQL，
+# 注册表不变时只生成一次；新增目标类型无需改动任何查询代码
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+def _exercise_filter_sql(goal_type: GoalType, column: str) -> Optional[str]:
+    if goal_type.exercise_types is None:
+        return None
+    return f"{column} IN ({', '.join(_sql_literal(t) for t in goal_type.exercise_types)})"
+
+def _aggregate_expr(goal_type: GoalType) -> str:
+    column = "r.id" if goal_type.metric == "count" else f"r.{goal_type.metric}"
+    condition = _exercise_filter_sql(goal_type, "r.exercise_type")
+    if condition:
+        column = f"CASE WHEN {condition} THEN {column} END"
+    return f"COUNT({column})" if goal_type.metric == "count" else f"COALESCE(SUM({column}), 0)"
+
+def _delta_expr(goal_type: GoalType) -> str:
+    value = "1" if goal_type.metric == "count" else f"COALESCE(:{goal_type.metric}, 0)"
+    condition = _exercise_filter_sql(goal_type, ":exercise_type")
+    return f"(CASE WHEN {condition} THEN {value} ELSE 0 END)" if condition else value
+
+@lru_cache(maxsize=None)
+def _compile_goal_sql(version: int) -> Tuple[str, str]:
+    """
+    按注册表生成(聚合进度查询, 增量更新语句)，version为注册表版本号，仅用作缓存键
+    """
+    goal_types = get_goal_types()
+    aggregate_cases = "\n".join(
+        f"               WHEN {_sql_literal(t.name)} THEN {_aggregate_expr(t)}" for t in goal_types
+    )
+    delta_cases = "\n".join(
+        f"        WHEN {_sql_literal(t.name)} THEN {_delta_expr(t)}" for t in goal_types
+    )
+
+    # 聚合：一次分组查询算出一批未完成目标在各自周期内的进度（周期按天计，首尾两天都包含）
+    # 记录按(user_id, day_key)覆盖索引做范围连接，每个目标只扫描自己周期内的记录；未知类型的目标进度为NULL，不更新
+    progress_query = f'''
+    SELECT g.id AS goal_id, g.user_id, g.target_value, g.current_value, g.is_completed,
+           CASE g.goal_type
+{aggregate_cases}
+           END AS progress
+    FROM fitness_goals g
+    LEFT JOIN fitness_records r
+        ON r.user_id = g.user_id
+       AND r.day_key >= g.start_day_key
+       AND r.day_key <= g.end_day_key
+    WHERE g.is_completed = 0 {{user_filter}}
+    GROUP BY g.id
+'''
+
+    # 增量：单条记录对各类目标的进度增量（命名参数），不相关的目标增量为0
+    delta = f'''CASE goal_type
+{delta_cases}
+        ELSE 0
+    END'''
+    # 原子递增：在数据库内完成"读-改-写"，并发会话之间不会互相覆盖；完成标志在同一语句中按旧值+增量判断
+    increment_sql = f'''
+    UPDATE fitness_goals
+    SET current_value = MIN(current_value + {delta}, target_value),
+        is_completed = (current_value + {delta} >= target_value)
+    WHERE user_id = :user_id
+      AND is_completed = 0
+      AND :day_key >= start_day_key
+      AND :day_key <= end_day_key
+      AND {delta} > 0
+'''
+    return progress_query, increment_sql
+
+def goal_progress_query() -> str:
+    return _compile_goal_sql(registry_version())[0]
+
+def goal_increment_sql() -> str:
+    return _compile_goal_sql(registry_version())[1]
+
+UPDATE_GOAL_PROGRESS_SQL = '''
+    UPDATE fitness_goals
+    SET current_value = MIN(?, target_value), is_completed = (? >= target_value)
+    WHERE id = ?
+'''
+
+# 按算好的进度批量写回目标：rows为(目标ID, 目标值, 当前值, 是否完成, 新进度)，返回实际变化的目标数
+def _write_goal_progress(conn, rows: Iterable[Tuple[int, float, float, bool, float]]) -> int:
+    changes = []
+    for goal_id, target_value, old_value, was_completed, progress in rows:
+        current_value = min(progress, target_value)  # 进度不超过目标值
+        is_completed = progress >= target_value
+        if current_value != old_value or is_completed != bool(was_completed):
+            changes.append((progress, progress, goal_id))
+            if is_completed:
+                print(f"✅ 目标 {goal_id} 已完成！")
+    # 只写入有变化的目标，一次批量执行
+    if changes:
+        conn.executemany(UPDATE_GOAL_PROGRESS_SQL, changes)
+    return len(changes)
+
+# 在一个事务内用聚合查询重算一批未完成目标的进度，返回(目标数, 实际变化的目标数)
+def _recompute_goal_progress(conn, user_id: Optional[int] = None) -> Tuple[int, int]:
+    if user_id is None:
+        query, params = goal_progress_query().format(user_filter=""), ()
+    else:
+        query, params = goal_progress_query().format(user_filter="AND g.user_id = ?"), (user_id,)
+    rows = conn.execute(query, params).fetchall()
+    changed = _write_goal_progress(conn, [
+        (row["goal_id"], row["target_value"], row["current_value"], row["is_completed"], row["progress"])
+        for row in rows if row["progress"] is not None
+    ])
+    return len(rows), changed
+
+# 在一个事务内用按天累计序列计算用户未完成目标的进度，每个目标只需两次前缀查询
+def _recompute_goal_progress_from_series(conn, user_id: int) -> Tuple[int, int]:
+    rows = conn.execute('''
+        SELECT id, goal_type, target_value, current_value, is_completed, start_day_key, end_day_key
+        FROM fitness_goals
+        WHERE user_id = ? AND is_completed = 0
+    ''', (user_id,)).fetchall()
+    if not rows:
+        return 0, 0
+    # 在持有写锁的事务内取序列：此时不会有新提交，序列与数据库一致
+    series = _get_daily_series(conn, user_id)
+
+    progress_rows = []
+    for row in rows:
+        goal_type = get_goal_type(row["goal_type"])
+        if goal_type is None:
+            continue
+        progress = series.range_sum(goal_type.metric, row["start_day_key"], row["end_day_key"],
+                                    goal_type.exercise_types)
+        progress_rows.append((row["id"], row["target_value"], row["current_value"], row["is_completed"], progress))
+    return len(rows), _write_goal_progress(conn, progress_rows)
 
+# 自动更新目标进度
+@notifies_write(lambda a: [a["user_id"]])
 def auto_update_goal_progress(user_id: int):
     """
     根据现有锻炼记录自动更新用户所有未完成目标的进度
+    （进度取自按天累计序列，批量UPDATE，在同一事务内完成）
     
     Args:
         user_id: 用户ID
@@ -352,59 +896,54 @@ def auto_update_goal_progress(user_id: int):
         return
         
     try:
-        goals = get_fitness_goals(user_id, include_completed=False)
-        if not goals:
+        with db_instance._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE TRANSACTION')
+            try:
+                version_before = read_data_version(conn, user_id)
+                total, changed = _recompute_goal_progress_from_series(conn, user_id)
+                version_after = read_data_version(conn, user_id)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        # 只写了目标，序列内容不变，推进到写入后的版本以免下次整体重新加载
+        series_cache.advance(user_id, version_before, version_after)
+
+        if total == 0:
             print(f"ℹ️ 用户 {user_id} 没有未完成的锻炼目标")
             return
-            
-        updated_count = 0
-        for goal in goals:
-            try:
-                if goal.goal_type == "每周跑步次数":
-                    # 统计周期内跑步次数
-                    runs = [r for r in get_fitness_records(user_id) if
-                            r.exercise_type == "跑步" and
-                            goal.start_date <= r.date <= goal.end_date]
-                    if update_goal_progress(goal.id, user_id, len(runs)):
-                        updated_count += 1
-
-                elif goal.goal_type == "每周锻炼总时长(分钟)":
-                    # 统计周期内总时长
-                    exercises = [r for r in get_fitness_records(user_id) if
-                                goal.start_date <= r.date <= goal.end_date]
-                    total_duration = sum(e.duration for e in exercises)
-                    if update_goal_progress(goal.id, user_id, total_duration):
-                        updated_count += 1
-                        
-                elif goal.goal_type == "每月跑步距离":
-                    # 统计周期内跑步距离
-                    runs = [r for r in get_fitness_records(user_id) if
-                            r.exercise_type == "跑步" and
-                            goal.start_date <= r.date <= goal.end_date and
-                            r.distance is not None]
-                    total_distance = sum(r.distance for r in runs)
-                    if update_goal_progress(goal.id, user_id, total_distance):
-                        updated_count += 1
-                        
-                elif goal.goal_type == "力量训练次数":
-                    # 统计周期内力量训练次数
-                    strength_workouts = [r for r in get_fitness_records(user_id) if
-                                        r.exercise_type in ["力量训练", "举重", "俯卧撑", "深蹲"] and
-                                        goal.start_date <= r.date <= goal.end_date]
-                    if update_goal_progress(goal.id, user_id, len(strength_workouts)):
-                        updated_count += 1
-                        
-            except Exception as goal_error:
-                print(f"❌ 更新目标 {goal.id} 进度时出错：{str(goal_error)}")
-                continue
-                
-        print(f"✅ 自动更新目标进度完成，共处理 {updated_count}/{len(goals)} 个目标")
+        print(f"✅ 自动更新目标进度完成，共处理 {total} 个目标，{changed} 个有变化")
                 
     except Exception as e:
         print(f"❌ 自动更新目标进度失败：{str(e)}")
 
+# 全部用户目标进度对账（夜间任务）
+@notifies_write()
+def reconcile_all_goal_progress() -> int:
+    """
+    按锻炼记录重算所有用户全部未完成目标的进度，修正增量更新可能产生的偏差
+    
+    Returns:
+        int: 实际变化的目标数，失败返回-1
+    """
+    try:
+        with db_instance._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE TRANSACTION')
+            try:
+                total, changed = _recompute_goal_progress(conn)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        print(f"✅ 目标进度对账完成：检查 {total} 个未完成目标，修正 {changed} 个")
+        return changed
+    except Exception as e:
+        print(f"❌ 目标进度对账失败：{str(e)}")
+        return -1
+
 
 # 删除锻炼目标
+@notifies_write(lambda a: [a["user_id"]])
 def delete_fitness_goal(goal_id: int, user_id: int) -> bool:
     """
     删除指定的锻炼目标
@@ -436,10 +975,24 @@ def delete_fitness_goal(goal_id: int, user_id: int) -> bool:
         print(f"❌ 删除锻炼目标失败：{str(e)}")
         return False
 
+# 在调用方的事务内，按一条记录递增相关目标进度，返回更新的目标数
+def _apply_record_to_goals(conn, record: FitnessRecord) -> int:
+    cursor = conn.execute(goal_increment_sql(), {
+        "user_id": record.user_id,
+        "day_key": to_day_key(record.date),
+        "exercise_type": record.exercise_type,
+        "duration": record.duration,
+        "distance": record.distance,
+        "calories": record.calories,
+    })
+    return cursor.rowcount
+
 # 基于单个锻炼记录即时更新目标进度
-def update_goals_from_record(user_id: int, exercise_type: str, duration: float, distance: float = None, calories: int = None):
+@notifies_write(lambda a: [a["user_id"]])
+def update_goals_from_record(user_id: int, exercise_type: str, duration: float, distance: float = None,
+                             calories: int = None, date: Optional[datetime] = None):
     """
-    根据新增锻炼记录即时更新相关目标的进度
+    根据新增锻炼记录即时更新相关目标的进度（单条原子UPDATE，不读取目标到Python再写回）
     
     Args:
         user_id: 用户ID
@@ -447,6 +1000,7 @@ def update_goals_from_record(user_id: int, exercise_type: str, duration: float,
         duration: 锻炼时长（分钟）
         distance: 锻炼距离（可选，单位：公里）
         calories: 消耗卡路里（可选）
+        date: 锻炼日期（可选，默认当前时间），只更新周期包含该日期的目标
     """
     # 参数验证
     if user_id is None or user_id <= 0:
@@ -457,42 +1011,14 @@ def update_goals_from_record(user_id: int, exercise_type: str, duration: float,
         print("❌ 锻炼类型不能为空且时长必须大于0")
         return
         
+    record = FitnessRecord(user_id=user_id, date=date or datetime.now(), exercise_type=exercise_type,
+                           duration=duration, distance=distance, calories=calories)
     try:
-        # 获取用户所有未完成目标
-        goals = get_fitness_goals(user_id, include_completed=False)
-        updated_count = 0
-        
-        # 遍历每个目标，判断是否需要更新
-        for goal in goals:
-            try:
-                if goal.goal_type == "每周跑步次数" and exercise_type == "跑步":
-                    # 跑步次数目标，直接将当前进度加1
-                    if update_goal_progress(goal.id, user_id, goal.current_value + 1):
-                        updated_count += 1
-                        
-                elif goal.goal_type == "每周锻炼总时长(分钟)":
-                    # 总时长目标，将当前时长加到现有进度
-                    if update_goal_progress(goal.id, user_id, goal.current_value + duration):
-                        updated_count += 1
-                        
-                elif goal.goal_type == "每月跑步距离" and exercise_type == "跑步" and distance is not None:
-                    # 跑步距离目标，加上本次距离
-                    if update_goal_progress(goal.id, user_id, goal.current_value + distance):
-                        updated_count += 1
-                        
-                elif goal.goal_type == "力量训练次数" and exercise_type in ["力量训练", "举重", "俯卧撑", "深蹲"]:
-                    # 力量训练次数目标，进度加1
-                    if update_goal_progress(goal.id, user_id, goal.current_value + 1):
-                        updated_count += 1
-                        
-                # 其他目标类型可以根据需要继续扩展...
-                
-            except Exception as goal_error:
-                print(f"❌ 基于记录更新目标 {goal.id} 进度时出错：{str(goal_error)}")
-                continue
+        with db_instance._connect() as conn:
+            updated_count = _apply_record_to_goals(conn, record)
                 
         if updated_count > 0:
             print(f"✅ 基于锻炼记录成功更新 {updated_count} 个目标进度")
             
     except Exception as e:
-        print(f"❌ 基于锻炼记录更新目标进度失败：{str(e)}")
\ No newline at end of file
+        print(f"❌ 基于锻炼记录更新目标进度失败：{str(e)}")
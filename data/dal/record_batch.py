@@ -0,0 +1,122 @@
+# data/dal/record_batch.py
+# 列式查询结果：每列一个NumPy数组，直接由游标分块填充，不创建逐行的模型对象
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 可按列读取的字段：(SQL表达式, NumPy类型)
+# date取整数时间戳列ts换算为datetime64[s]（秒级精度）；可能为NULL的数值列统一用float64，NULL为NaN；
+# exercise_type存为分类编码，取值表见RecordBatch.categories
+COLUMN_SPECS: Dict[str, Tuple[str, str]] = {
+    "id": ("id", "int64"),
+    "user_id": ("user_id", "int64"),
+    "date": ("ts", "datetime64[s]"),
+    "exercise_type": ("exercise_type", "category"),
+    "duration": ("duration", "float64"),
+    "distance": ("distance", "float64"),
+    "calories": ("calories", "float64"),
+    "is_official": ("is_official", "bool"),
+    "notes": ("notes", "object"),
+    "is_checkin": ("is_checkin", "bool"),
+    "intensity": ("intensity", "float64"),
+    "recovery_quality": ("recovery_quality", "float64"),
+}
+DEFAULT_COLUMNS = ("date", "exercise_type", "duration", "distance", "calories")
+
+
+def _codes_dtype(n_categories: int) -> np.dtype:
+    # 与pandas分类编码的类型选择一致，转换为Categorical时无需再转换类型（也就不会复制）
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class RecordBatch:
+    """
+    一批锻炼记录的列式表示
+
+    columns: 列名 → NumPy数组（长度相同）；exercise_type列为编码数组，编码对应categories中的取值
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Optional[Dict[str, np.ndarray]] = None):
+        self.columns = columns
+        self.categories = categories or {}
+
+    @classmethod
+    def empty(cls, names: Sequence[str] = DEFAULT_COLUMNS) -> "RecordBatch":
+        return cls.from_chunks(names, [], 0)
+
+    @classmethod
+    def from_chunks(cls, names: Sequence[str], chunks: Iterable[List[tuple]], total: int) -> "RecordBatch":
+        """
+        由游标分块结果填充：预先按总行数分配数组，每块按列转置后整段写入
+
+        :param names: 列名（顺序与查询的SELECT列一致）
+        :param chunks: cursor.fetchmany产出的行块
+        :param total: 总行数（同一读事务内COUNT得到）
+        """
+        dtypes = [COLUMN_SPECS[name][1] for name in names]
+        arrays = [np.empty(total, dtype=np.int64 if dtype in ("category", "datetime64[s]") else dtype)
+                  for dtype in dtypes]
+        lookups = {name: {} for name, dtype in zip(names, dtypes) if dtype == "category"}
+
+        pos = 0
+        for rows in chunks:
+            end = pos + len(rows)
+            for name, array, values in zip(names, arrays, zip(*rows)):
+                lookup = lookups.get(name)
+                if lookup is not None:
+                    values = [lookup.setdefault(value, len(lookup)) for value in values]
+                array[pos:end] = values
+            pos = end
+
+        columns, categories = {}, {}
+        for name, dtype, array in zip(names, dtypes, arrays):
+            array = array[:pos]
+            if dtype == "category":
+                lookup = lookups[name]
+                categories[name] = np.array(list(lookup), dtype=object)
+                array = array.astype(_codes_dtype(len(lookup)))
+            elif dtype == "datetime64[s]":
+                array = array.view("datetime64[s]")
+            columns[name] = array
+        return cls(columns, categories)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns)
+
+    def decode(self, name: str) -> np.ndarray:
+        """分类列还原为取值数组（其他列原样返回）"""
+        if name in self.categories:
+            return self.categories[name][self.columns[name]]
+        return self.columns[name]
+
+    def mask_equals(self, name: str, value) -> np.ndarray:
+        """列等于value的布尔掩码；分类列直接比较编码，不还原字符串"""
+        if name in self.categories:
+            matches = np.flatnonzero(self.categories[name] == value)
+            if len(matches) == 0:
+                return np.zeros(len(self), dtype=bool)
+            return self.columns[name] == matches[0]
+        return self.columns[name] == value
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        转换为DataFrame，各列直接引用本批数组，不复制数据（DataFrame与本批共享内存）
+        """
+        data = {}
+        for name, array in self.columns.items():
+            if name in self.categories:
+                data[name] = pd.Categorical.from_codes(array, categories=self.categories[name], validate=False)
+            else:
+                data[name] = array
+        return pd.DataFrame(data, copy=False)
@@ -0,0 +1,99 @@
+# data/dal/row_mapper.py
+# 查询结果行 → 模型对象的映射：每种(模型, 列清单)只生成一次按元组下标取值的映射函数
+from dataclasses import fields
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from self_health_mis.data.model.exercise_model import FitnessRecord
+from self_health_mis.data.model.goal_model import FitnessGoal
+
+
+# 日期文本重复度很高（表单录入的记录都在当天零点，同一目标的起止日期反复读取），解析结果按文本缓存；
+# datetime不可变，多个对象共享同一实例是安全的
+parse_iso_datetime = lru_cache(maxsize=65536)(datetime.fromisoformat)
+
+# 字段转换函数：字段名 → 转换函数（未列出的字段原样赋值）
+RECORD_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "date": parse_iso_datetime,
+    "is_official": bool,
+    "is_checkin": bool,
+}
+GOAL_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "start_date": parse_iso_datetime,
+    "end_date": parse_iso_datetime,
+    "is_completed": bool,
+}
+
+RECORD_COLUMNS = (
+    "id", "user_id", "date", "exercise_type", "duration", "distance", "calories",
+    "is_official", "notes", "is_checkin", "intensity", "recovery_quality"
+)
+GOAL_COLUMNS = (
+    "id", "user_id", "goal_type", "target_value", "current_value", "start_date", "end_date", "is_completed"
+)
+
+# 模型 → (默认列清单, 字段转换函数)
+_MODELS: Dict[type, Tuple[Tuple[str, ...], Dict[str, Callable[[Any], Any]]]] = {
+    FitnessRecord: (RECORD_COLUMNS, RECORD_CONVERTERS),
+    FitnessGoal: (GOAL_COLUMNS, GOAL_CONVERTERS),
+}
+
+
+def select_columns(model: type) -> str:
+    """模型对应的SELECT列清单（顺序与映射函数的下标一致）"""
+    return ", ".join(_MODELS[model][0])
+
+
+@lru_cache(maxsize=None)
+def get_row_mapper(model: type, columns: Optional[Tuple[str, ...]] = None) -> Callable[[tuple], Any]:
+    """
+    生成把查询结果元组转换为模型对象的函数，形如：
+        def map_row(row): return Model(row[0], row[1], c_date(row[2]), ...)
+    字段名和下标在生成时确定，逐行转换时不再按列名查找；列顺序与模型字段不一致时改用关键字传参
+
+    :param model: 模型类（FitnessRecord / FitnessGoal）
+    :param columns: 查询结果的列顺序，默认为该模型的完整列清单
+    """
+    default_columns, converters = _MODELS[model]
+    columns = columns or default_columns
+    namespace: Dict[str, Any] = {"Model": model}
+    # 列顺序与模型字段顺序一致时按位置传参（比关键字传参更快）
+    field_names = [f.name for f in fields(model)]
+    positional = list(columns) == field_names[:len(columns)]
+    args = []
+    for index, name in enumerate(columns):
+        value = f"row[{index}]"
+        converter = converters.get(name)
+        if converter is not None:
+            namespace[f"c_{name}"] = converter
+            value = f"c_{name}({value})"
+        args.append(value if positional else f"{name}={value}")
+    source = f"def map_row(row):\n    return Model({', '.join(args)})\n"
+    exec(source, namespace)
+    map_row = namespace["map_row"]
+    map_row.__doc__ = source
+    return map_row
+
+
+def map_rows(mapper: Callable[[tuple], Any], rows: Sequence[tuple], label: str) -> List[Any]:
+    """
+    批量转换；正常情况下整批一次完成，只有出现无法解析的行时才逐行重试并跳过坏行
+    """
+    try:
+        return [mapper(row) for row in rows]
+    except Exception:
+        results = []
+        for row in rows:
+            try:
+                results.append(mapper(row))
+            except Exception as parse_error:
+                print(f"❌ 解析{label}时出错：{str(parse_error)}")
+        return results
+
+
+def fetch_tuples(conn, query: str, params: Iterable[Any] = ()) -> List[tuple]:
+    """以普通元组读取查询结果（不经过连接上设置的sqlite3.Row）"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor.execute(query, list(params)).fetchall()
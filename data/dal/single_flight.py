@@ -0,0 +1,137 @@
+# data/dal/single_flight.py
+# 相同读请求合并（single-flight）：并发调用同一读函数且参数相同时，只有第一个调用真正查询数据库，
+# 其余调用等待并共享它的结果；全班同时打开页面、每次rerun重复读取资料/记录/目标时可省去大量重复查询
+import copy
+import functools
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Flight:
+    """一次正在进行的查询"""
+
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+def _copy_result(result: Any) -> Any:
+    """结果的浅拷贝；元组本身不可变（copy.copy返回原对象），改为逐项浅拷贝，如分页结果(rows, cursor)中的列表"""
+    if isinstance(result, tuple):
+        items = [copy.copy(item) for item in result]
+        # 具名元组按字段重建
+        return type(result)(*items) if hasattr(result, "_fields") else tuple(items)
+    return copy.copy(result)
+
+
+class SingleFlight:
+    """
+    按键合并并发调用
+    generation为写入代数：每次写入后加1并参与键的计算，写入之后到达的读请求不会再合并到写入之前开始的查询上
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.generation = 0
+        self.calls = 0
+        self.executed = 0
+        self.deduplicated = 0
+        self.deduplicated_by_name: Counter = Counter()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        执行fn；同一键已有查询在进行时等待其结果
+        每个调用方（含执行查询的调用方）都拿到结果的浅拷贝，不共享同一个列表/DataFrame容器（元组结果拷贝其中各项）
+        """
+        with self._lock:
+            self.calls += 1
+            key = (self.generation, key)
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                leader = True
+                self.executed += 1
+            else:
+                leader = False
+                flight.followers += 1
+                self.deduplicated += 1
+                self.deduplicated_by_name[key[1][0]] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy_result(flight.result)
+
+        try:
+            flight.result = fn()
+            return _copy_result(flight.result)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self) -> None:
+        """数据已写入：之后的读请求开始新的查询"""
+        with self._lock:
+            self.generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """调用次数、实际查询次数、被合并（省去）的查询次数及按函数的明细"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "deduplicated": self.deduplicated,
+                "by_function": dict(self.deduplicated_by_name),
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.calls = self.executed = self.deduplicated = 0
+            self.deduplicated_by_name.clear()
+
+
+# 全局实例（所有DAL模块共用）
+read_flight = SingleFlight()
+
+
+def _freeze(value: Any) -> Hashable:
+    # 列表参数（如列清单）转为元组以便作为键
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _make_key(name: str, args: Tuple, kwargs: Dict[str, Any]) -> Optional[Hashable]:
+    key = (name, _freeze(args), tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def coalesced(fn: Callable) -> Callable:
+    """读函数装饰器：参数相同的并发调用合并为一次查询（参数不可哈希时直接调用）"""
+    # 模块名+限定名：不同模块或类中的同名函数不会被合并
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = _make_key(name, args, kwargs)
+        if key is None:
+            return fn(*args, **kwargs)
+        return read_flight.do(key, lambda: fn(*args, **kwargs))
+
+    return wrapper
+
@@ -0,0 +1,121 @@
+# data/dal/stats_buckets.py
+# 锻炼统计的分桶计算（日/周/ISO周/月/年 × 锻炼类型）及结果缓存
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 统计粒度：week为周一开始的自然周（标签为周一日期），isoweek边界相同、标签为ISO年周（如2025-W03）
+GRANULARITIES = ("day", "week", "isoweek", "month", "year")
+BUCKET_METRICS = ("sessions", "duration", "distance", "calories")
+BUCKET_COLUMNS = ("bucket", "label", "exercise_type") + BUCKET_METRICS
+
+
+def bucket_starts(day_keys: np.ndarray, granularity: str) -> np.ndarray:
+    """
+    天序号（1970-01-01起的天数）向量化换算为所在分桶的起始日期（datetime64[D]）
+    """
+    days = np.asarray(day_keys, dtype="int64").astype("datetime64[D]")
+    if granularity == "day":
+        return days
+    if granularity in ("week", "isoweek"):
+        # 1970-01-01是周四，(day_key + 3) % 7 即周一为0的星期序号
+        return days - ((np.asarray(day_keys, dtype="int64") + 3) % 7).astype("timedelta64[D]")
+    if granularity == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    if granularity == "year":
+        return days.astype("datetime64[Y]").astype("datetime64[D]")
+    raise ValueError(f"不支持的统计粒度: {granularity}（可选：{', '.join(GRANULARITIES)}）")
+
+
+def bucket_labels(starts: pd.DatetimeIndex, granularity: str) -> np.ndarray:
+    """分桶起始日期对应的展示标签"""
+    if granularity == "isoweek":
+        iso = starts.isocalendar()
+        return (iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2)).to_numpy()
+    fmt = {"month": "%Y-%m", "year": "%Y"}.get(granularity, "%Y-%m-%d")
+    return starts.strftime(fmt).to_numpy()
+
+
+def bucketize(rows: Iterable[Tuple], granularity: str) -> pd.DataFrame:
+    """
+    将按(day_key, exercise_type)预聚合的行合并到分桶：(day_key, exercise_type, sessions, duration, distance, calories)
+
+    Returns:
+        DataFrame: 列为BUCKET_COLUMNS，按分桶、锻炼类型排序
+    """
+    rows = list(rows)
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"不支持的统计粒度: {granularity}（可选：{', '.join(GRANULARITIES)}）")
+    if not rows:
+        return pd.DataFrame({column: [] for column in BUCKET_COLUMNS})
+
+    day_keys = np.fromiter((row[0] for row in rows), dtype="int64", count=len(rows))
+    types = np.array([row[1] for row in rows], dtype=object)
+    metrics = np.array([[value or 0 for value in row[2:6]] for row in rows], dtype=float)
+
+    starts = bucket_starts(day_keys, granularity)
+    # 分桶与类型各自编码后组合成一个整数键，一次np.add.at完成分组求和
+    bucket_values, bucket_codes = np.unique(starts, return_inverse=True)
+    type_values, type_codes = np.unique(types.astype(str), return_inverse=True)
+    group_keys, group_codes = np.unique(bucket_codes * len(type_values) + type_codes, return_inverse=True)
+    sums = np.zeros((len(group_keys), len(BUCKET_METRICS)))
+    np.add.at(sums, group_codes, metrics)
+
+    group_starts = pd.DatetimeIndex(bucket_values[group_keys // len(type_values)])
+    df = pd.DataFrame(sums, columns=BUCKET_METRICS)
+    df["sessions"] = df["sessions"].astype(int)
+    df.insert(0, "exercise_type", type_values[group_keys % len(type_values)])
+    df.insert(0, "label", bucket_labels(group_starts, granularity))
+    df.insert(0, "bucket", group_starts)
+    return df
+
+
+def pivot_buckets(df: pd.DataFrame, metric: str = "sessions") -> pd.DataFrame:
+    """分桶结果转为宽表（行为分桶标签，列为锻炼类型），可直接交给st.bar_chart / st.line_chart"""
+    if df.empty:
+        return pd.DataFrame()
+    return (df.pivot_table(index="label", columns="exercise_type", values=metric, aggfunc="sum", sort=False)
+              .fillna(0))
+
+
+class StatsCache:
+    """
+    分桶统计结果缓存（LRU），键中包含数据版本：数据变化后旧版本的结果不再命中，随LRU淘汰
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, pd.DataFrame]" = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        with self._lock:
+            df = self._entries.get(key)
+            if df is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return df
+
+    def put(self, key: Hashable, df: pd.DataFrame) -> None:
+        with self._lock:
+            self._entries[key] = df
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# 全局缓存实例（所有DAL模块共用）
+stats_cache = StatsCache()
@@ -0,0 +1,224 @@
+# data/dal/stats_dal.py
+"""
+按天汇总表daily_user_stats的读取、重建与一致性校验
+汇总表由迁移v6中的触发器在写入锻炼记录的同一事务内维护，看板类汇总直接读取它，不再扫描原始记录。
+
+用法：
+    python -m data.dal.stats_dal --check            # 校验全部用户
+    python -m data.dal.stats_dal --rebuild --user 3 # 重建指定用户
+"""
+import argparse
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+
+from self_health_mis.data.sqlite_conn import db_instance
+from self_health_mis.data.migrate import DAILY_STATS_COLUMNS, DAILY_STATS_AGGREGATE
+from self_health_mis.data.dal.base_dal import to_day_key, day_key_to_date
+from self_health_mis.data.dal.single_flight import coalesced
+from self_health_mis.data.dal.write_events import notifies_write
+
+# 校验时浮点合计允许的误差（增量累加与整体SUM的求和顺序不同）
+TOLERANCE = 1e-6
+
+DAILY_STATS_QUERY = '''
+    SELECT day_key, sessions, duration, distance, calories, max_intensity,
+           CASE WHEN intensity_count > 0 THEN intensity_sum / intensity_count END,
+           CASE WHEN recovery_count > 0 THEN recovery_sum / recovery_count END,
+           checkin
+    FROM daily_user_stats
+    WHERE user_id = ? AND day_key >= ? AND day_key <= ?
+    ORDER BY day_key
+'''
+
+TOTALS_QUERY = '''
+    SELECT COUNT(*), COALESCE(SUM(sessions), 0), COALESCE(SUM(duration), 0),
+           COALESCE(SUM(distance), 0), COALESCE(SUM(calories), 0), COALESCE(SUM(checkin), 0)
+    FROM daily_user_stats
+    WHERE user_id = ? AND day_key >= ? AND day_key <= ?
+'''
+
+DAILY_STATS_FIELDS = ("sessions", "duration", "distance", "calories", "max_intensity",
+                      "intensity", "recovery_quality", "is_checkin")
+
+# 汇总表与原始记录逐行对比：两边任一侧缺失或数值不一致都算不一致
+CHECK_QUERY = f'''
+    WITH expected ({DAILY_STATS_COLUMNS}) AS (
+        {DAILY_STATS_AGGREGATE}
+        WHERE day_key IS NOT NULL {{user_filter}}
+        GROUP BY user_id, day_key
+    ),
+    actual AS (
+        SELECT * FROM daily_user_stats WHERE 1 = 1 {{user_filter}}
+    )
+    SELECT e.user_id, e.day_key, CASE WHEN a.user_id IS NULL THEN 'missing' ELSE 'mismatch' END
+    FROM expected e
+    LEFT JOIN actual a ON a.user_id = e.user_id AND a.day_key = e.day_key
+    WHERE a.user_id IS NULL
+       OR a.sessions != e.sessions
+       OR ABS(a.duration - e.duration) > {TOLERANCE}
+       OR ABS(a.distance - e.distance) > {TOLERANCE}
+       OR ABS(a.calories - e.calories) > {TOLERANCE}
+       OR a.max_intensity IS NOT e.max_intensity
+       OR ABS(a.intensity_sum - e.intensity_sum) > {TOLERANCE}
+       OR a.intensity_count != e.intensity_count
+       OR ABS(a.recovery_sum - e.recovery_sum) > {TOLERANCE}
+       OR a.recovery_count != e.recovery_count
+       OR a.checkin != e.checkin
+    UNION ALL
+    SELECT a.user_id, a.day_key, 'orphan'
+    FROM actual a
+    WHERE NOT EXISTS (SELECT 1 FROM expected e WHERE e.user_id = a.user_id AND e.day_key = a.day_key)
+    ORDER BY 1, 2
+'''
+
+DateLike = Union[date, datetime]
+
+
+def _user_filter(user_id: Optional[int]) -> str:
+    return "AND user_id = ?" if user_id is not None else ""
+
+
+# 重建按天汇总表
+@notifies_write(lambda a: None if a["user_id"] is None else [a["user_id"]])
+def rebuild_daily_stats(user_id: Optional[int] = None) -> int:
+    """
+    由原始锻炼记录重建按天汇总（触发器之外写入数据、或校验发现不一致时使用）
+
+    Args:
+        user_id: 用户ID，None表示全部用户
+
+    Returns:
+        int: 重建后的汇总行数，出错返回-1
+    """
+    params = [user_id] if user_id is not None else []
+    try:
+        with db_instance._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE TRANSACTION')
+            try:
+                conn.execute(f"DELETE FROM daily_user_stats WHERE 1 = 1 {_user_filter(user_id)}", params)
+                cursor = conn.execute(f'''
+                    INSERT INTO daily_user_stats ({DAILY_STATS_COLUMNS})
+                    {DAILY_STATS_AGGREGATE}
+                    WHERE day_key IS NOT NULL {_user_filter(user_id)}
+                    GROUP BY user_id, day_key
+                ''', params)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            print(f"✅ 按天汇总重建完成：{cursor.rowcount} 行")
+            return cursor.rowcount
+    except Exception as e:
+        print(f"❌ 重建按天汇总失败：{str(e)}")
+        return -1
+
+
+# 校验按天汇总表
+def check_daily_stats(user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    对比按天汇总与原始锻炼记录
+
+    Args:
+        user_id: 用户ID，None表示全部用户
+
+    Returns:
+        List[Dict]: 不一致的行，每项含user_id、date、issue（missing缺行 / mismatch数值不一致 / orphan多余行），
+                    一致时为空列表；出错返回None
+    """
+    query = CHECK_QUERY.format(user_filter=_user_filter(user_id))
+    params = [user_id, user_id] if user_id is not None else []
+    try:
+        with db_instance._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [{"user_id": row[0], "date": day_key_to_date(row[1]), "issue": row[2]} for row in rows]
+    except Exception as e:
+        print(f"❌ 校验按天汇总失败：{str(e)}")
+        return None
+
+
+# 获取用户按天汇总（返回DataFrame）
+@coalesced
+def get_daily_stats(user_id: int, start_date: DateLike, end_date: DateLike,
+                    fill_missing: bool = True) -> pd.DataFrame:
+    """
+    读取用户在[start_date, end_date]内每天的汇总，主键范围扫描，与记录条数无关
+
+    Args:
+        user_id: 用户ID
+        start_date / end_date: 日期区间（含两端）
+        fill_missing: 是否补齐没有记录的日期（各项为0，打卡为False）
+
+    Returns:
+        DataFrame: 列为date、sessions、duration、distance、calories、max_intensity、
+                   intensity（平均强度）、recovery_quality（平均恢复质量）、is_checkin；出错返回空DataFrame
+    """
+    start_key, end_key = to_day_key(start_date), to_day_key(end_date)
+    try:
+        with db_instance._connect() as conn:
+            rows = conn.execute(DAILY_STATS_QUERY, (user_id, start_key, end_key)).fetchall()
+    except Exception as e:
+        print(f"❌ 获取按天汇总失败：{str(e)}")
+        return pd.DataFrame()
+
+    df = pd.DataFrame(rows, columns=("day_key",) + DAILY_STATS_FIELDS)
+    if fill_missing:
+        df = (df.set_index("day_key")
+                .reindex(range(start_key, end_key + 1))
+                .rename_axis("day_key")
+                .reset_index())
+        df[list(DAILY_STATS_FIELDS)] = df[list(DAILY_STATS_FIELDS)].fillna(0)
+    df["is_checkin"] = df["is_checkin"].astype(bool)
+    df["sessions"] = df["sessions"].astype(int)
+    df.insert(0, "date", pd.to_datetime([day_key_to_date(k) for k in df.pop("day_key")]))
+    return df
+
+
+# 获取用户汇总合计
+@coalesced
+def get_stats_totals(user_id: int, start_date: Optional[DateLike] = None,
+                     end_date: Optional[DateLike] = None) -> Dict[str, float]:
+    """
+    用户在日期区间内的合计，区间为None时统计全部记录
+
+    Returns:
+        Dict: active_days（有锻炼的天数）、sessions、duration、distance、calories、checkin_days；
+              出错时各项为0
+    """
+    start_key = to_day_key(start_date) if start_date is not None else -2 ** 31
+    end_key = to_day_key(end_date) if end_date is not None else 2 ** 31
+    keys = ("active_days", "sessions", "duration", "distance", "calories", "checkin_days")
+    try:
+        with db_instance._connect() as conn:
+            row = conn.execute(TOTALS_QUERY, (user_id, start_key, end_key)).fetchone()
+        return dict(zip(keys, row))
+    except Exception as e:
+        print(f"❌ 获取汇总合计失败：{str(e)}")
+        return dict.fromkeys(keys, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按天汇总表daily_user_stats维护工具")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--rebuild", action="store_true", help="由原始记录重建汇总")
+    action.add_argument("--check", action="store_true", help="校验汇总与原始记录是否一致")
+    parser.add_argument("--user", type=int, default=None, help="只处理指定用户ID（默认全部用户）")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        raise SystemExit(0 if rebuild_daily_stats(args.user) >= 0 else 1)
+
+    issues = check_daily_stats(args.user)
+    if issues is None:
+        raise SystemExit(1)
+    for issue in issues:
+        print(f"⚠️ 用户 {issue['user_id']} {issue['date']}：{issue['issue']}")
+    if issues:
+        print(f"❌ 发现 {len(issues)} 处不一致，可执行 --rebuild 修复")
+        raise SystemExit(1)
+    print("✅ 按天汇总与原始记录一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 # data/dal/user_dal.py
-from typing import Optional
+from typing import Optional, Dict
 from datetime import datetime
-from data.sqlite_conn import db_instance  # 导入全局数据库实例
-from data.model.user_model import UserProfile
+from self_health_mis.data.sqlite_conn import db_instance  # 导入全局数据库实例
+from self_health_mis.data.model.user_model import UserProfile
+from self_health_mis.data.dal.single_flight import coalesced
+from self_health_mis.data.dal.write_events import notifies_write
 
 # 数据访问层专注于纯数据库操作，业务逻辑应由服务层处理
 
@@ -103,7 +105,18 @@ def login_user(username: str, password: str) -> Optional[int]:
         print(f"❌ 登录异常：{str(e)}")
         return None
 
+# 获取全部用户名到用户ID的映射（批量导入时一次性加载，避免逐行查询）
+def get_user_id_map() -> Dict[str, int]:
+    try:
+        with db_instance._connect() as conn:
+            cursor = conn.execute("SELECT id, username FROM user_accounts")
+            return {row["username"].strip().lower(): row["id"] for row in cursor}
+    except Exception as e:
+        print(f"❌ 获取用户列表失败：{str(e)}")
+        return {}
+
 # 获取个人资料（纯数据库查询）
+@coalesced
 def get_user_profile(user_id: int) -> UserProfile:
     try:
         # 输入参数校验
@@ -142,6 +155,7 @@ def get_user_profile(user_id: int) -> UserProfile:
         return UserProfile(name="默认用户", user_id=user_id, preferred_exercises=[])
 
 # 更新个人资料（纯数据库更新）
+@notifies_write(lambda a: [a["profile"].user_id])
 def update_user_profile(profile: UserProfile) -> bool:
     try:
         # 确保preferred_exercises不为None，防止join操作失败
@@ -0,0 +1,69 @@
+# data/dal/write_events.py
+# DAL写入通知：写函数完成后通知涉及的用户，上层缓存据此只失效这些用户的数据
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from self_health_mis.data.dal.single_flight import read_flight
+
+# 监听函数接收涉及的用户ID集合，None表示可能涉及全部用户
+WriteListener = Callable[[Optional[frozenset]], None]
+
+_lock = threading.Lock()
+_listeners: List[WriteListener] = []
+
+
+def add_write_listener(listener: WriteListener) -> None:
+    with _lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+
+
+def remove_write_listener(listener: WriteListener) -> None:
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def notify_write(user_ids: Optional[Iterable[int]]) -> None:
+    """通知数据已写入：user_ids为涉及的用户，None表示全部用户"""
+    # 写入之后到达的读请求不再合并到写入之前开始的查询上
+    read_flight.invalidate()
+    users = frozenset(user_ids) if user_ids is not None else None
+    with _lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(users)
+        except Exception as e:
+            print(f"❌ 写入通知处理失败：{str(e)}")
+
+
+def notifies_write(users_of: Optional[Callable[[Dict[str, Any]], Optional[Iterable[int]]]] = None) -> Callable:
+    """
+    写函数装饰器：函数返回（或抛出异常）后通知涉及的用户
+
+    :param users_of: 由调用参数（参数名 → 值，已填入默认值）得到涉及的用户ID；为None或取值出错时按全部用户处理
+    """
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                user_ids = None
+                if users_of is not None:
+                    try:
+                        bound = signature.bind(*args, **kwargs)
+                        bound.apply_defaults()
+                        user_ids = users_of(bound.arguments)
+                    except Exception:
+                        user_ids = None
+                notify_write(user_ids)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,487 @@
+# data/migrate.py
+"""
+数据库版本迁移
+以 PRAGMA user_version 记录当前结构版本，按版本号顺序执行尚未应用的迁移步骤。
+每个步骤必须幂等（重复执行不报错、不重复修改），大表回填按rowid或键区间分批提交，
+迁移期间其他连接仍可正常读写。
+
+用法：python -m data.migrate fitness.db [--target 版本号] [--batch-size 5000]
+"""
+import argparse
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Dict, Any, Iterator, Optional, Sequence, Tuple
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection, int], None]
+    # True：整个步骤在一个事务中执行；False：步骤自行分批提交（用于大表回填）
+    transactional: bool = True
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str, transactional: bool = True):
+    """注册一个迁移步骤，版本号必须递增且唯一"""
+    def decorator(func: Callable[[sqlite3.Connection, int], None]):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"重复的迁移版本号: {version}")
+        MIGRATIONS.append(Migration(version, description, func, transactional))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+
+# ========== 迁移工具函数 ==========
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _set_schema_version(conn: sqlite3.Connection, version: int) -> None:
+    # PRAGMA不支持参数绑定，版本号来自代码中的整数常量
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, ddl: str) -> bool:
+    """
+    表中不存在该列时执行 ALTER TABLE ADD COLUMN
+    :param ddl: 列定义，如 "REAL" 或 "BOOLEAN NOT NULL DEFAULT 0"
+    :return: 是否新增了列
+    """
+    if column_exists(conn, table, column):
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+    return True
+
+
+def update_in_batches(conn: sqlite3.Connection, table: str, set_sql: str, where_sql: str = "1",
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    按rowid区间分批执行纯SQL的UPDATE，每批单独提交
+
+    :param set_sql: SET子句内容，如 "day_key = ..."
+    :param where_sql: 额外过滤条件，如 "day_key IS NULL"
+    :return: 实际更新的行数
+    """
+    max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+    updated = 0
+    for low in range(0, max_rowid, batch_size):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                f"UPDATE {table} SET {set_sql} WHERE rowid > ? AND rowid <= ? AND ({where_sql})",
+                (low, low + batch_size)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        updated += cursor.rowcount
+    return updated
+
+
+def key_ranges(conn: sqlite3.Connection, table: str, key_columns: Sequence[str], where_sql: str = "1",
+               batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Tuple[Optional[tuple], Optional[tuple]]]:
+    """
+    按key_columns的索引顺序把表切成约batch_size行一段的键区间，同一键值的行不会跨段
+    每段在上一段处理完后才计算边界，段与段首尾相接，合起来覆盖整个键空间
+
+    :param where_sql: 额外过滤条件，如 "day_key IS NOT NULL"
+    :return: 依次产出(下界, 上界)：下界不含、上界含，None表示该侧无界
+    """
+    keys = ", ".join(key_columns)
+    placeholders = ", ".join("?" * len(key_columns))
+    low = None
+    while True:
+        after = f"({keys}) > ({placeholders})" if low is not None else "1"
+        row = conn.execute(
+            f"SELECT {keys} FROM {table} WHERE ({where_sql}) AND {after} ORDER BY {keys} LIMIT 1 OFFSET ?",
+            (*(low or ()), batch_size - 1)
+        ).fetchone()
+        high = tuple(row) if row is not None else None
+        yield low, high
+        if high is None:
+            return
+        low = high
+
+
+def key_range_sql(key_columns: Sequence[str], low: Optional[tuple], high: Optional[tuple]) -> Tuple[str, tuple]:
+    """把key_ranges产出的区间转换为WHERE条件及参数"""
+    keys = ", ".join(key_columns)
+    placeholders = ", ".join("?" * len(key_columns))
+    conditions, params = ["1"], ()
+    if low is not None:
+        conditions.append(f"({keys}) > ({placeholders})")
+        params += low
+    if high is not None:
+        conditions.append(f"({keys}) <= ({placeholders})")
+        params += high
+    return " AND ".join(conditions), params
+
+
+# 日期文本 → 整数键（与data/dal/base_dal.py中的to_day_key/to_ts结果一致）
+def day_key_sql(column: str) -> str:
+    """天序号：1970-01-01起的天数，取日期文本的前10位（本地日期）"""
+    return f"CAST(julianday(substr({column}, 1, 10)) - 2440587.5 AS INTEGER)"
+
+
+def ts_sql(column: str) -> str:
+    """秒级时间戳：不带时区的时间按字面值换算"""
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+# ========== 迁移步骤（只能追加，不能修改已发布的步骤） ==========
+@migration(1, "fitness_records补充核心指标字段（is_checkin/intensity/recovery_quality）")
+def _add_core_metric_columns(conn: sqlite3.Connection, batch_size: int) -> None:
+    add_column_if_missing(conn, "fitness_records", "is_checkin", "BOOLEAN NOT NULL DEFAULT 0")
+    add_column_if_missing(conn, "fitness_records", "intensity", "REAL")
+    add_column_if_missing(conn, "fitness_records", "recovery_quality", "REAL")
+
+
+@migration(2, "日期增加整数键（fitness_records.day_key/ts，fitness_goals.start_day_key/end_day_key）",
+           transactional=False)
+def _add_time_keys(conn: sqlite3.Connection, batch_size: int) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        add_column_if_missing(conn, "fitness_records", "day_key", "INTEGER")
+        add_column_if_missing(conn, "fitness_records", "ts", "INTEGER")
+        add_column_if_missing(conn, "fitness_goals", "start_day_key", "INTEGER")
+        add_column_if_missing(conn, "fitness_goals", "end_day_key", "INTEGER")
+
+        # 兜底触发器：绕过DAL直接写入的日期（或修改日期）也能得到正确的整数键
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_fitness_records_time_keys_insert
+            AFTER INSERT ON fitness_records
+            WHEN NEW.day_key IS NULL OR NEW.ts IS NULL
+            BEGIN
+                UPDATE fitness_records
+                SET day_key = {day_key_sql("NEW.date")}, ts = {ts_sql("NEW.date")}
+                WHERE id = NEW.id;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_fitness_records_time_keys_update
+            AFTER UPDATE OF date ON fitness_records
+            BEGIN
+                UPDATE fitness_records
+                SET day_key = {day_key_sql("NEW.date")}, ts = {ts_sql("NEW.date")}
+                WHERE id = NEW.id;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_fitness_goals_time_keys_insert
+            AFTER INSERT ON fitness_goals
+            WHEN NEW.start_day_key IS NULL OR NEW.end_day_key IS NULL
+            BEGIN
+                UPDATE fitness_goals
+                SET start_day_key = {day_key_sql("NEW.start_date")},
+                    end_day_key = {day_key_sql("NEW.end_date")}
+                WHERE id = NEW.id;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_fitness_goals_time_keys_update
+            AFTER UPDATE OF start_date, end_date ON fitness_goals
+            BEGIN
+                UPDATE fitness_goals
+                SET start_day_key = {day_key_sql("NEW.start_date")},
+                    end_day_key = {day_key_sql("NEW.end_date")}
+                WHERE id = NEW.id;
+            END
+        ''')
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    # 存量数据分批回填
+    update_in_batches(
+        conn, "fitness_records",
+        f"day_key = {day_key_sql('date')}, ts = {ts_sql('date')}",
+        "day_key IS NULL OR ts IS NULL", batch_size
+    )
+    update_in_batches(
+        conn, "fitness_goals",
+        f"start_day_key = {day_key_sql('start_date')}, end_day_key = {day_key_sql('end_date')}",
+        "start_day_key IS NULL OR end_day_key IS NULL", batch_size
+    )
+
+
+@migration(3, "按热点查询形状建立索引")
+def _create_query_indexes(conn: sqlite3.Connection, batch_size: int) -> None:
+    # get_fitness_records: WHERE user_id=? AND ts BETWEEN ... ORDER BY ts DESC, id DESC（倒序扫描）
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_fitness_records_user_ts
+            ON fitness_records (user_id, ts)
+    ''')
+    # get_exercise_stats: 按day_key过滤的覆盖索引，统计查询无需回表
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_fitness_records_user_day_stats
+            ON fitness_records (user_id, day_key, exercise_type, duration, distance, calories)
+    ''')
+    # get_fitness_goals: WHERE user_id=? AND is_completed=0 ORDER BY end_date
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_fitness_goals_user_open
+            ON fitness_goals (user_id, is_completed, end_date)
+    ''')
+
+
+@migration(4, "核心指标聚合的覆盖索引")
+def _add_core_metrics_index(conn: sqlite3.Connection, batch_size: int) -> None:
+    # calculate_core_metrics: WHERE user_id=? 上的COUNT/SUM/AVG，全部列由索引提供，不回表
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_fitness_records_user_checkin
+            ON fitness_records (user_id, is_checkin, intensity, recovery_quality)
+    ''')
+
+
+# daily_user_stats每天一行的聚合表达式（迁移回填、按天重算触发器、stats_dal重建/校验共用）
+DAILY_STATS_COLUMNS = (
+    "user_id, day_key, sessions, duration, distance, calories, max_intensity, "
+    "intensity_sum, intensity_count, recovery_sum, recovery_count, checkin"
+)
+DAILY_STATS_AGGREGATE = '''
+    SELECT user_id, day_key,
+           COUNT(*), COALESCE(SUM(duration), 0), COALESCE(SUM(distance), 0), COALESCE(SUM(calories), 0),
+           MAX(intensity), COALESCE(SUM(intensity), 0), COUNT(intensity),
+           COALESCE(SUM(recovery_quality), 0), COUNT(recovery_quality), COALESCE(MAX(is_checkin), 0)
+    FROM fitness_records
+'''
+
+
+def _recompute_daily_stats_sql(user_expr: str, day_expr: str) -> str:
+    """触发器内按天重算一行汇总（该天已无记录时只删除）"""
+    return f'''
+                DELETE FROM daily_user_stats WHERE user_id = {user_expr} AND day_key = {day_expr};
+                INSERT INTO daily_user_stats ({DAILY_STATS_COLUMNS})
+                {DAILY_STATS_AGGREGATE}
+                WHERE user_id = {user_expr} AND day_key = {day_expr}
+                GROUP BY user_id, day_key;
+    '''
+
+
+@migration(5, "新增按天汇总表daily_user_stats及维护触发器", transactional=False)
+def _add_daily_user_stats(conn: sqlite3.Connection, batch_size: int) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _create_daily_user_stats(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    # 回填存量数据：按(user_id, day_key)键区间分批，每批在一个事务内删除并重算该区间的汇总行。
+    # 触发器已先生效：某区间回填前的并发写入会被该批重算覆盖，回填后的写入由触发器维护
+    keys = ("user_id", "day_key")
+    for low, high in key_ranges(conn, "fitness_records", keys, "day_key IS NOT NULL", batch_size):
+        range_sql, params = key_range_sql(keys, low, high)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"DELETE FROM daily_user_stats WHERE {range_sql}", params)
+            conn.execute(f'''
+                INSERT INTO daily_user_stats ({DAILY_STATS_COLUMNS})
+                {DAILY_STATS_AGGREGATE}
+                WHERE day_key IS NOT NULL AND {range_sql}
+                GROUP BY user_id, day_key
+            ''', params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _create_daily_user_stats(conn: sqlite3.Connection) -> None:
+    """建表及维护触发器"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_user_stats (
+            user_id INTEGER NOT NULL,
+            day_key INTEGER NOT NULL,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            duration REAL NOT NULL DEFAULT 0,
+            distance REAL NOT NULL DEFAULT 0,
+            calories REAL NOT NULL DEFAULT 0,
+            max_intensity REAL,
+            intensity_sum REAL NOT NULL DEFAULT 0,
+            intensity_count INTEGER NOT NULL DEFAULT 0,
+            recovery_sum REAL NOT NULL DEFAULT 0,
+            recovery_count INTEGER NOT NULL DEFAULT 0,
+            checkin INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day_key)
+        ) WITHOUT ROWID
+    ''')
+    # 新增记录：在同一事务内累加到当天的汇总行（day_key尚未生成时由下面的更新触发器处理）
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_daily_user_stats_insert
+        AFTER INSERT ON fitness_records
+        WHEN NEW.day_key IS NOT NULL
+        BEGIN
+            INSERT INTO daily_user_stats ({DAILY_STATS_COLUMNS})
+            VALUES (NEW.user_id, NEW.day_key, 1, COALESCE(NEW.duration, 0), COALESCE(NEW.distance, 0),
+                    COALESCE(NEW.calories, 0), NEW.intensity, COALESCE(NEW.intensity, 0),
+                    NEW.intensity IS NOT NULL, COALESCE(NEW.recovery_quality, 0),
+                    NEW.recovery_quality IS NOT NULL, COALESCE(NEW.is_checkin, 0))
+            ON CONFLICT (user_id, day_key) DO UPDATE SET
+                sessions = sessions + 1,
+                duration = duration + excluded.duration,
+                distance = distance + excluded.distance,
+                calories = calories + excluded.calories,
+                max_intensity = MAX(COALESCE(max_intensity, excluded.max_intensity),
+                                    COALESCE(excluded.max_intensity, max_intensity)),
+                intensity_sum = intensity_sum + excluded.intensity_sum,
+                intensity_count = intensity_count + excluded.intensity_count,
+                recovery_sum = recovery_sum + excluded.recovery_sum,
+                recovery_count = recovery_count + excluded.recovery_count,
+                checkin = MAX(checkin, excluded.checkin);
+        END
+    ''')
+    # 修改/删除记录：最大值等无法增量回退，按涉及的天从原始记录重算
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_daily_user_stats_update
+        AFTER UPDATE OF user_id, day_key, duration, distance, calories, intensity, recovery_quality, is_checkin
+        ON fitness_records
+        BEGIN
+            {_recompute_daily_stats_sql("OLD.user_id", "OLD.day_key")}
+            {_recompute_daily_stats_sql("NEW.user_id", "NEW.day_key")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_daily_user_stats_delete
+        AFTER DELETE ON fitness_records
+        BEGIN
+            {_recompute_daily_stats_sql("OLD.user_id", "OLD.day_key")}
+        END
+    ''')
+
+
+# 带user_id列、写入后需要让各进程缓存失效的表
+DATA_VERSION_TABLES = ("fitness_records", "fitness_goals", "user_profile")
+
+
+def _bump_data_version_sql(user_expr: str, where: str = "") -> str:
+    """触发器内把用户的数据版本加1（该用户还没有版本行时插入版本1）"""
+    return f'''
+                INSERT INTO data_versions (user_id, version)
+                SELECT {user_expr}, 1 WHERE {user_expr} IS NOT NULL {where}
+                ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    '''
+
+
+@migration(6, "新增按用户数据版本表data_versions及维护触发器")
+def _add_data_versions(conn: sqlite3.Connection, batch_size: int) -> None:
+    # 与写入在同一事务内递增，多个进程共用同一数据库时，缓存只需比对一次主键读取即可判断是否过期
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table in DATA_VERSION_TABLES:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_data_version_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                {_bump_data_version_sql("NEW.user_id")}
+            END
+        ''')
+        # 修改时旧用户、新用户都加1（user_id未变时只加一次）
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_data_version_update
+            AFTER UPDATE ON {table}
+            BEGIN
+                {_bump_data_version_sql("OLD.user_id")}
+                {_bump_data_version_sql("NEW.user_id", "AND NEW.user_id IS NOT OLD.user_id")}
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_data_version_delete
+            AFTER DELETE ON {table}
+            BEGIN
+                {_bump_data_version_sql("OLD.user_id")}
+            END
+        ''')
+
+
+@migration(7, "新增文件导入进度表import_progress")
+def _add_import_progress(conn: sqlite3.Connection, batch_size: int) -> None:
+    # 与每块记录在同一事务内更新：断点文件未来得及保存时，据此判断哪些行已经提交
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS import_progress (
+            source TEXT PRIMARY KEY,
+            rows_done INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+
+
+# ========== 迁移执行 ==========
+def migrate(db_path: str, target: Optional[int] = None,
+            batch_size: int = DEFAULT_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    将数据库升级到target版本（默认最新）
+
+    :param db_path: 数据库文件路径
+    :param target: 目标版本号，None表示全部迁移
+    :param batch_size: 分批回填时每批的行数
+    :return: 本次执行的步骤报告列表 [{"version", "description", "seconds"}]
+    """
+    # isolation_level=None：由迁移代码显式控制事务边界
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    report = []
+    try:
+        current = get_schema_version(conn)
+        pending = [m for m in MIGRATIONS
+                   if m.version > current and (target is None or m.version <= target)]
+        for step in pending:
+            started = time.perf_counter()
+            print(f"🛠️ 开始迁移 v{step.version}：{step.description}")
+            if step.transactional:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    step.apply(conn, batch_size)
+                    _set_schema_version(conn, step.version)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            else:
+                step.apply(conn, batch_size)
+                _set_schema_version(conn, step.version)
+            seconds = time.perf_counter() - started
+            print(f"⏱️ 迁移 v{step.version} 完成，用时 {seconds:.3f} 秒")
+            report.append({"version": step.version, "description": step.description, "seconds": seconds})
+        return report
+    except Exception as e:
+        print(f"❌ 数据库迁移失败：{str(e)}")
+        raise
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="执行数据库结构迁移")
+    parser.add_argument("db_path", help="数据库文件路径，如 fitness.db")
+    parser.add_argument("--target", type=int, default=None, help="目标版本号（默认最新）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="分批回填的每批行数")
+    args = parser.parse_args()
+
+    report = migrate(args.db_path, target=args.target, batch_size=args.batch_size)
+    if not report:
+        print("✅ 数据库已是最新版本，无需迁移")
+    else:
+        total = sum(item["seconds"] for item in report)
+        print(f"✅ 共执行 {len(report)} 个迁移步骤，总用时 {total:.3f} 秒")
+
+
+if __name__ == "__main__":
+    main()
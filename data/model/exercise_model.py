@@ -1,12 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
 
-@dataclass
+# slots=True：实例不带__dict__，会话中缓存大量记录时内存更省（见benchmarks/bench_model_memory.py）
+@dataclass(slots=True)
 class FitnessRecord:
     id: Optional[int] = None
     user_id: Optional[int] = None
-    date: datetime = datetime.now()
+    date: datetime = field(default_factory=datetime.now)  # 每次创建时取当前时间，而非导入模块时的时间
     exercise_type: str = ""
     duration: float = 0.0
     distance: Optional[float] = None
@@ -1,14 +1,14 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class FitnessGoal:
     id: Optional[int] = None
     user_id: Optional[int] = None
     goal_type: str = ""
     target_value: float = 0.0
     current_value: float = 0.0
-    start_date: datetime = datetime.now()
-    end_date: datetime = datetime.now()
-    is_completed: bool = False
\ No newline at end of file
+    start_date: datetime = field(default_factory=datetime.now)
+    end_date: datetime = field(default_factory=datetime.now)
+    is_completed: bool = False
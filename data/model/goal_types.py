@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# 目标可统计的指标：count为记录条数，其余为对应字段求和
+GOAL_METRICS = ("count", "duration", "distance", "calories")
+
+
+@dataclass(frozen=True)
+class GoalType:
+    name: str                                        # 目标类型名称（即fitness_goals.goal_type）
+    metric: str                                      # 统计指标，取值见GOAL_METRICS
+    exercise_types: Optional[Tuple[str, ...]] = None # 计入的锻炼类型，None表示全部类型
+    window_days: int = 30                            # 默认统计周期（天），用于新建目标时的默认结束日期
+    unit: str = ""                                   # 目标值单位（页面展示用）
+
+    def __post_init__(self):
+        if self.metric not in GOAL_METRICS:
+            raise ValueError(f"不支持的目标统计指标: {self.metric}")
+
+
+# 目标类型注册表：新增目标类型只需在此登记，进度计算的SQL由DAL层统一生成
+_REGISTRY: Dict[str, GoalType] = {}
+_version = 0
+
+
+def register_goal_type(goal_type: GoalType) -> GoalType:
+    global _version
+    _REGISTRY[goal_type.name] = goal_type
+    _version += 1
+    return goal_type
+
+
+def get_goal_type(name: str) -> Optional[GoalType]:
+    return _REGISTRY.get(name)
+
+
+def get_goal_types() -> List[GoalType]:
+    return list(_REGISTRY.values())
+
+
+def registry_version() -> int:
+    # 注册表每次变化版本号加1，DAL据此判断是否需要重新生成SQL
+    return _version
+
+
+STRENGTH_EXERCISES = ("力量训练", "举重", "俯卧撑", "深蹲")
+
+register_goal_type(GoalType("每周跑步次数", "count", ("跑步",), window_days=7, unit="次"))
+register_goal_type(GoalType("每周锻炼总时长(分钟)", "duration", None, window_days=7, unit="分钟"))
+register_goal_type(GoalType("每月跑步距离", "distance", ("跑步",), window_days=30, unit="公里"))
+register_goal_type(GoalType("力量训练次数", "count", STRENGTH_EXERCISES, window_days=30, unit="次"))
@@ -2,7 +2,7 @@ import dataclasses
 from dataclasses import dataclass
 from typing import List, Optional
 
-@dataclass
+@dataclass(slots=True)
 class UserProfile:
     id: Optional[int] = None
     user_id: Optional[int] = None
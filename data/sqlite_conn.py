@@ -1,33 +1,316 @@
 import sqlite3
 import hashlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 import pandas as pd
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict, Any, Iterator
 
 from self_health_mis.data.model.user_model import UserProfile
 from self_health_mis.data.model.exercise_model import FitnessRecord
 from self_health_mis.data.model.goal_model import FitnessGoal
+from self_health_mis.data.migrate import migrate
+from self_health_mis.config.settings import (
+    SQLITE_PROFILES, SQLITE_PROFILE, DB_POOL_SIZE, DB_ACQUIRE_TIMEOUT
+)
 
 
-class SQLiteDatabase:
-    def __init__(self, db_name: str = "fitness_db.sqlite"):
+class PoolTimeoutError(sqlite3.OperationalError):
+    """在acquire_timeout内未能从连接池取得连接"""
+    pass
+
+
+class QueryCounter:
+    """
+    按线程统计执行的SQL语句数（不含事务控制语句和触发器内的语句）
+    连接池中的连接都注册了trace回调，回调在执行语句的线程中调用；Streamlit每次rerun在各自的线程中执行脚本，
+    rerun开始时reset()，结束时count()即为本次rerun发出的查询数
+    """
+
+    _SKIPPED_PREFIXES = ("BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE", "--")
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def record(self, statement: str) -> None:
+        if statement.lstrip().upper().startswith(self._SKIPPED_PREFIXES):
+            return
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    def reset(self) -> None:
+        self._local.count = 0
+
+    def count(self) -> int:
+        return getattr(self._local, "count", 0)
+
+
+# 全局实例（所有连接池共用）
+query_counter = QueryCounter()
+
+
+class ConnectionPool:
+    """
+    SQLite有界连接池
+    复用已打开的连接，避免每次查询都重新connect；连接数达到上限时等待归还，
+    超过acquire_timeout抛出PoolTimeoutError
+    """
+
+    def __init__(self, db_name: str, max_size: int = 5, acquire_timeout: float = 10.0,
+                 health_check_interval: float = 30.0, pragmas: Optional[Dict[str, Any]] = None):
+        """
+        :param db_name: 数据库文件路径
+        :param max_size: 最大连接数（含空闲和借出）
+        :param acquire_timeout: 等待可用连接的最长秒数
+        :param health_check_interval: 空闲超过该秒数的连接在借出前先做一次SELECT 1检查
+        :param pragmas: 每个新连接建立后执行的PRAGMA（按字典顺序执行）
+        """
+        if max_size < 1:
+            raise ValueError("连接池大小必须大于0")
         self.db_name = db_name
-        self._create_tables()  # 初始化表（含新增字段）
-        print(f"✅ 数据库初始化完成，文件路径：{self.db_name}")
+        self.pragmas = dict(pragmas or {})
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
 
-    def _connect(self):
+        self._idle = deque()  # (连接, 上次归还时间)，后进先出以保持热连接
+        self._created = 0  # 当前存活的物理连接数
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # 统计计数器（用于评估连接池大小）
+        self._hits = 0  # 直接复用空闲连接
+        self._misses = 0  # 新建物理连接
+        self._waits = 0  # 因连接池已满而等待
+        self._wait_time = 0.0  # 累计等待秒数
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._health_check_failures = 0
+
+    def _new_connection(self) -> sqlite3.Connection:
         try:
-            conn = sqlite3.connect(self.db_name)
+            # 连接会在不同线程间复用（同一时刻只被一个线程持有），需关闭线程检查
+            busy_timeout = self.pragmas.get("busy_timeout", 5000)
+            conn = sqlite3.connect(self.db_name, timeout=busy_timeout / 1000,
+                                   check_same_thread=False)
             conn.row_factory = sqlite3.Row  # 让查询结果支持字典式访问
+            for name, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+            conn.set_trace_callback(query_counter.record)
             print(f"🔌 数据库连接成功")
             return conn
         except Exception as e:
             print(f"❌ 数据库连接失败：{str(e)}")
             raise
 
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        """借出一个连接，优先复用空闲连接"""
+        deadline = None
+        wait_started = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("连接池已关闭")
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    if (time.monotonic() - released_at > self.health_check_interval
+                            and not self._is_healthy(conn)):
+                        self._health_check_failures += 1
+                        self._created -= 1
+                        self._close_quietly(conn)
+                        continue
+                    self._hits += 1
+                    break
+                if self._created < self.max_size:
+                    self._created += 1
+                    self._misses += 1
+                    conn = None
+                    break
+
+                # 连接池已满，等待其他线程归还
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + self.acquire_timeout
+                    wait_started = now
+                    self._waits += 1
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._timeouts += 1
+                    self._record_wait(now - wait_started)
+                    raise PoolTimeoutError(
+                        f"等待数据库连接超时（{self.acquire_timeout}秒，连接池大小{self.max_size}）"
+                    )
+                self._cond.wait(remaining)
+
+            if wait_started is not None:
+                self._record_wait(time.monotonic() - wait_started)
+
+        if conn is None:
+            # 在锁外创建物理连接，避免阻塞其他线程
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False) -> None:
+        """归还连接；残留的未提交事务会被回滚，discard=True时直接关闭"""
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                discard = True
+        with self._cond:
+            if discard or self._closed:
+                self._created -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        与 `with sqlite3.connect(...) as conn` 相同的语义：
+        正常退出时提交、异常时回滚，随后把连接归还连接池
+        """
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def discard_idle(self) -> None:
+        """关闭当前所有空闲连接（如表结构变更后），之后按需重新建立"""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._created -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def close_all(self) -> None:
+        """关闭所有空闲连接，借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._created -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回连接池命中/未命中及等待时间统计"""
+        with self._cond:
+            acquisitions = self._hits + self._misses
+            return {
+                "max_size": self.max_size,
+                "open": self._created,
+                "idle": len(self._idle),
+                "in_use": self._created - len(self._idle),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / acquisitions, 4) if acquisitions else 0.0,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "total_wait_time": round(self._wait_time, 6),
+                "avg_wait_time": round(self._wait_time / self._waits, 6) if self._waits else 0.0,
+                "max_wait_time": round(self._max_wait_time, 6),
+                "health_check_failures": self._health_check_failures,
+            }
+
+    def _record_wait(self, waited: float) -> None:
+        self._wait_time += waited
+        self._max_wait_time = max(self._max_wait_time, waited)
+
+    @staticmethod
+    def _close_quietly(conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def get_sqlite_profile(name: str) -> Dict[str, Any]:
+    """
+    按名称获取SQLite调优配置（见config/settings.py）
+    :param name: 配置名称，如"safe"、"throughput"
+    :return: PRAGMA名称到取值的字典
+    """
+    try:
+        return dict(SQLITE_PROFILES[name])
+    except KeyError:
+        raise ValueError(f"未知的SQLite配置: {name}，可选值: {list(SQLITE_PROFILES)}") from None
+
+
+class SQLiteDatabase:
+    def __init__(self, db_name: str = "fitness_db.sqlite", pool_size: Optional[int] = None,
+                 acquire_timeout: Optional[float] = None, profile: Optional[str] = None):
+        self.db_name = db_name
+        self.profile = profile or SQLITE_PROFILE
+        self._pool = ConnectionPool(
+            db_name,
+            max_size=pool_size or DB_POOL_SIZE,
+            acquire_timeout=acquire_timeout if acquire_timeout is not None else DB_ACQUIRE_TIMEOUT,
+            pragmas=get_sqlite_profile(self.profile),
+        )
+        # 建表和迁移推迟到第一次借出连接时执行：仅导入模块（如测试）不会打开或修改数据库文件
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def initialize(self) -> None:
+        """建表并按版本迁移（首次借出连接时自动执行，也可在启动时显式调用；重复调用无副作用）"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            self._create_tables()  # 初始化表（含新增字段）
+            if migrate(self.db_name):  # 按版本升级已有数据库（补充字段、索引等）
+                self._pool.discard_idle()  # 迁移前打开的连接可能持有旧的表结构缓存
+            self._initialized = True
+        print(f"✅ 数据库初始化完成，文件路径：{self.db_name}，调优配置：{self.profile}")
+
+    def _connect(self):
+        """
+        从连接池借出一个连接（上下文管理器）
+        用法与原来一致：`with db._connect() as conn:`，退出时提交/回滚并归还连接
+        """
+        self.initialize()
+        return self._pool.connection()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """连接池统计：命中/未命中、等待次数与等待时间"""
+        return self._pool.get_stats()
+
+    def close(self) -> None:
+        """关闭连接池中的所有连接"""
+        self._pool.close_all()
+
     def _create_tables(self):
         try:
-            with self._connect() as conn:
+            # 在initialize()内执行，直接使用连接池（不经过_connect，避免再次触发初始化）
+            with self._pool.connection() as conn:
                 # 1. 用户账户表（不变）
                 conn.execute('''
                              CREATE TABLE IF NOT EXISTS user_accounts
@@ -243,34 +526,40 @@ class SQLiteDatabase:
             raise
 
     # ========== 新增：计算核心指标 ==========
+    # 一次聚合查询得到全部核心指标，由idx_fitness_records_user_checkin覆盖索引满足
+    CORE_METRICS_QUERY = '''
+        SELECT
+            COUNT(*) AS total_records,
+            COUNT(CASE WHEN is_checkin = 1 AND intensity IS NOT NULL AND recovery_quality IS NOT NULL
+                       THEN 1 END) AS checkin_days,
+            AVG(CASE WHEN is_checkin = 1 AND intensity IS NOT NULL AND recovery_quality IS NOT NULL
+                     THEN intensity END) AS avg_intensity,
+            AVG(CASE WHEN is_checkin = 1 AND intensity IS NOT NULL AND recovery_quality IS NOT NULL
+                     THEN recovery_quality END) AS avg_recovery
+        FROM fitness_records
+        WHERE user_id = ?
+    '''
+
     def calculate_core_metrics(self, user_id: int) -> Tuple[int, float, float, float]:
         """
         计算指定用户的健身核心指标
         :param user_id: 用户ID
         :return: (总打卡天数, 平均强度, 平均恢复质量, 周打卡率)
         """
-        # 1. 获取用户健身记录DataFrame
-        fitness_df = self.get_user_fitness_records(user_id)
+        with self._connect() as conn:
+            row = conn.execute(self.CORE_METRICS_QUERY, (user_id,)).fetchone()
 
-        # 2. 空数据保护（无记录时直接返回0）
-        if len(fitness_df) == 0:
+        # 空数据保护（无记录时直接返回0）
+        total_records = row["total_records"]
+        if total_records == 0:
             print(f"⚠️ 用户{user_id}无健身记录，核心指标默认返回0")
             return 0, 0.0, 0.0, 0.0
 
-        # 3. 筛选有效打卡记录（过滤空值）
-        checkin_df = fitness_df[fitness_df["is_checkin"]].dropna(
-            subset=["intensity", "recovery_quality"]
-        )
-        total_checkin_days = checkin_df.shape[0]
-
-        # 4. 计算平均强度（空值保护）
-        avg_intensity = checkin_df["intensity"].mean().round(1) if not checkin_df.empty else 0.0
-
-        # 5. 计算平均恢复质量（空值保护）
-        avg_recovery = checkin_df["recovery_quality"].mean().round(1) if not checkin_df.empty else 0.0
-
-        # 6. 计算周打卡率（分母保护，避免除以0）
-        weekly_checkin_rate = (total_checkin_days / len(fitness_df) * 100).round(1)
+        # 有效打卡记录：已打卡且强度、恢复质量均不为空；无有效打卡时AVG为NULL
+        total_checkin_days = row["checkin_days"]
+        avg_intensity = round(row["avg_intensity"], 1) if row["avg_intensity"] is not None else 0.0
+        avg_recovery = round(row["avg_recovery"], 1) if row["avg_recovery"] is not None else 0.0
+        weekly_checkin_rate = round(total_checkin_days / total_records * 100, 1)
 
         print(f"""
         📈 用户{user_id}核心指标计算完成：
@@ -282,5 +571,5 @@ class SQLiteDatabase:
         return total_checkin_days, avg_intensity, avg_recovery, weekly_checkin_rate
 
 
-# 创建数据库实例（修改为fitness.db，和你的项目路径一致）
+# 创建数据库实例（修改为fitness.db，和你的项目路径一致）；首次使用时才建表和迁移
 db_instance = SQLiteDatabase(db_name="fitness.db")
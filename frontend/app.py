@@ -14,10 +14,13 @@ package_path = os.path.join(root_dir, "self_health_mis")
 
 dal_path = os.path.join(package_path, "data", "dal", "exercise_dal.py")
 
-from self_health_mis.data.dal.exercise_dal import add_fitness_record
+from self_health_mis.data.dal.exercise_dal import add_fitness_record, get_exercise_stats
+from self_health_mis.data.dal.stats_buckets import pivot_buckets
 from self_health_mis.data.model.exercise_model import FitnessRecord
+from self_health_mis.core.data_context import DASHBOARD_DAYS
 
 import pandas as pd
+import numpy as np
 from datetime import datetime, date, timedelta
 from self_health_mis.core.exercise_service import add_user_exercise_record,ExerciseServiceError, ValidationError, DatabaseError
 import time
@@ -35,6 +38,7 @@ from self_health_mis.frontend import session_state
 from session_state import SessionState
 
 from components.data_display import process_ai_response
+from components.heatmap import get_heatmap_image
 
 # 创建会话状态管理器实例
 session_manager = SessionState()
@@ -244,7 +248,7 @@ def render_achievement_tab(fitness_df):
 
 
 import random
-def render_visualization_tab(fitness_df):
+def render_visualization_tab(fitness_df, user_id):
     # 1. 核心指标卡片（Metric）
     st.write("### 核心指标概览")
     col1, col2, col3, col4 = st.columns(4)
@@ -296,106 +300,16 @@ def render_visualization_tab(fitness_df):
     col1, col2 = st.columns([3,1])
     with col2:
         with st.expander("打卡日历热力图"):
-                fitness_df['date'] = pd.to_datetime(fitness_df['date'])  # 确保日期格式正确
-                heatmap_data = fitness_df.set_index('date')['intensity']
-
-                # 空数据保护：若所有强度为0/空，生成提示
-                if heatmap_data.sum() == 0:
-                    st.info("暂无运动强度数据，无法生成热力图")
-                else:
-                    # 1. 自定义红色系配色（无需norm，直接定义渐变映射）
-                    import matplotlib.colors as mcolors
-                    import numpy as np
-
-                    # 定义颜色节点：0→浅灰 | 5→浅红 | 10→深红（自动渐变）
-                    color_list = [
-                        (0.0, '#f5f5f5'),  # 强度0：浅灰（未打卡）
-                        (0.1, '#fee2e2'),  # 强度1：极浅红
-                        (0.2, '#fecaca'),  # 强度2：浅红
-                        (0.3, '#fca5a5'),  # 强度3：淡红
-                        (0.4, '#f87171'),  # 强度4：橘红
-                        (0.5, '#ef4444'),  # 强度5：亮红（临界点）
-                        (0.6, '#dc2626'),  # 强度6：深红
-                        (0.7, '#b91c1c'),  # 强度7：暗红
-                        (0.8, '#991b1b'),  # 强度8：更深红
-                        (0.9, '#7f1d1d'),  # 强度9：酒红
-                        (1.0, '#4b0000')  # 强度10：暗酒红（最高强度）
-                    ]
-                    # 创建线性渐变配色（自动适配0-10的数值范围）
-                    cmap = mcolors.LinearSegmentedColormap.from_list('custom_red', color_list)
-
-                    # 2. 获取数据包含的月份列表（用于下拉选择）
-                    available_months = sorted(heatmap_data.index.month.unique())
-                    month_names = {1: '1月', 2: '2月', 3: '3月', 4: '4月', 5: '5月', 6: '6月',
-                                7: '7月', 8: '8月', 9: '9月', 10: '10月', 11: '11月', 12: '12月'}
-                    # 下拉选择框（显示中文月份）
-                    selected_month_num = st.selectbox(
-                        "选择月份",
-                        options=available_months,
-                        format_func=lambda x: month_names[x],  # 显示中文
-                        index=len(available_months) - 1  # 默认选最新月份
-                    )
-                    target_year = heatmap_data.index.max().year  # 数据所在年份
-
-                    # 3. 过滤出「选中年份+月份」的数据集（仅保留该月数据）
-                    filtered_data = heatmap_data[
-                        (heatmap_data.index.year == target_year) &
-                        (heatmap_data.index.month == selected_month_num)
-                        ]
-
-                    # 4. 补全该月所有日期（避免缺失日期导致热力图不完整）
-                    month_start = pd.Timestamp(year=target_year, month=selected_month_num, day=1)
-                    month_end = (month_start + pd.offsets.MonthEnd(1))
-                    full_dates = pd.date_range(start=month_start, end=month_end, freq='D')
-                    full_series = pd.Series(pd.NA, index=full_dates, name='intensity')  # 初始化全NaN序列
-                    # 合并真实数据（先填充有效数据，再补0）
-                    combined_data = full_series.fillna(filtered_data).fillna(0)
-
-                    # 核心修正：重新计算当月周数（避免超大数）
-                    combined_data = combined_data.reset_index()
-                    combined_data.columns = ['date', 'intensity']
-                    combined_data['weekday'] = combined_data['date'].dt.weekday  # 0=周一，6=周日
-                    combined_data['day_of_month'] = combined_data['date'].dt.day
-                    combined_data['week_of_month'] = (combined_data['day_of_month'] - 1) // 7 + 1
-
-                    # 数值保护：限制max_week在1-6之间（当月最多6周）
-                    max_week = combined_data['week_of_month'].max()
-                    max_week = min(max_week, 6)  # 强制上限6，避免异常值
-                    if max_week < 1:
-                        max_week = 1  # 保底至少1周
-
-                    # 填充网格（行数=7行（周一到周日），列数=当月最大周数）
-                    heatmap_grid = np.zeros((7, max_week))  # 7行×最多6列
-                    for _, row in combined_data.iterrows():
-                        y = row['weekday']  # 行：周一=0，周日=6
-                        x = row['week_of_month'] - 1  # 列：从0开始
-                        # 边界保护：防止x/y超出网格范围
-                        if 0 <= x < max_week and 0 <= y < 7:
-                            heatmap_grid[y, x] = row['intensity']
-
-                    # ---------------------- 5. 绘制单月热力图（XY轴调换+缩小尺寸） ----------------------
-                    # 关键1：缩小画布尺寸（原(max_week*1.2,7) → 新(max_week*1, 4)，更紧凑）
-                    fig, ax = plt.subplots(figsize=(max_week * 0.5, 1.2))
-
-                    # 关键2：网格转置（heatmap_grid.T）实现XY轴调换
-                    im = ax.imshow(heatmap_grid.T, cmap=cmap, aspect='auto')
-
-                    # 关键3：调整刻度/标签适配新轴方向
-                    ax.set_xticks(range(7))  # X轴：星期（原Y轴）
-                    ax.set_xticklabels(['一', '二', '三', '四', '五', '六', '日'], fontsize=4)  # 缩小标签字体
-                    ax.set_yticks(range(max_week))  # Y轴：周数（原X轴）
-                    ax.set_yticklabels([f'第{i + 1}周' for i in range(max_week)], fontsize=4)  # 缩小标签字体
-                    ax.set_title(f'{target_year}年{selected_month_num}月', fontsize=6, pad=10)  # 缩小标题字体
-
-                    # 隐藏边框+调整间距
-                    ax.spines['top'].set_visible(False)
-                    ax.spines['right'].set_visible(False)
-                    ax.spines['bottom'].set_visible(False)
-                    ax.spines['left'].set_visible(False)
-                    plt.tight_layout()
-
-                    # 显示热力图
-                    st.pyplot(fig)
+            # 当年已过去的月份及全年视图（None表示全年）
+            today = date.today()
+            month_options = list(range(1, today.month + 1)) + [None]
+            selected_month = st.selectbox(
+                "选择月份",
+                options=month_options,
+                format_func=lambda m: "全年" if m is None else f"{m}月",
+                index=today.month - 1  # 默认当前月份
+            )
+            render_checkin_heatmap(user_id, today.year, selected_month)
     with col1:
         # 3. 强度+恢复质量双Y轴图
         with st.expander("锻炼强度 vs 恢复质量趋势（近30天）"):
@@ -460,13 +374,15 @@ def render_visualization_tab(fitness_df):
                     height=300
                 )
 
-    # 5. 锻炼类型分布分析
+    # 5. 锻炼类型分布分析（近30天分桶统计按类型合计）
+    month_stats = get_exercise_stats(user_id, "month")
     with st.expander("锻炼类型分布"):
         col1, col2 = st.columns(2)
         
+        exercise_type_counts = (month_stats.groupby("exercise_type")["sessions"].sum().sort_values(ascending=False)
+                                if not month_stats.empty else pd.Series(dtype=int))
         # 锻炼类型分布饼图
         with col1:
-            exercise_type_counts = checkin_df["exercise_type"].value_counts()
             if not exercise_type_counts.empty:
                 fig, ax = plt.subplots(figsize=(8, 6))
                 ax.pie(exercise_type_counts.values, labels=exercise_type_counts.index, autopct='%1.1f%%', startangle=90)
@@ -503,22 +419,24 @@ def render_visualization_tab(fitness_df):
         else:
             st.info("暂无锻炼强度数据")
     
-    # 7. 周打卡趋势图
-    with st.expander("周打卡率趋势"):
-        if not checkin_df.empty:
-            # 添加周数列
-            checkin_df['week'] = checkin_df['date'].dt.isocalendar().week
-            week_counts = checkin_df.groupby('week').size()
-            
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.plot(week_counts.index, week_counts.values, marker='o', color='#3498db', linewidth=2)
-            ax.set_xlabel('周数')
-            ax.set_ylabel('打卡天数')
-            ax.set_title('周打卡趋势图')
-            ax.grid(True, alpha=0.3)
-            st.pyplot(fig)
+    # 7. 分周期趋势：直接使用DAL返回的分桶结果（已按粒度和锻炼类型聚合）
+    with st.expander("分周期锻炼趋势"):
+        col1, col2, col3 = st.columns(3)
+        period_names = {"近一周": "week", "近30天": "month", "近一年": "year"}
+        granularity_names = {"按天": "day", "按周": "isoweek", "按月": "month", "按年": "year"}
+        metric_names = {"锻炼次数": "sessions", "时长(分钟)": "duration", "距离(公里)": "distance", "卡路里": "calories"}
+        with col1:
+            period = period_names[st.selectbox("统计周期", list(period_names), index=2, key="trend_period")]
+        with col2:
+            granularity = granularity_names[st.selectbox("粒度", list(granularity_names), index=1, key="trend_granularity")]
+        with col3:
+            metric = metric_names[st.selectbox("指标", list(metric_names), key="trend_metric")]
+
+        buckets = get_exercise_stats(user_id, period, granularity)
+        if not buckets.empty:
+            st.bar_chart(pivot_buckets(buckets, metric), use_container_width=True, height=300)
         else:
-            st.info("暂无打卡数据")
+            st.info("暂无锻炼数据")
     
     # 8. 锻炼时长与卡路里消耗散点图
     with st.expander("时长 vs 卡路里散点图"):
@@ -538,35 +456,30 @@ def render_visualization_tab(fitness_df):
     st.markdown("---")
 
 
-def generate_fitness_data(days=30):
-    """生成12月全月的模拟数据（确保有有效打卡）"""
-    # 强制从12月1日开始生成数据（保证是当前选择的12月）
-    base_date = datetime(2025, 12, 1)
-    dates = [base_date + timedelta(days=i) for i in range(days)]
-
-    data = []
-    for date in dates:
-        # 提高打卡率到80%（减少无数据情况）
-        is_checkin = random.random() > 0.2
-        # 打卡时生成4-10的强度（非0）
-        intensity = random.randint(4, 10) if is_checkin else 0
-        recovery_quality = random.randint(5, 10) if is_checkin else 0
-        duration = random.randint(20, 60) if is_checkin else 0
-        calories = random.randint(100, 300) if is_checkin else 0
-        exercise_type = random.choice(["跑步", "游泳", "跳绳", "力量训练", "瑜伽"]) if is_checkin else ""
-
-        data.append({
-            "date": date,
-            "is_checkin": is_checkin,
-            "intensity": intensity,
-            "recovery_quality": recovery_quality,
-            "duration": duration,
-            "calories": calories,
-            "exercise_type": exercise_type,
-            "date_str": date.strftime("%Y-%m-%d")
-        })
+def render_checkin_heatmap(user_id, year, month):
+    """渲染打卡日历热力图（month为None时显示全年），图片按用户数据版本缓存，数据未变时不重新查询和绘制"""
+    def load_daily_intensity(start, end):
+        df = session_manager.data.daily_stats(start, end)
+        if df.empty:
+            return pd.Series(dtype=float)
+        return df.set_index("date")["intensity"]
 
-    df = pd.DataFrame(data)
+    image = get_heatmap_image(user_id, year, month, load_daily_intensity)
+    if image is None:
+        st.info("暂无运动强度数据，无法生成热力图")
+    else:
+        st.image(image, use_column_width=True)
+
+
+def load_daily_fitness_df(data, days=DASHBOARD_DAYS):
+    """读取最近days天的按天汇总（含今天，没有记录的日期补0），列与成就/可视化组件所需一致"""
+    end = date.today()
+    df = data.daily_stats(end - timedelta(days=days - 1), end)
+    if df.empty:
+        # 读取失败时返回带列名的空表，各组件按"暂无数据"处理
+        return pd.DataFrame(columns=["date", "is_checkin", "intensity", "recovery_quality",
+                                     "duration", "calories", "date_str"]).astype({"is_checkin": bool})
+    df["date_str"] = df["date"].dt.strftime("%Y-%m-%d")
     return df
 
 
@@ -592,116 +505,25 @@ def main():
             st.session_state.manual_confirm_data = {}
             st.rerun()
 
-        # 刷新数据
-        session_manager.refresh_data()
+        # 本次运行的数据上下文：各标签页共用，每个数据集最多读取一次
+        data = session_manager.begin_rerun()
+        goals = data.goals(include_completed=False)
 
-        # 获取用户数据
-        profile = session_manager.db.get_user_profile(st.session_state.user_id)
-        records = session_manager.db.get_fitness_records(st.session_state.user_id)
-        goals = session_manager.db.get_fitness_goals(st.session_state.user_id, include_completed=False)
-
-        # 计算统计数据
-        total_workouts = len(records)
-        total_duration = sum(r.duration for r in records) if records else 0
+        # 计算统计数据（读取按天汇总表，不再逐条读取全部记录）
+        totals = data.stats_totals()
+        total_workouts = int(totals["sessions"])
+        total_duration = totals["duration"]
         avg_duration = total_duration / total_workouts if total_workouts > 0 else 0
 
         # 主界面标题
         st.markdown("<h1 style='text-align: center; color: grey;'>学生体育锻炼管理系统</h1>", unsafe_allow_html=True)
         col1, col2 = st.columns([1,1])
+        # 最近30天按天汇总：热力图、数据分析、成就共用
+        daily_df = load_daily_fitness_df(data)
         with col1:
-            fitness_df = generate_fitness_data(days=30)
             with st.expander("打卡日历热力图", expanded=True):
-                    fitness_df['date'] = pd.to_datetime(fitness_df['date'])  # 确保日期格式正确
-                    heatmap_data = fitness_df.set_index('date')['intensity']
-
-                    # 空数据保护：若所有强度为0/空，生成提示
-                    if heatmap_data.sum() == 0:
-                        st.info("暂无运动强度数据，无法生成热力图")
-                    else:
-                        # 1. 自定义红色系配色（无需norm，直接定义渐变映射）
-                        import matplotlib.colors as mcolors
-                        import numpy as np
-
-                        # 定义颜色节点：0→浅灰 | 5→浅红 | 10→深红（自动渐变）
-                        color_list = [
-                            (0.0, '#f5f5f5'),  # 强度0：浅灰（未打卡）
-                            (0.1, '#fee2e2'),  # 强度1：极浅红
-                            (0.2, '#fecaca'),  # 强度2：浅红
-                            (0.3, '#fca5a5'),  # 强度3：淡红
-                            (0.4, '#f87171'),  # 强度4：橘红
-                            (0.5, '#ef4444'),  # 强度5：亮红（临界点）
-                            (0.6, '#dc2626'),  # 强度6：深红
-                            (0.7, '#b91c1c'),  # 强度7：暗红
-                            (0.8, '#991b1b'),  # 强度8：更深红
-                            (0.9, '#7f1d1d'),  # 强度9：酒红
-                            (1.0, '#4b0000')  # 强度10：暗酒红（最高强度）
-                        ]
-                        # 创建线性渐变配色（自动适配0-10的数值范围）
-                        cmap = mcolors.LinearSegmentedColormap.from_list('custom_red', color_list)
-
-                        # 直接取当前月份，不再提供下拉选择
-                        selected_month_num = datetime.now().month
-                        target_year = datetime.now().year
-
-                        # 3. 过滤出「选中年份+月份」的数据集（仅保留该月数据）
-                        filtered_data = heatmap_data[
-                            (heatmap_data.index.year == target_year) &
-                            (heatmap_data.index.month == selected_month_num)
-                            ]
-
-                        # 4. 补全该月所有日期（避免缺失日期导致热力图不完整）
-                        month_start = pd.Timestamp(year=target_year, month=selected_month_num, day=1)
-                        month_end = (month_start + pd.offsets.MonthEnd(1))
-                        full_dates = pd.date_range(start=month_start, end=month_end, freq='D')
-                        full_series = pd.Series(pd.NA, index=full_dates, name='intensity')  # 初始化全NaN序列
-                        # 合并真实数据（先填充有效数据，再补0）
-                        combined_data = full_series.fillna(filtered_data).fillna(0)
-
-                        # 核心修正：重新计算当月周数（避免超大数）
-                        combined_data = combined_data.reset_index()
-                        combined_data.columns = ['date', 'intensity']
-                        combined_data['weekday'] = combined_data['date'].dt.weekday  # 0=周一，6=周日
-                        combined_data['day_of_month'] = combined_data['date'].dt.day
-                        combined_data['week_of_month'] = (combined_data['day_of_month'] - 1) // 7 + 1
-
-                        # 数值保护：限制max_week在1-6之间（当月最多6周）
-                        max_week = combined_data['week_of_month'].max()
-                        max_week = min(max_week, 6)  # 强制上限6，避免异常值
-                        if max_week < 1:
-                            max_week = 1  # 保底至少1周
-
-                        # 填充网格（行数=7行（周一到周日），列数=当月最大周数）
-                        heatmap_grid = np.zeros((7, max_week))  # 7行×最多6列
-                        for _, row in combined_data.iterrows():
-                            y = row['weekday']  # 行：周一=0，周日=6
-                            x = row['week_of_month'] - 1  # 列：从0开始
-                            # 边界保护：防止x/y超出网格范围
-                            if 0 <= x < max_week and 0 <= y < 7:
-                                heatmap_grid[y, x] = row['intensity']
-
-                        # ---------------------- 5. 绘制单月热力图（XY轴调换+缩小尺寸） ----------------------
-                        # 关键1：缩小画布尺寸（原(max_week*1.2,7) → 新(max_week*1, 4)，更紧凑）
-                        fig, ax = plt.subplots(figsize=(max_week * 0.5, 1.2))
-
-                        # 关键2：网格转置（heatmap_grid.T）实现XY轴调换
-                        im = ax.imshow(heatmap_grid.T, cmap=cmap, aspect='auto')
-
-                        # 关键3：调整刻度/标签适配新轴方向
-                        ax.set_xticks(range(7))  # X轴：星期（原Y轴）
-                        ax.set_xticklabels(['一', '二', '三', '四', '五', '六', '日'], fontsize=4)  # 缩小标签字体
-                        ax.set_yticks(range(max_week))  # Y轴：周数（原X轴）
-                        ax.set_yticklabels([f'第{i + 1}周' for i in range(max_week)], fontsize=4)  # 缩小标签字体
-                        ax.set_title(f'{target_year}年{selected_month_num}月', fontsize=6, pad=10)  # 缩小标题字体
-
-                        # 隐藏边框+调整间距
-                        ax.spines['top'].set_visible(False)
-                        ax.spines['right'].set_visible(False)
-                        ax.spines['bottom'].set_visible(False)
-                        ax.spines['left'].set_visible(False)
-                        plt.tight_layout()
-
-                        # 显示热力图
-                        st.pyplot(fig)
+                today = date.today()
+                render_checkin_heatmap(st.session_state.user_id, today.year, today.month)
         with col2:
             st.subheader("目标")
             if goals:
@@ -932,19 +754,18 @@ def main():
                     st.rerun()
 
         with tab2:
-            fitness_df = generate_fitness_data(days=30)
-            render_visualization_tab(fitness_df)
+            render_visualization_tab(daily_df.copy(), st.session_state.user_id)
 
         with tab3:
-            fitness_df = generate_fitness_data(days=30)  # 模拟数据，后续替换为真实数据
-            render_achievement_tab(fitness_df)
+            render_achievement_tab(daily_df.copy())
 
         with tab4:
             aichat()
             
         with tab5:
-            records = session_manager.db.get_fitness_records(st.session_state.user_id)
-            render_brush_section_tab(records)
+            render_brush_section_tab(st.session_state.user_id)
+
+        session_manager.report_rerun()
 
 def response_generator():
     response = random.choice(
@@ -1110,32 +931,26 @@ def aichat():
         # st.session_state.messages.append({"role": "assistant", "content": assistant_content or "未获取到有效响应"})
         #
 
-def render_brush_section_tab(records):
+def render_brush_section_tab(user_id):
     """渲染刷段记录界面"""
     
     # 目标总距离
     TOTAL_TARGET_KM = 80
     
-    # 过滤出非官方的记录（is_official=False）
-    non_official_records = [record for record in records if record.is_official == False]
+    # 只按列读取非官方记录（is_official=False）的类型和距离，不逐条创建记录对象
+    batch = session_manager.db.get_fitness_records_columnar(
+        user_id, ["exercise_type", "distance"], is_official=False
+    )
+    distance = batch["distance"]
+    has_distance = ~np.isnan(distance) & (distance != 0)
     
-    # 初始化刷段记录字典
+    # 刷段记录：跑步记录单位km，游泳记录单位次，跳绳记录单位个（跳绳记录中distance字段存储的是跳绳个数）
     brush_records = {
-        "running": [],  # 跑步记录，单位：km
-        "swimming": [],  # 游泳记录，单位：次
-        "rope_skipping": []  # 跳绳记录，单位：个
+        "running": distance[batch.mask_equals("exercise_type", "跑步") & has_distance].tolist(),
+        "swimming": [1] * int(batch.mask_equals("exercise_type", "游泳").sum()),  # 每次游泳算1次
+        "rope_skipping": distance[batch.mask_equals("exercise_type", "跳绳") & has_distance].tolist()
     }
     
-    # 将数据库记录转换为刷段记录格式
-    for record in non_official_records:
-        if record.exercise_type == "跑步" and record.distance:
-            brush_records["running"].append(record.distance)
-        elif record.exercise_type == "游泳":
-            brush_records["swimming"].append(1)  # 每次游泳算1次
-        elif record.exercise_type == "跳绳" and record.distance:
-            # 跳绳记录中distance字段存储的是跳绳个数
-            brush_records["rope_skipping"].append(record.distance)
-    
     # 转换逻辑：计算总km数
     def calculate_total_km():
         # 跑步：直接算km
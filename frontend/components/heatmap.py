@@ -0,0 +1,162 @@
+# frontend/components/heatmap.py
+"""
+打卡日历热力图组件
+按天强度序列用NumPy下标一次性填入网格（不再逐行iterrows），渲染结果为PNG/SVG字节，
+按(用户, 年, 月, 格式, 数据版本)缓存：数据未变化的月份直接返回缓存的图片，不查询也不重新绘制。
+支持单月（行为7天一段的"第N周"，列为星期）和全年（列为自然周，行为星期）两种视图。
+"""
+import calendar
+import io
+from datetime import date
+from functools import lru_cache
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from self_health_mis.data.dal.data_version import version_tracker
+from self_health_mis.data.dal.stats_buckets import StatsCache
+
+# 颜色节点：强度0→浅灰（未打卡） | 5→亮红 | 10→暗酒红（最高强度）
+HEATMAP_COLORS = [
+    (0.0, '#f5f5f5'), (0.1, '#fee2e2'), (0.2, '#fecaca'), (0.3, '#fca5a5'), (0.4, '#f87171'),
+    (0.5, '#ef4444'), (0.6, '#dc2626'), (0.7, '#b91c1c'), (0.8, '#991b1b'), (0.9, '#7f1d1d'),
+    (1.0, '#4b0000'),
+]
+MAX_INTENSITY = 10
+WEEKDAY_LABELS = ['一', '二', '三', '四', '五', '六', '日']
+IMAGE_FORMATS = ("png", "svg")
+
+# 读取按天强度：(开始日期, 结束日期) → 以日期为索引的强度序列
+DailyLoader = Callable[[date, date], pd.Series]
+
+# 渲染结果缓存；没有强度数据的月份缓存为空字节
+heatmap_cache = StatsCache(max_entries=256)
+
+
+def _daily_values(daily: pd.Series, start: date, end: date) -> np.ndarray:
+    """把按天序列对齐到[start, end]的每一天，缺失的日期记为0"""
+    days = pd.date_range(start, end, freq="D")
+    if daily.empty:
+        return np.zeros(len(days))
+    series = daily.copy()
+    series.index = pd.to_datetime(series.index)
+    return series.reindex(days).fillna(0).to_numpy(dtype=float)
+
+
+def build_month_grid(daily: pd.Series, year: int, month: int) -> np.ndarray:
+    """
+    单月网格：7行（周一到周日）× 当月周数列（每7天一段，第1~7日为第1周）
+    """
+    days_in_month = calendar.monthrange(year, month)[1]
+    values = _daily_values(daily, date(year, month, 1), date(year, month, days_in_month))
+    day_index = np.arange(days_in_month)
+    weekdays = (day_index + date(year, month, 1).weekday()) % 7
+    grid = np.zeros((7, (days_in_month - 1) // 7 + 1))
+    grid[weekdays, day_index // 7] = values
+    return grid
+
+
+def build_year_grid(daily: pd.Series, year: int) -> np.ndarray:
+    """
+    全年网格：7行（周一到周日）× 自然周列（周一为一周开始）；不属于该年的格子为NaN
+    """
+    start, end = date(year, 1, 1), date(year, 12, 31)
+    values = _daily_values(daily, start, end)
+    cell = np.arange(len(values)) + start.weekday()
+    grid = np.full((7, cell[-1] // 7 + 1), np.nan)
+    grid[cell % 7, cell // 7] = values
+    return grid
+
+
+@lru_cache(maxsize=None)
+def _colormap():
+    import matplotlib.colors as mcolors
+    cmap = mcolors.LinearSegmentedColormap.from_list('custom_red', HEATMAP_COLORS)
+    cmap.set_bad('white')
+    return cmap
+
+
+def _save(fig, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=200, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def render_month_heatmap(grid: np.ndarray, year: int, month: int, fmt: str = "png") -> bytes:
+    """绘制单月热力图（网格转置：横轴为星期，纵轴为周）"""
+    # 使用Figure而不是pyplot：不经过全局状态，多个会话并发绘制互不影响
+    from matplotlib.figure import Figure
+
+    weeks = grid.shape[1]
+    fig = Figure(figsize=(weeks * 0.5, 1.2))
+    ax = fig.subplots()
+    ax.imshow(grid.T, cmap=_colormap(), vmin=0, vmax=MAX_INTENSITY, aspect='auto')
+    ax.set_xticks(range(7))
+    ax.set_xticklabels(WEEKDAY_LABELS, fontsize=4)
+    ax.set_yticks(range(weeks))
+    ax.set_yticklabels([f'第{i + 1}周' for i in range(weeks)], fontsize=4)
+    ax.set_title(f'{year}年{month}月', fontsize=6, pad=10)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    fig.tight_layout()
+    return _save(fig, fmt)
+
+
+def render_year_heatmap(grid: np.ndarray, year: int, fmt: str = "png") -> bytes:
+    """绘制全年热力图（横轴为自然周，月份标在每月1日所在的周）"""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(grid.shape[1] * 0.18, 1.6))
+    ax = fig.subplots()
+    ax.imshow(np.ma.masked_invalid(grid), cmap=_colormap(), vmin=0, vmax=MAX_INTENSITY, aspect='equal')
+    offset = date(year, 1, 1).weekday()
+    month_columns = [(date(year, m, 1).timetuple().tm_yday - 1 + offset) // 7 for m in range(1, 13)]
+    ax.set_xticks(month_columns)
+    ax.set_xticklabels([f'{m}月' for m in range(1, 13)], fontsize=5)
+    ax.set_yticks(range(7))
+    ax.set_yticklabels(WEEKDAY_LABELS, fontsize=4)
+    ax.set_title(f'{year}年', fontsize=7, pad=6)
+    ax.tick_params(length=0)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    fig.tight_layout()
+    return _save(fig, fmt)
+
+
+def get_heatmap_image(user_id: int, year: int, month: Optional[int], load_daily: DailyLoader,
+                      fmt: str = "png") -> Optional[bytes]:
+    """
+    获取热力图图片，数据版本未变时直接返回缓存
+
+    Args:
+        user_id: 用户ID
+        year: 年份
+        month: 月份，None表示全年
+        load_daily: 读取按天强度序列的函数（仅在未命中缓存时调用）
+        fmt: 图片格式，png / svg
+
+    Returns:
+        bytes: 图片内容；该时间段没有任何强度数据时返回None
+    """
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"不支持的图片格式: {fmt}，可选值: {list(IMAGE_FORMATS)}")
+    data_version = version_tracker.get(user_id)
+    key = (user_id, year, month, fmt, data_version)
+    image = heatmap_cache.get(key) if data_version is not None else None
+    if image is None:
+        if month is None:
+            grid = build_year_grid(load_daily(date(year, 1, 1), date(year, 12, 31)), year)
+        else:
+            days_in_month = calendar.monthrange(year, month)[1]
+            grid = build_month_grid(load_daily(date(year, month, 1), date(year, month, days_in_month)),
+                                    year, month)
+        if not np.nansum(grid):
+            image = b""
+        elif month is None:
+            image = render_year_heatmap(grid, year, fmt)
+        else:
+            image = render_month_heatmap(grid, year, month, fmt)
+        if data_version is not None:
+            heatmap_cache.put(key, image)
+    return image or None
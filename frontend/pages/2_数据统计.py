@@ -1,9 +1,11 @@
 import streamlit as st
+import dataclasses
 from datetime import datetime, date, timedelta
 import pandas as pd
 from typing import Optional, Dict, Any, List, Union
 from self_health_mis.frontend.session_state import SessionState
 from self_health_mis.data.model.exercise_model import FitnessRecord
+from self_health_mis.core.record_export import export_to_spooled_file, EXPORT_FORMATS, MIME_TYPES
 
 # ====================== 页面配置 & 会话初始化（原逻辑不变） ======================
 st.set_page_config(
@@ -15,18 +17,18 @@ session_manager = SessionState()  # 原会话管理，保持不变
 
 
 # ====================== 核心DB操作函数（直接调用，适配原方法） ======================
-def update_fitness_record(record_id: int, update_data: Dict[str, Any]) -> bool:
+def update_fitness_record(record_id: int, update_data: Dict[str, Any], page_records: List[FitnessRecord]) -> bool:
     """直接调用DB层更新记录（适配原DB方法）"""
     try:
-        # 1. 直接从DB获取原始记录（原方法：get_fitness_records + 过滤ID）
-        all_records = session_manager.db.get_fitness_records(st.session_state.user_id)
-        target_record = next((r for r in all_records if r.id == record_id), None)
+        # 1. 在当前页已读取的记录中查找（被编辑的行一定在当前页，不再读取全部历史记录）
+        target_record = next((r for r in page_records if r.id == record_id), None)
 
         if not target_record:
             st.error(f"记录ID {record_id} 不存在")
             return False
 
-        # 2. 仅更新允许的字段（直接修改对象属性）
+        # 2. 仅更新允许的字段（在副本上修改，记录对象与其他组件/缓存共用）
+        target_record = dataclasses.replace(target_record)
         allowed_fields = ["is_checkin", "intensity", "recovery_quality", "notes"]
         for field in allowed_fields:
             if field in update_data:
@@ -64,49 +66,108 @@ def add_fitness_record(new_record: FitnessRecord) -> Optional[int]:
 
 
 # ====================== 核心渲染函数（前端适配DB层） ======================
+PAGE_SIZE_OPTIONS = [20, 50, 100]
+
+
+def render_pagination(cursors: List[Optional[tuple]], next_cursor: Optional[tuple]):
+    """渲染翻页控件（键集分页：上一页弹出游标，下一页压入游标）"""
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ 上一页", disabled=len(cursors) <= 1, key="records_prev_page"):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"第 {len(cursors)} 页")
+    with col_next:
+        if st.button("下一页 ➡️", disabled=next_cursor is None, key="records_next_page"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+
+def render_range_totals(user_id: int, start: date, end: date):
+    """渲染所选日期区间的合计（按天汇总表的主键范围求和，与记录条数无关）"""
+    sums = session_manager.data.stats_totals(start, end)
+    st.caption("区间合计（含官方与自主锻炼记录）")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("锻炼次数", f"{sums['sessions']:.0f}")
+    col2.metric("总时长(分钟)", f"{sums['duration']:.0f}")
+    col3.metric("总距离(公里)", f"{sums['distance']:.2f}")
+    col4.metric("总卡路里(kcal)", f"{sums['calories']:.0f}")
+
+
+def render_export_section(user_id: int, start: date, end: date, official_filter: Optional[bool]):
+    """渲染记录导出区域（按当前筛选条件分块流式导出，不在内存中拼接全部记录）"""
+    with st.expander("📤 导出锻炼记录"):
+        fmt = st.selectbox("导出格式", EXPORT_FORMATS, index=0, key="export_format")
+        export_key = (user_id, start, end, official_filter, fmt)
+
+        # 只在点击时生成，避免每次页面重跑都重新导出
+        if st.button("生成导出文件", key="export_build"):
+            try:
+                with st.spinner("正在导出..."):
+                    st.session_state.export_file = (export_key, export_to_spooled_file(
+                        fmt,
+                        user_ids=[user_id],
+                        start_date=datetime.combine(start, datetime.min.time()),
+                        end_date=datetime.combine(end, datetime.max.time()),
+                        is_official=official_filter
+                    ))
+            except Exception as e:
+                st.error(f"导出失败：{str(e)}")
+
+        exported = st.session_state.get("export_file")
+        # 筛选条件变化后，旧的导出文件不再提供下载
+        if exported and exported[0] == export_key:
+            st.download_button(
+                "下载导出文件",
+                data=exported[1],
+                file_name=f"fitness_records_{start:%Y%m%d}_{end:%Y%m%d}.{fmt}",
+                mime=MIME_TYPES[fmt],
+                key="export_download"
+            )
+
+
 def render_view_records_section():
     """渲染锻炼记录管理区域（直接DB调用，前端逻辑适配）"""
-    # 直接调用DB层获取数据（原方法：get_fitness_records(user_id)）
+    # 按页直接调用DB层获取数据（get_fitness_records_page，只取当前页）
     user_id = st.session_state.user_id
-    all_records = session_manager.db.get_fitness_records(user_id)
-    goals = session_manager.db.get_fitness_goals(user_id, include_completed=False)  # 原方法保留
-
 
-    # ========== 2. 筛选控件（前端内存筛选，适配DB层返回数据） ==========
+    # ========== 2. 筛选控件（筛选条件全部下推到数据库查询） ==========
     st.subheader("编辑锻炼记录")
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         filter_start = st.date_input("开始日期", date.today() - timedelta(days=7))
     with col2:
         filter_end = st.date_input("结束日期", date.today())
     with col3:
         filter_official = st.selectbox("记录类型", ["全部", "仅官方刷段", "仅自主锻炼"], index=0)
+    with col4:
+        page_size = st.selectbox("每页条数", PAGE_SIZE_OPTIONS, index=1)
 
-    # 前端内存筛选（适配DB层返回的FitnessRecord列表）
     official_filter = None
     if filter_official == "仅官方刷段":
         official_filter = True
     elif filter_official == "仅自主锻炼":
         official_filter = False
 
-    filtered_records = []
-    for r in all_records:
-        try:
-            # 适配DB层返回的date字段类型（datetime -> date）
-            record_date = r.date.date() if isinstance(r.date, datetime) else None
-        except:
-            record_date = None
-
-        if not record_date:
-            continue
-        # 日期筛选（前端逻辑）
-        if not (filter_start <= record_date <= filter_end):
-            continue
-        # 官方/自主筛选（前端逻辑）
-        if official_filter is not None and r.is_official != official_filter:
-            continue
-
-        filtered_records.append(r)
+    render_range_totals(user_id, filter_start, filter_end)
+    render_export_section(user_id, filter_start, filter_end, official_filter)
+
+    # 只查询当前页：游标栈记录每一页的起始游标，筛选条件变化时回到第一页
+    page_key = (user_id, filter_start, filter_end, official_filter, page_size)
+    if st.session_state.get("records_page_key") != page_key:
+        st.session_state.records_page_key = page_key
+        st.session_state.records_page_cursors = [None]
+    cursors = st.session_state.records_page_cursors
+
+    filtered_records, next_cursor = session_manager.db.get_fitness_records_page(
+        user_id,
+        start_date=datetime.combine(filter_start, datetime.min.time()),
+        end_date=datetime.combine(filter_end, datetime.max.time()),
+        is_official=official_filter,
+        after=cursors[-1],
+        limit=page_size
+    )
 
     # ========== 3. 可编辑表格（前端适配DB层数据格式） ==========
     if filtered_records:
@@ -180,15 +241,19 @@ def render_view_records_section():
                         "notes": edited.备注 if edited.备注 != "-" else None
                     }
                     # 直接调用DB更新函数
-                    update_fitness_record(record_id, update_data)
+                    update_fitness_record(record_id, update_data, filtered_records)
             st.rerun()  # 刷新页面显示修改后数据
 
     else:
         st.info("没有找到符合条件的锻炼记录。")
 
+    render_pagination(cursors, next_cursor)
+
 # ====================== 主函数（仅调用前端渲染） ======================
 def main():
+    session_manager.begin_rerun()
     render_view_records_section()
+    session_manager.report_rerun()
 
 
 if __name__ == "__main__":
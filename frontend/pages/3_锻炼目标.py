@@ -13,10 +13,11 @@ plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from self_health_mis.data.dal.exercise_dal import (
-    get_fitness_goals, add_fitness_goal, update_goal_progress, delete_fitness_goal,
+    add_fitness_goal, update_goal_progress, delete_fitness_goal,
     auto_update_goal_progress
 )
 from self_health_mis.data.model.goal_model import FitnessGoal
+from self_health_mis.data.model.goal_types import get_goal_types
 from self_health_mis.frontend.session_state import SessionState
 
 # 创建会话状态管理器实例
@@ -38,13 +39,16 @@ def main():
     st.sidebar.write(f"用户名: {st.session_state.get('username', '未知')}")
     st.sidebar.write(f"用户ID: {st.session_state.get('user_id', '未知')}")
     
+    # 本次运行的数据上下文：页面内各组件共用，每个数据集最多读取一次
+    data = session_manager.begin_rerun()
+    
     # 自动更新目标进度
     user_id = st.session_state.get('user_id')
     if user_id:
         auto_update_goal_progress(user_id)
     
     # 获取用户目标
-    goals = get_fitness_goals(user_id, include_completed=True)
+    goals = data.goals(include_completed=True)
     
     # 显示目标列表
     display_goals(goals)
@@ -55,6 +59,8 @@ def main():
     # 目标进度可视化
     visualize_goals(goals)
 
+    session_manager.report_rerun()
+
 def display_goals(goals):
     """显示用户的锻炼目标列表"""
     st.subheader("📋 我的锻炼目标")
@@ -121,20 +127,22 @@ def create_new_goal():
     st.subheader("➕ 创建新目标")
     
     with st.form("new_goal_form"):
-        # 目标类型选择
-        goal_types = ["每周跑步次数", "每周锻炼总时长(分钟)", "每月跑步距离", "力量训练次数"]
-        selected_type = st.selectbox("选择目标类型", goal_types)
+        # 目标类型选择（来自目标类型注册表）
+        goal_types = {goal_type.name: goal_type for goal_type in get_goal_types()}
+        selected_type = st.selectbox("选择目标类型", list(goal_types))
+        goal_type = goal_types[selected_type]
         
         # 目标值
-        target_value = st.number_input("目标值", min_value=1.0, step=1.0)
+        target_value = st.number_input(f"目标值（{goal_type.unit}）" if goal_type.unit else "目标值",
+                                       min_value=1.0, step=1.0)
         
         # 日期选择
         col1, col2 = st.columns(2)
         with col1:
             start_date = st.date_input("开始日期", value=datetime.now().date())
         with col2:
-            # 默认结束日期为开始日期后30天
-            default_end_date = start_date + timedelta(days=30)
+            # 默认结束日期按目标类型的统计周期推算
+            default_end_date = start_date + timedelta(days=goal_type.window_days)
             end_date = st.date_input("结束日期", value=default_end_date)
         
         # 提交按钮
@@ -15,7 +15,7 @@ st.set_page_config(
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 # 导入必要的模块
-from self_health_mis.data.dal.user_dal import get_user_profile, update_user_profile
+from self_health_mis.data.dal.user_dal import update_user_profile
 from self_health_mis.data.model.user_model import UserProfile
 from self_health_mis.frontend.session_state import SessionState
 
@@ -40,8 +40,9 @@ def main():
     # 获取用户ID
     user_id = st.session_state.get('user_id')
     
-    # 获取用户资料
-    user_profile = get_user_profile(user_id)
+    # 获取用户资料（本次运行的数据上下文）
+    data = session_manager.begin_rerun()
+    user_profile = data.profile()
     
     # 显示用户资料
     show_user_profile(user_profile)
@@ -49,6 +50,8 @@ def main():
     # 编辑用户资料
     edit_user_profile(user_profile)
 
+    session_manager.report_rerun()
+
 def show_user_profile(profile: UserProfile):
     """显示用户资料"""
     st.subheader("当前资料")
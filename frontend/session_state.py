@@ -10,9 +10,13 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # 导入数据库和业务逻辑相关模块
 from self_health_mis.data.sqlite_conn import db_instance
-from data.dal.user_dal import login_user, get_user_profile, register_user
-from data.dal.exercise_dal import get_fitness_records, get_fitness_goals
-from core.auth import user_login as auth_user_login
+from self_health_mis.data.dal.user_dal import login_user, register_user
+from self_health_mis.data.dal.exercise_dal import get_fitness_records_page, get_fitness_records_columnar
+from self_health_mis.core.auth import user_login as auth_user_login, get_user_profile
+from self_health_mis.core.exercise_service import get_user_exercise_records, get_user_fitness_goals
+from self_health_mis.core.data_context import RerunDataContext
+from self_health_mis.core.prefetch import prefetch_user_data
+from self_health_mis.data.dal.record_batch import RecordBatch, DEFAULT_COLUMNS
 
 class SessionState:
     """
@@ -86,6 +90,7 @@ class SessionState:
                 st.session_state.username = username
                 st.session_state.cache_timestamp = datetime.now()
                 print(f"[DEBUG-SESSION] 测试账号强制登录成功！")
+                self._prefetch()
                 return True
             
             # 正常登录流程
@@ -101,6 +106,7 @@ class SessionState:
                         st.session_state.username = username
                         st.session_state.cache_timestamp = datetime.now()
                         print(f"[DEBUG-SESSION] 正常登录成功，用户ID: {login_result['user_id']}")
+                        self._prefetch()
                         return True
                     else:
                         print(f"[DEBUG-SESSION] 正常登录失败，消息: {login_result.get('message', '无消息')}")
@@ -119,6 +125,15 @@ class SessionState:
             traceback.print_exc()
             return False
     
+    def _prefetch(self) -> None:
+        """
+        登录成功后并发预取首页数据（预热缓存，超时后不再等待；预取失败不影响登录）
+        """
+        try:
+            prefetch_user_data(st.session_state.user_id)
+        except Exception as e:
+            print(f"[DEBUG-SESSION] 登录预取失败: {str(e)}")
+    
     def logout(self) -> None:
         """
         用户登出，清除会话状态
@@ -199,14 +214,43 @@ class SessionState:
         """
         return st.session_state.user_id if self.is_logged_in() else None
     
+    def begin_rerun(self) -> RerunDataContext:
+        """
+        每个页面脚本开始时调用：新建本次运行的数据上下文（同一次运行内每个数据集最多读取一次）
+        
+        Returns:
+            RerunDataContext: 本次运行的数据上下文
+        """
+        st.session_state.data_context = RerunDataContext(self.user_id)
+        return st.session_state.data_context
+    
+    @property
+    def data(self) -> RerunDataContext:
+        """
+        当前运行的数据上下文，尚未创建或登录用户已变化时新建
+        """
+        context = st.session_state.get("data_context")
+        if context is None or context.user_id != self.user_id:
+            context = self.begin_rerun()
+        return context
+    
+    def report_rerun(self) -> None:
+        """
+        页面脚本结束时调用：输出本次运行的SQL查询数
+        """
+        summary = self.data.summary()
+        print(f"[DEBUG] 本次运行：SQL查询 {summary['queries']} 次，读取数据集 {summary['loads']} 个，复用 {summary['reused']} 次")
+        st.sidebar.caption(f"本次刷新SQL查询数：{summary['queries']}")
+    
     def refresh_data(self) -> None:
         """
         刷新缓存的数据
         """
         if self.is_logged_in():
-            st.session_state.user_profile = get_user_profile(self.user_id)
-            st.session_state.fitness_records = get_fitness_records(self.user_id)
-            st.session_state.fitness_goals = get_fitness_goals(self.user_id, include_completed=False)
+            self.data.invalidate()
+            st.session_state.user_profile = self.data.profile()
+            st.session_state.fitness_records = self.data.records()
+            st.session_state.fitness_goals = self.data.goals(include_completed=False)
             st.session_state.cache_timestamp = datetime.now()
             
     def save_ai_response(self, response: str) -> None:
@@ -255,11 +299,50 @@ class DatabaseWrapper:
             锻炼记录列表
         """
         try:
-            return get_fitness_records(user_id)
+            return get_user_exercise_records(user_id)
         except Exception as e:
             print(f"获取锻炼记录失败: {str(e)}")
             return []
     
+    def get_fitness_records_page(self, user_id: int, start_date=None, end_date=None,
+                                 is_official=None, after=None, limit: int = 50):
+        """
+        分页获取用户锻炼记录
+        
+        Args:
+            user_id: 用户ID
+            start_date / end_date / is_official: 过滤条件
+            after: 上一页返回的游标，None表示第一页
+            limit: 每页条数
+            
+        Returns:
+            (本页记录列表, 下一页游标)
+        """
+        try:
+            return get_fitness_records_page(user_id, start_date, end_date, is_official, after, limit)
+        except Exception as e:
+            print(f"获取锻炼记录失败: {str(e)}")
+            return [], None
+    
+    def get_fitness_records_columnar(self, user_id: int, columns=None, start_date=None, end_date=None,
+                                     is_official=None):
+        """
+        按列获取用户锻炼记录（分析类页面使用，不创建逐条记录对象）
+        
+        Args:
+            user_id: 用户ID
+            columns: 需要的列
+            start_date / end_date / is_official: 过滤条件
+            
+        Returns:
+            RecordBatch列式结果
+        """
+        try:
+            return get_fitness_records_columnar(user_id, columns, start_date, end_date, is_official)
+        except Exception as e:
+            print(f"获取锻炼记录失败: {str(e)}")
+            return RecordBatch.empty(columns or DEFAULT_COLUMNS)
+    
     def get_fitness_goals(self, user_id: int, include_completed: bool = False) -> List[Any]:
         """
         获取用户锻炼目标
@@ -272,7 +355,7 @@ class DatabaseWrapper:
             锻炼目标列表
         """
         try:
-            return get_fitness_goals(user_id, include_completed)
+            return get_user_fitness_goals(user_id, include_completed)
         except Exception as e:
             print(f"获取锻炼目标失败: {str(e)}")
             return []
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接池测试模块
+验证连接复用、上下文管理器语义以及等待/超时统计
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.sqlite_conn import SQLiteDatabase, ConnectionPool, PoolTimeoutError
+
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    测试SQLite连接池
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "pool_test.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_connections_are_reused(self):
+        """
+        测试连续查询复用同一个物理连接
+        """
+        db = SQLiteDatabase(db_name=self.db_path, pool_size=2)
+        db.initialize()  # 建表和迁移使用的连接不计入
+        before = db.pool_stats()
+        for _ in range(10):
+            with db._connect() as conn:
+                conn.execute("SELECT COUNT(*) FROM user_accounts").fetchone()
+
+        stats = db.pool_stats()
+        self.assertLessEqual(stats["misses"] - before["misses"], 1)
+        self.assertGreaterEqual(stats["hits"] - before["hits"], 9)
+        self.assertEqual(stats["open"], 1)
+        db.close()
+
+    def test_schema_created_on_first_use(self):
+        """
+        测试创建实例时不打开数据库文件，第一次借出连接时才建表和迁移
+        """
+        db = SQLiteDatabase(db_name=self.db_path)
+        self.assertFalse(os.path.exists(self.db_path))
+        with db._connect() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM user_accounts").fetchone()[0], 0)
+            self.assertGreater(conn.execute("PRAGMA user_version").fetchone()[0], 0)
+        db.initialize()  # 重复调用无副作用
+        db.close()
+
+    def test_context_manager_commits_and_rolls_back(self):
+        """
+        测试_connect()保持sqlite3连接的提交/回滚语义
+        """
+        db = SQLiteDatabase(db_name=self.db_path)
+        with db._connect() as conn:
+            conn.execute(
+                "INSERT INTO user_accounts (username, password, create_time) VALUES (?, ?, ?)",
+                ("pool_user", "x", "2025-01-01T00:00:00")
+            )
+
+        with self.assertRaises(RuntimeError):
+            with db._connect() as conn:
+                conn.execute(
+                    "INSERT INTO user_accounts (username, password, create_time) VALUES (?, ?, ?)",
+                    ("rolled_back", "x", "2025-01-01T00:00:00")
+                )
+                raise RuntimeError("boom")
+
+        with db._connect() as conn:
+            names = [row["username"] for row in conn.execute("SELECT username FROM user_accounts")]
+        self.assertEqual(names, ["pool_user"])
+        db.close()
+
+    def test_acquire_timeout_when_pool_exhausted(self):
+        """
+        测试连接池耗尽时在超时后抛出PoolTimeoutError
+        """
+        pool = ConnectionPool(self.db_path, max_size=1, acquire_timeout=0.05)
+        conn = pool.acquire()
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire()
+        pool.release(conn)
+
+        stats = pool.get_stats()
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["total_wait_time"], 0)
+        pool.close_all()
+
+    def test_waiter_receives_released_connection(self):
+        """
+        测试等待中的线程在连接归还后拿到连接
+        """
+        pool = ConnectionPool(self.db_path, max_size=1, acquire_timeout=5)
+        conn = pool.acquire()
+        acquired = []
+
+        def worker():
+            c = pool.acquire()
+            acquired.append(c)
+            pool.release(c)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        threading.Timer(0.05, pool.release, args=(conn,)).start()
+        thread.join(timeout=5)
+
+        self.assertEqual(acquired, [conn])
+        self.assertEqual(pool.get_stats()["misses"], 1)
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    unittest.main()
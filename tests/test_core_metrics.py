@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+核心指标计算测试模块
+以原pandas实现作为参考，校验SQL聚合结果一致
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.sqlite_conn import SQLiteDatabase
+
+
+def reference_core_metrics(db: SQLiteDatabase, user_id: int):
+    """
+    参考实现：读出全部记录后用pandas过滤、求平均（即改为SQL聚合之前的算法）
+    """
+    fitness_df = db.get_user_fitness_records(user_id)
+    if len(fitness_df) == 0:
+        return 0, 0.0, 0.0, 0.0
+    checkin_df = fitness_df[fitness_df["is_checkin"]].dropna(subset=["intensity", "recovery_quality"])
+    total_checkin_days = checkin_df.shape[0]
+    avg_intensity = checkin_df["intensity"].mean() if not checkin_df.empty else 0.0
+    avg_recovery = checkin_df["recovery_quality"].mean() if not checkin_df.empty else 0.0
+    weekly_checkin_rate = total_checkin_days / len(fitness_df) * 100
+    return total_checkin_days, avg_intensity, avg_recovery, weekly_checkin_rate
+
+
+class TestCoreMetrics(unittest.TestCase):
+    """
+    测试calculate_core_metrics
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = SQLiteDatabase(db_name=os.path.join(self.tmp_dir.name, "metrics_test.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def insert(self, rows):
+        with self.db._connect() as conn:
+            conn.executemany(
+                "INSERT INTO fitness_records (user_id, date, exercise_type, duration, is_checkin, intensity, "
+                "recovery_quality) VALUES (?, ?, '跑步', 30, ?, ?, ?)",
+                rows
+            )
+
+    def assertMatchesReference(self, user_id):
+        actual = self.db.calculate_core_metrics(user_id)
+        expected = reference_core_metrics(self.db, user_id)
+        self.assertEqual(actual[0], expected[0])
+        # 参考实现不做舍入，这里只比较到一位小数的舍入误差
+        for a, e in zip(actual[1:], expected[1:]):
+            self.assertAlmostEqual(a, e, delta=0.051)
+
+    def test_matches_pandas_reference(self):
+        """
+        测试随机数据下与pandas参考实现一致（含空值和未打卡记录）
+        """
+        rng = random.Random(7)
+        base = datetime(2025, 1, 1)
+        rows = []
+        for user_id in (1, 2):
+            for day in range(300):
+                rows.append((
+                    user_id, (base + timedelta(days=day)).isoformat(),
+                    rng.random() < 0.6,
+                    rng.choice([None, round(rng.uniform(1, 10), 1)]),
+                    rng.choice([None, round(rng.uniform(1, 10), 1), round(rng.uniform(1, 10), 1)])
+                ))
+        self.insert(rows)
+        self.assertMatchesReference(1)
+        self.assertMatchesReference(2)
+
+    def test_no_valid_checkins(self):
+        """
+        测试有记录但没有有效打卡时返回0
+        """
+        self.insert([(3, "2025-01-01T08:00:00", 1, None, 5.0), (3, "2025-01-02T08:00:00", 0, 6.0, 5.0)])
+        self.assertEqual(self.db.calculate_core_metrics(3), (0, 0.0, 0.0, 0.0))
+
+    def test_no_records(self):
+        """
+        测试无记录时返回0
+        """
+        self.assertEqual(self.db.calculate_core_metrics(99), (0, 0.0, 0.0, 0.0))
+
+    def test_query_uses_covering_index(self):
+        """
+        测试聚合查询完全由覆盖索引满足
+        """
+        with self.db._connect() as conn:
+            plan = [row["detail"] for row in conn.execute(
+                "EXPLAIN QUERY PLAN " + SQLiteDatabase.CORE_METRICS_QUERY, (1,))]
+        self.assertTrue(any("USING COVERING INDEX idx_fitness_records_user_checkin" in step for step in plan), plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按天累计序列测试模块
+验证树状数组区间求和、补录更新，以及DAL中序列与数据库的一致性
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import threading
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.dal.daily_series import DailyFenwick, UserDailySeries, DailySeriesCache, METRICS, series_cache
+from self_health_mis.data.dal.base_dal import to_day_key
+from self_health_mis.data.dal import exercise_dal
+from test_exercise_dal import ExerciseDalTestCase
+
+
+class TestDailyFenwick(unittest.TestCase):
+    """
+    测试树状数组
+    """
+
+    def test_random_updates_match_brute_force(self):
+        """
+        测试随机补录（含超出当前范围的早于/晚于日期）后区间求和与逐天累加一致
+        """
+        rng = random.Random(3)
+        tree = DailyFenwick.empty(20000, capacity=4)
+        daily = {}
+        for _ in range(500):
+            day = rng.randint(19900, 20200)
+            delta = [1, rng.uniform(10, 60), rng.uniform(0, 10), rng.randint(0, 500)]
+            tree.add(day, delta)
+            daily[day] = np.add(daily.get(day, np.zeros(len(METRICS))), delta)
+
+        for _ in range(200):
+            start = rng.randint(19850, 20250)
+            end = start + rng.randint(-5, 120)
+            expected = sum((v for d, v in daily.items() if start <= d <= end), np.zeros(len(METRICS)))
+            np.testing.assert_allclose(tree.range_sum(start, end), expected, atol=1e-6)
+
+    def test_series_from_rows(self):
+        """
+        测试由分组聚合行构建序列，并按锻炼类型过滤
+        """
+        rows = [(100, "跑步", 2, 60.0, 10.0, 600), (101, "游泳", 1, 30.0, None, None), (105, "跑步", 1, 20.0, 3.0, 200)]
+        series = UserDailySeries.from_rows(rows, version=4)
+        self.assertEqual(series.range_sums(100, 105)["count"], 4)
+        self.assertEqual(series.range_sum("distance", 100, 105, ["跑步"]), 13.0)
+        self.assertEqual(series.range_sum("duration", 101, 104), 30.0)
+        self.assertEqual(series.range_sum("count", 100, 105, ["不存在"]), 0)
+        series.add(99, "骑行", (1, 45, 15, 300))
+        self.assertEqual(series.totals()["duration"], 155.0)
+        self.assertEqual(sorted(series.exercise_types()), ["游泳", "跑步", "骑行"])
+
+
+class TestDailySeriesCache(unittest.TestCase):
+    """
+    测试序列缓存的增量更新与失效
+    """
+
+    def test_apply_only_on_matching_version(self):
+        """
+        测试只有序列正好是写入前的版本时才增量计入，否则丢弃序列
+        """
+        cache = DailySeriesCache()
+        series = cache.get(1, 10, lambda: UserDailySeries.from_rows([(5, "跑步", 1, 30, 0, 0)], version=10))
+        cache.apply_records(1, 10, 12, [(5, "跑步", 30, None, None)])
+        self.assertEqual(series.range_sum("count", 0, 10), 2)
+        self.assertEqual(series.version, 12)
+        cache.advance(1, 12, 13)
+        self.assertIs(cache.get(1, 13, lambda: self.fail("不应重新加载")), series)
+
+        # 中间有其他写入（版本对不上）：不在旧序列上叠加，下次取用时重新加载
+        cache.apply_records(1, 20, 22, [(5, "跑步", 30, None, None)])
+        self.assertEqual(series.range_sum("count", 0, 10), 2)
+        reloaded = cache.get(1, 22, lambda: UserDailySeries(version=22))
+        self.assertIsNot(reloaded, series)
+
+    def test_version_change_reloads(self):
+        """
+        测试用户数据版本变化时重新加载，版本未变时复用
+        """
+        cache = DailySeriesCache()
+        loads = []
+
+        def loader(version):
+            loads.append(version)
+            return UserDailySeries(version=version)
+
+        cache.get(1, 10, lambda: loader(10))
+        cache.get(1, 10, lambda: loader(10))
+        self.assertEqual(loads, [10])
+        cache.get(2, 3, lambda: loader(3))
+        cache.get(1, 12, lambda: loader(12))
+        self.assertEqual(loads, [10, 3, 12])
+        # 其他用户的版本变化不影响已加载的序列
+        cache.get(2, 3, lambda: loader(3))
+        self.assertEqual(loads, [10, 3, 12])
+
+    def test_lru_eviction(self):
+        """
+        测试超过容量时淘汰最久未访问的用户序列
+        """
+        cache = DailySeriesCache(max_entries=2)
+        loads = []
+
+        def get(user_id):
+            return cache.get(user_id, 0, lambda: loads.append(user_id) or UserDailySeries())
+
+        get(1)
+        get(2)
+        get(1)  # 用户1变为最近访问
+        get(3)
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+        get(1)
+        self.assertEqual(loads, [1, 2, 3])
+        get(2)  # 用户2已被淘汰，重新加载
+        self.assertEqual(loads, [1, 2, 3, 2])
+        self.assertEqual(len(cache), 2)
+
+
+    def test_load_runs_outside_lock(self):
+        """
+        测试一个用户加载期间其他用户的序列仍可取用，且加载完成时不覆盖缓存中更新的版本
+        """
+        cache = DailySeriesCache()
+        cache.get(2, 5, lambda: UserDailySeries(version=5))
+        other = []
+
+        def slow_loader():
+            thread = threading.Thread(target=lambda: other.append(cache.get(2, 5, lambda: self.fail("不应重新加载"))))
+            thread.start()
+            thread.join(2)
+            self.assertFalse(thread.is_alive())
+            # 加载期间本进程的写入已把缓存中的序列推进到更新的版本
+            cache._series[1] = UserDailySeries(version=9)
+            return UserDailySeries(version=7)
+
+        loaded = cache.get(1, 7, slow_loader)
+        self.assertEqual(len(other), 1)
+        self.assertEqual(loaded.version, 7)
+        self.assertEqual(cache.get(1, 9, lambda: self.fail("不应重新加载")).version, 9)
+
+    def test_concurrent_reads_during_growth(self):
+        """
+        测试写入不断扩容树状数组时，并发读取的合计始终是某个一致状态（单调不减且为整数条数）
+        """
+        series = UserDailySeries()
+        total = 3000
+        seen = []
+        done = threading.Event()
+
+        errors = []
+
+        def reader():
+            try:
+                while not done.is_set():
+                    seen.append(series.range_sum("count", -10 ** 6, 10 ** 6))
+            except Exception as e:
+                errors.append(e)
+
+        # 缩短线程切换间隔，让读取更容易落在扩容过程中
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        thread = threading.Thread(target=reader)
+        thread.start()
+        for i in range(total):
+            # 交替向两端补录，频繁触发扩容
+            series.add(i if i % 2 else -i, "跑步", (1, 1, 0, 0))
+        done.set()
+        thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(series.totals()["count"], total)
+        self.assertTrue(all(a <= b for a, b in zip(seen, seen[1:])))
+        self.assertTrue(all(value == int(value) and 0 <= value <= total for value in seen))
+
+class TestDailySeriesDal(ExerciseDalTestCase):
+    """
+    测试DAL中的按天累计序列
+    """
+
+    def test_series_follows_writes(self):
+        """
+        测试单条和批量写入后序列与数据库重新加载的结果一致
+        """
+        exercise_dal.add_fitness_record(self.make_record(days_ago=3, duration=30))
+        series = exercise_dal.get_daily_series(1)
+        exercise_dal.add_fitness_record(self.make_record(days_ago=1, duration=20))
+        exercise_dal.add_fitness_records_bulk([
+            self.make_record(days_ago=40, exercise_type="游泳", duration=50, distance=1),
+            self.make_record(days_ago=2, duration=10, calories=100),
+        ], update_goals=False)
+        self.assertIs(exercise_dal.get_daily_series(1), series)
+
+        today = to_day_key(self.now)
+        self.assertEqual(series.range_sums(today - 3, today)["duration"], 60)
+        self.assertEqual(series.totals()["count"], 4)
+
+        with self.db._connect() as conn:
+            reloaded = UserDailySeries.from_rows(conn.execute(exercise_dal.DAILY_SERIES_QUERY, (1,)))
+        self.assertEqual(series.totals(), reloaded.totals())
+
+    def test_in_process_writes_keep_series(self):
+        """
+        测试本进程的写入（含目标进度更新）增量更新序列，不触发重新加载
+        """
+        self.add_goal(target_value=100)
+        exercise_dal.add_fitness_record(self.make_record(duration=30))
+        series = exercise_dal.get_daily_series(1)
+        exercise_dal.add_fitness_record(self.make_record(duration=20))
+        exercise_dal.add_fitness_records_bulk([self.make_record(duration=10), self.make_record(user_id=2)])
+        exercise_dal.auto_update_goal_progress(1)
+        self.assertIs(exercise_dal.get_daily_series(1), series)
+        self.assertEqual(series.totals()["duration"], 60)
+
+    def test_detects_writes_from_other_connection(self):
+        """
+        测试另一个连接（其他进程）新增、修改、删除记录后序列重新加载，且与数据库一致；
+        新增记录的ID小于本进程已写入的ID时同样能发现
+        """
+        exercise_dal.add_fitness_record(self.make_record(duration=30))
+        exercise_dal.add_fitness_record(self.make_record(days_ago=2, duration=40))
+        self.assertEqual(exercise_dal.get_daily_series(1).totals()["count"], 2)
+        other = sqlite3.connect(self.db.db_name, isolation_level=None)
+        self.addCleanup(other.close)
+
+        def assert_matches_database():
+            series = exercise_dal.get_daily_series(1)
+            with self.db._connect() as conn:
+                reloaded = UserDailySeries.from_rows(conn.execute(exercise_dal.DAILY_SERIES_QUERY, (1,)))
+            self.assertEqual(series.totals(), reloaded.totals())
+            today = to_day_key(self.now)
+            self.assertEqual(series.range_sums(today - 5, today), reloaded.range_sums(today - 5, today))
+            return series
+
+        # 显式指定较小的ID：不能只靠最大记录ID判断有无新写入
+        other.execute("INSERT INTO fitness_records (id, user_id, date, exercise_type, duration) VALUES (?, ?, ?, ?, ?)",
+                      (0, 1, (self.now - timedelta(days=3)).isoformat(), "跑步", 15.0))
+        self.assertEqual(assert_matches_database().totals()["duration"], 85)
+
+        other.execute("UPDATE fitness_records SET duration = 100 WHERE duration = 40")
+        self.assertEqual(assert_matches_database().totals()["duration"], 145)
+
+        other.execute("DELETE FROM fitness_records WHERE duration = 30")
+        series = assert_matches_database()
+        self.assertEqual((series.totals()["count"], series.totals()["duration"]), (2, 115))
+
+    def test_cache_update_failure_keeps_committed_record(self):
+        """
+        测试提交后更新序列缓存出错时仍返回已提交的记录ID，并丢弃该用户的序列
+        """
+        exercise_dal.add_fitness_record(self.make_record(duration=30))
+        series = exercise_dal.get_daily_series(1)
+        with mock.patch.object(series_cache, "apply_records", side_effect=RuntimeError("缓存异常")):
+            record_id = exercise_dal.add_fitness_record(self.make_record(duration=20))
+        self.assertGreater(record_id, 0)
+        with self.db._connect() as conn:
+            row = conn.execute("SELECT duration FROM fitness_records WHERE id = ?", (record_id,)).fetchone()
+        self.assertEqual(row[0], 20)
+        reloaded = exercise_dal.get_daily_series(1)
+        self.assertIsNot(reloaded, series)
+        self.assertEqual(reloaded.totals()["duration"], 50)
+
+    def test_goal_progress_matches_sql_aggregate(self):
+        """
+        测试基于序列的目标进度与SQL聚合对账结果一致
+        """
+        goal_ids = [self.add_goal(goal_type=t, target_value=100000)
+                    for t in ("每周跑步次数", "每周锻炼总时长(分钟)", "每月跑步距离", "力量训练次数")]
+        rng = random.Random(5)
+        exercise_dal.add_fitness_records_bulk([
+            self.make_record(days_ago=rng.randint(-10, 10), exercise_type=rng.choice(["跑步", "深蹲", "游泳"]),
+                             duration=rng.randint(10, 60), distance=rng.choice([None, 3.5]))
+            for _ in range(60)
+        ], update_goals=False)
+
+        exercise_dal.auto_update_goal_progress(1)
+        goals = {g.id: g.current_value for g in exercise_dal.get_fitness_goals(1)}
+        with self.db._connect() as conn:
+            conn.execute("UPDATE fitness_goals SET current_value = 0")
+        exercise_dal.reconcile_all_goal_progress()
+        reconciled = {g.id: g.current_value for g in exercise_dal.get_fitness_goals(1)}
+        for goal_id in goal_ids:
+            self.assertAlmostEqual(goals[goal_id], reconciled[goal_id])
+            self.assertGreater(goals[goal_id], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每次运行的数据上下文测试模块
+验证同一次运行内数据集只读取一次、写入后自动作废，以及按线程的SQL计数
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.core import data_context
+from self_health_mis.core.data_context import RerunDataContext
+from self_health_mis.core.read_cache import read_cache
+from self_health_mis.data.dal import exercise_dal, user_dal
+from self_health_mis.data.sqlite_conn import QueryCounter, query_counter
+from test_exercise_dal import ExerciseDalTestCase
+
+
+class TestQueryCounter(unittest.TestCase):
+    """
+    测试QueryCounter
+    """
+
+    def test_counts_per_thread_without_transaction_control(self):
+        counter = QueryCounter()
+        for statement in ("BEGIN", "SELECT 1", "-- TRIGGER trg_x", "UPDATE t SET a = 1", "COMMIT"):
+            counter.record(statement)
+        self.assertEqual(counter.count(), 2)
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(counter.count()))
+        thread.start()
+        thread.join()
+        self.assertEqual(other, [0])
+        counter.reset()
+        self.assertEqual(counter.count(), 0)
+
+
+class TestRerunDataContext(ExerciseDalTestCase):
+    """
+    测试RerunDataContext（读取函数替换为直接访问临时数据库的DAL）
+    """
+
+    def setUp(self):
+        super().setUp()
+        read_cache.clear()
+        self.addCleanup(read_cache.clear)
+        self.loads = 0
+
+        def records(user_id):
+            self.loads += 1
+            return exercise_dal.get_fitness_records(user_id)
+
+        patcher = mock.patch.object(data_context, "get_user_exercise_records", records)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_dataset_loaded_once_per_run(self):
+        exercise_dal.add_fitness_record(self.make_record())
+        context = RerunDataContext(1)
+        first = context.records()
+        self.assertGreater(context.query_count(), 0)
+        queries = context.query_count()
+        second = context.records()
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(context.query_count(), queries)
+        self.assertEqual(context.summary(), {"queries": queries, "loads": 1, "reused": 1})
+        # 各组件拿到独立的列表
+        first.clear()
+        self.assertEqual(len(second), 1)
+        self.assertEqual(len(context.records()), 1)
+
+    def test_write_during_run_invalidates(self):
+        context = RerunDataContext(1)
+        self.assertEqual(context.records(), [])
+        exercise_dal.add_fitness_record(self.make_record())
+        self.assertEqual(len(context.records()), 1)
+        self.assertEqual(self.loads, 2)
+
+    def test_new_run_resets_query_count(self):
+        RerunDataContext(1).records()
+        self.assertGreater(query_counter.count(), 0)
+        self.assertEqual(RerunDataContext(1).query_count(), 0)
+
+
+    def test_profile_queries_are_counted(self):
+        """
+        测试读取用户资料的查询计入本次rerun的SQL计数（资料与记录使用同一个连接池）
+        """
+        patcher = mock.patch.object(user_dal, "db_instance", self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        context = RerunDataContext(1)
+        self.assertEqual(context.profile().user_id, 1)
+        self.assertGreater(context.query_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
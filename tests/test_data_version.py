@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户数据版本测试模块
+用独立的sqlite3连接模拟另一个进程写入，验证版本校验能让进程内缓存失效
+"""
+
+import os
+import sqlite3
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.core.read_cache import UserReadCache
+from self_health_mis.data.dal import exercise_dal
+from self_health_mis.data.dal.data_version import DataVersionTracker
+from test_exercise_dal import ExerciseDalTestCase
+
+
+class TestDataVersion(ExerciseDalTestCase):
+    """
+    测试DataVersionTracker及其在缓存中的使用
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tracker = DataVersionTracker(lambda: self.db)
+        self.addCleanup(self.tracker.close)
+        # 另一个进程的连接（数据库须已建表和迁移）
+        self.db.initialize()
+        self.other = sqlite3.connect(self.db.db_name)
+        self.addCleanup(self.other.close)
+
+    def other_process_update(self, user_id, duration):
+        self.other.execute("UPDATE fitness_records SET duration = ? WHERE user_id = ?", (duration, user_id))
+        self.other.commit()
+
+    def test_unchanged_database_skips_version_read(self):
+        """
+        测试数据库未变化时只查PRAGMA data_version，不再读取data_versions
+        """
+        exercise_dal.add_fitness_record(self.make_record())
+        version = self.tracker.get(1)
+        self.assertGreater(version, 0)
+        for _ in range(5):
+            self.assertEqual(self.tracker.get(1), version)
+        stats = self.tracker.stats()
+        self.assertEqual((stats["checks"], stats["version_reads"], stats["db_changes"]), (6, 1, 1))
+        self.assertEqual(self.tracker.get(2), 0)
+
+    def test_other_process_write_changes_version(self):
+        """
+        测试其他连接提交的写入只改变涉及用户的版本
+        """
+        exercise_dal.add_fitness_record(self.make_record(user_id=1))
+        exercise_dal.add_fitness_record(self.make_record(user_id=2))
+        v1, v2 = self.tracker.get(1), self.tracker.get(2)
+        self.other_process_update(1, 99.0)
+        self.assertGreater(self.tracker.get(1), v1)
+        self.assertEqual(self.tracker.get(2), v2)
+
+    def test_read_cache_detects_other_process_write(self):
+        """
+        测试读缓存在其他进程修改数据后重新加载，其他用户的缓存项保留
+        """
+        cache = UserReadCache(version_source=self.tracker.get)
+        exercise_dal.add_fitness_record(self.make_record(user_id=1))
+        exercise_dal.add_fitness_record(self.make_record(user_id=2))
+        load = lambda user_id: lambda: [r.duration for r in exercise_dal.get_fitness_records(user_id)]
+        self.assertEqual(cache.get_or_load(1, "durations", (), load(1)), [30.0])
+        self.assertEqual(cache.get_or_load(2, "durations", (), load(2)), [30.0])
+
+        self.other_process_update(1, 45.0)
+        self.assertEqual(cache.get_or_load(1, "durations", (), load(1)), [45.0])
+        self.assertEqual(cache.get_or_load(2, "durations", (), load(2)), [30.0])
+        stats = cache.stats()
+        self.assertEqual((stats["stale"], stats["hits"]), (1, 1))
+
+    def test_stats_cache_detects_record_update(self):
+        """
+        测试统计结果缓存在记录被修改（非追加）后失效
+        """
+        exercise_dal.add_fitness_record(self.make_record(days_ago=0))
+        self.assertEqual(exercise_dal.get_exercise_stats(1, "week")["duration"].sum(), 30.0)
+        self.other_process_update(1, 50.0)
+        self.assertEqual(exercise_dal.get_exercise_stats(1, "week")["duration"].sum(), 50.0)
+
+    def test_unmigrated_database_returns_none(self):
+        """
+        测试没有data_versions表时返回None（不做校验）
+        """
+        self.other.execute("DROP TABLE data_versions")
+        self.other.commit()
+        self.assertIsNone(self.tracker.get(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
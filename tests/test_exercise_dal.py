@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+锻炼数据访问层测试模块
+使用临时数据库替换全局db_instance，验证记录/目标相关的DAL函数
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.sqlite_conn import SQLiteDatabase
+from self_health_mis.data.dal import exercise_dal
+from self_health_mis.data.dal.daily_series import series_cache
+from self_health_mis.data.dal.stats_buckets import stats_cache
+from self_health_mis.data.model.exercise_model import FitnessRecord
+from self_health_mis.data.model.goal_model import FitnessGoal
+from self_health_mis.data.model.goal_types import GoalType, register_goal_type, get_goal_type
+
+
+class ExerciseDalTestCase(unittest.TestCase):
+    """
+    每个测试使用独立的临时数据库
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = SQLiteDatabase(db_name=os.path.join(self.tmp_dir.name, "dal_test.db"))
+        patcher = mock.patch.object(exercise_dal, "db_instance", self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # 按天累计序列、统计结果缓存按用户ID和记录ID保存，每个测试换了数据库，需清空
+        series_cache.clear()
+        stats_cache.clear()
+        self.now = datetime.now().replace(microsecond=0)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def make_record(self, user_id=1, days_ago=1, exercise_type="跑步", duration=30.0, distance=5.0, **kwargs):
+        return FitnessRecord(
+            user_id=user_id,
+            date=self.now - timedelta(days=days_ago),
+            exercise_type=exercise_type,
+            duration=duration,
+            distance=distance,
+            **kwargs
+        )
+
+    def add_goal(self, user_id=1, goal_type="每周跑步次数", target_value=10.0):
+        return exercise_dal.add_fitness_goal(FitnessGoal(
+            user_id=user_id,
+            goal_type=goal_type,
+            target_value=target_value,
+            start_date=self.now - timedelta(days=7),
+            end_date=self.now + timedelta(days=7)
+        ))
+
+
+class TestBulkInsert(ExerciseDalTestCase):
+    """
+    测试批量添加锻炼记录
+    """
+
+    def test_returns_ids_and_errors_per_row(self):
+        """
+        测试合法记录返回ID、非法记录返回错误，且二者位置与输入一致
+        """
+        records = [
+            self.make_record(user_id=1, days_ago=3),
+            self.make_record(user_id=1, duration=0),
+            self.make_record(user_id=2, days_ago=2, exercise_type="游泳", distance=None),
+            self.make_record(user_id=None),
+            self.make_record(user_id=1, days_ago=1, intensity=7.5, is_checkin=True),
+        ]
+        results = exercise_dal.add_fitness_records_bulk(records)
+
+        self.assertEqual(len(results), len(records))
+        self.assertIsNotNone(results[1]["error"])
+        self.assertIsNotNone(results[3]["error"])
+        ok = [r for r in results if r["error"] is None]
+        self.assertEqual(len(ok), 3)
+
+        with self.db._connect() as conn:
+            stored = {row["id"]: row for row in conn.execute("SELECT * FROM fitness_records")}
+        self.assertEqual(set(stored), {r["id"] for r in ok})
+        self.assertEqual(stored[results[2]["id"]]["exercise_type"], "游泳")
+        self.assertEqual(stored[results[4]["id"]]["intensity"], 7.5)
+        self.assertEqual(stored[results[4]["id"]]["is_checkin"], 1)
+
+    def test_goals_recomputed_once_per_user(self):
+        """
+        测试批量插入后每个用户只重算一次目标进度
+        """
+        goal_id = self.add_goal(user_id=1)
+        records = [self.make_record(user_id=1, days_ago=d) for d in range(1, 5)]
+        records.append(self.make_record(user_id=2))
+
+        with mock.patch.object(exercise_dal, "auto_update_goal_progress",
+                               wraps=exercise_dal.auto_update_goal_progress) as recompute:
+            exercise_dal.add_fitness_records_bulk(records)
+        self.assertEqual(sorted(call.args[0] for call in recompute.call_args_list), [1, 2])
+
+        goal = next(g for g in exercise_dal.get_fitness_goals(1) if g.id == goal_id)
+        self.assertEqual(goal.current_value, 4)
+
+    def test_all_invalid_does_not_touch_database(self):
+        """
+        测试全部非法时不写入任何数据
+        """
+        results = exercise_dal.add_fitness_records_bulk([self.make_record(duration=-1)])
+        self.assertIsNone(results[0]["id"])
+        self.assertEqual(exercise_dal.get_fitness_records(1), [])
+
+
+class TestRecordsPagination(ExerciseDalTestCase):
+    """
+    测试锻炼记录键集分页
+    """
+
+    def test_pages_cover_all_records_in_order(self):
+        """
+        测试逐页翻到底时不重不漏，且与一次性查询的顺序一致
+        """
+        # 同一时间点的多条记录依靠ID区分先后
+        records = [self.make_record(days_ago=d // 3, is_official=d % 2 == 0) for d in range(20)]
+        exercise_dal.add_fitness_records_bulk(records, update_goals=False)
+        expected = [r.id for r in exercise_dal.get_fitness_records(1, is_official=True)]
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            page, cursor = exercise_dal.get_fitness_records_page(1, is_official=True, after=cursor, limit=3)
+            seen.extend(r.id for r in page)
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 4)
+
+    def test_filters_pushed_into_query(self):
+        """
+        测试日期范围过滤并返回核心指标字段
+        """
+        exercise_dal.add_fitness_records_bulk(
+            [self.make_record(days_ago=d, intensity=6.0, is_checkin=True) for d in range(1, 11)],
+            update_goals=False
+        )
+        page, cursor = exercise_dal.get_fitness_records_page(
+            1, start_date=self.now - timedelta(days=5), end_date=self.now, limit=10
+        )
+        self.assertEqual(len(page), 5)
+        self.assertIsNone(cursor)
+        self.assertTrue(page[0].is_checkin)
+        self.assertEqual(page[0].intensity, 6.0)
+
+    def test_invalid_arguments(self):
+        """
+        测试非法参数返回空页
+        """
+        self.assertEqual(exercise_dal.get_fitness_records_page(0), ([], None))
+        self.assertEqual(exercise_dal.get_fitness_records_page(1, limit=0), ([], None))
+
+
+class TestGoalProgress(ExerciseDalTestCase):
+    """
+    测试基于聚合查询的目标进度重算
+    """
+
+    def goal(self, goal_id, user_id=1):
+        return next(g for g in exercise_dal.get_fitness_goals(user_id) if g.id == goal_id)
+
+    def test_progress_per_goal_type(self):
+        """
+        测试各类目标只统计周期内、符合类型的记录
+        """
+        runs = self.add_goal(goal_type="每周跑步次数", target_value=10)
+        minutes = self.add_goal(goal_type="每周锻炼总时长(分钟)", target_value=1000)
+        distance = self.add_goal(goal_type="每月跑步距离", target_value=100)
+        strength = self.add_goal(goal_type="力量训练次数", target_value=10)
+        unknown = self.add_goal(goal_type="自定义目标", target_value=10)
+        exercise_dal.add_fitness_records_bulk([
+            self.make_record(days_ago=1, duration=30, distance=5),
+            self.make_record(days_ago=2, duration=40, distance=None),
+            self.make_record(days_ago=3, exercise_type="深蹲", duration=20, distance=None),
+            self.make_record(days_ago=4, exercise_type="游泳", duration=50, distance=1),
+            # 周期之外的记录不计入
+            self.make_record(days_ago=30, duration=60, distance=10),
+            # 其他用户的记录不计入
+            self.make_record(user_id=2, days_ago=1, duration=60, distance=10),
+        ], update_goals=False)
+
+        exercise_dal.auto_update_goal_progress(1)
+        self.assertEqual(self.goal(runs).current_value, 2)
+        self.assertEqual(self.goal(minutes).current_value, 140)
+        self.assertEqual(self.goal(distance).current_value, 5)
+        self.assertEqual(self.goal(strength).current_value, 1)
+        self.assertEqual(self.goal(unknown).current_value, 0)
+
+    def test_completion_caps_progress(self):
+        """
+        测试达到目标值时进度封顶并标记完成
+        """
+        goal_id = self.add_goal(goal_type="每周跑步次数", target_value=2)
+        exercise_dal.add_fitness_records_bulk([self.make_record(days_ago=d) for d in range(1, 4)],
+                                              update_goals=False)
+        exercise_dal.auto_update_goal_progress(1)
+        goal = self.goal(goal_id)
+        self.assertEqual(goal.current_value, 2)
+        self.assertTrue(goal.is_completed)
+
+    def test_reconcile_all_users(self):
+        """
+        测试全部用户对账修正被改乱的进度，且再次执行时没有变化
+        """
+        goals = {user_id: self.add_goal(user_id=user_id, target_value=10) for user_id in (1, 2, 3)}
+        exercise_dal.add_fitness_records_bulk(
+            [self.make_record(user_id=u, days_ago=d) for u in (1, 2) for d in range(1, u + 2)],
+            update_goals=False
+        )
+        with self.db._connect() as conn:
+            conn.execute("UPDATE fitness_goals SET current_value = 7")
+
+        self.assertEqual(exercise_dal.reconcile_all_goal_progress(), 3)
+        self.assertEqual([self.goal(goals[u], u).current_value for u in (1, 2, 3)], [2, 3, 0])
+        self.assertEqual(exercise_dal.reconcile_all_goal_progress(), 0)
+
+
+class TestIncrementalGoalUpdates(ExerciseDalTestCase):
+    """
+    测试写入记录时在同一事务内原子递增目标进度
+    """
+
+    def goal(self, goal_id, user_id=1):
+        return next(g for g in exercise_dal.get_fitness_goals(user_id) if g.id == goal_id)
+
+    def test_insert_increments_matching_goals(self):
+        """
+        测试新增记录只递增类型匹配且周期包含记录日期的目标
+        """
+        runs = self.add_goal(goal_type="每周跑步次数", target_value=10)
+        minutes = self.add_goal(goal_type="每周锻炼总时长(分钟)", target_value=100)
+        strength = self.add_goal(goal_type="力量训练次数", target_value=10)
+
+        exercise_dal.add_fitness_record(self.make_record(duration=30))
+        exercise_dal.add_fitness_record(self.make_record(exercise_type="深蹲", duration=20, distance=None))
+        # 周期之外的记录不计入
+        exercise_dal.add_fitness_record(self.make_record(days_ago=30, duration=45))
+
+        self.assertEqual(self.goal(runs).current_value, 1)
+        self.assertEqual(self.goal(minutes).current_value, 50)
+        self.assertEqual(self.goal(strength).current_value, 1)
+
+    def test_completion_flag_flips_in_same_statement(self):
+        """
+        测试增量超过目标值时进度封顶并同时标记完成
+        """
+        goal_id = self.add_goal(goal_type="每周锻炼总时长(分钟)", target_value=50)
+        exercise_dal.add_fitness_record(self.make_record(duration=30))
+        self.assertFalse(self.goal(goal_id).is_completed)
+        exercise_dal.add_fitness_record(self.make_record(duration=30))
+        goal = self.goal(goal_id)
+        self.assertEqual(goal.current_value, 50)
+        self.assertTrue(goal.is_completed)
+
+    def test_goal_update_failure_rolls_back_insert(self):
+        """
+        测试目标更新失败时记录插入一并回滚
+        """
+        self.add_goal()
+        with mock.patch.object(exercise_dal, "_apply_record_to_goals", side_effect=RuntimeError("boom")):
+            self.assertEqual(exercise_dal.add_fitness_record(self.make_record()), -1)
+        self.assertEqual(exercise_dal.get_fitness_records(1), [])
+
+    def test_concurrent_inserts_do_not_lose_increments(self):
+        """
+        测试多线程并发写入时增量不会互相覆盖
+        """
+        goal_id = self.add_goal(goal_type="每周跑步次数", target_value=1000)
+
+        def worker():
+            for _ in range(10):
+                exercise_dal.add_fitness_record(self.make_record())
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.goal(goal_id).current_value, 40)
+
+    def test_incremental_matches_recompute(self):
+        """
+        测试增量结果与聚合重算结果一致
+        """
+        goal_ids = [self.add_goal(goal_type=t, target_value=1000)
+                    for t in ("每周跑步次数", "每周锻炼总时长(分钟)", "每月跑步距离", "力量训练次数")]
+        for d, kind in enumerate(["跑步", "游泳", "举重", "跑步", "深蹲"]):
+            exercise_dal.add_fitness_record(self.make_record(days_ago=d, exercise_type=kind, duration=10 + d))
+        incremental = [self.goal(g).current_value for g in goal_ids]
+        with self.db._connect() as conn:
+            conn.execute("UPDATE fitness_goals SET current_value = 0")
+        exercise_dal.auto_update_goal_progress(1)
+        self.assertEqual([self.goal(g).current_value for g in goal_ids], incremental)
+
+
+class TestGoalTypeRegistry(ExerciseDalTestCase):
+    """
+    测试目标类型注册表生成的SQL
+    """
+
+    def goal(self, goal_id, user_id=1):
+        return next(g for g in exercise_dal.get_fitness_goals(user_id) if g.id == goal_id)
+
+    def test_builtin_types_registered(self):
+        """
+        测试内置目标类型均已登记
+        """
+        for name in ("每周跑步次数", "每周锻炼总时长(分钟)", "每月跑步距离", "力量训练次数"):
+            self.assertIsNotNone(get_goal_type(name))
+        with self.assertRaises(ValueError):
+            GoalType("非法指标", "heart_rate")
+
+    def test_new_type_works_on_both_paths(self):
+        """
+        测试运行时登记的新目标类型同时用于增量更新和聚合重算，且两者结果一致
+        """
+        register_goal_type(GoalType("游泳骑行卡路里", "calories", ("游泳", "骑行"), window_days=7, unit="kcal"))
+        goal_id = self.add_goal(goal_type="游泳骑行卡路里", target_value=10000)
+
+        exercise_dal.add_fitness_record(self.make_record(exercise_type="游泳", calories=300))
+        exercise_dal.add_fitness_record(self.make_record(exercise_type="骑行", calories=200))
+        exercise_dal.add_fitness_record(self.make_record(exercise_type="跑步", calories=500))
+        exercise_dal.add_fitness_record(self.make_record(exercise_type="骑行", calories=None))
+        self.assertEqual(self.goal(goal_id).current_value, 500)
+
+        with self.db._connect() as conn:
+            conn.execute("UPDATE fitness_goals SET current_value = 0")
+        exercise_dal.auto_update_goal_progress(1)
+        self.assertEqual(self.goal(goal_id).current_value, 500)
+
+    def test_names_are_quoted(self):
+        """
+        测试类型名称中的单引号被正确转义
+        """
+        register_goal_type(GoalType("Tom's 跑步", "count", ("跑步",)))
+        goal_id = self.add_goal(goal_type="Tom's 跑步")
+        exercise_dal.add_fitness_record(self.make_record())
+        self.assertEqual(self.goal(goal_id).current_value, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打卡日历热力图组件测试模块
+验证向量化网格与原逐行填充结果一致、全年网格的位置，以及按数据版本缓存图片
+"""
+
+import os
+import sys
+import unittest
+from datetime import date
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.frontend.components import heatmap
+from self_health_mis.frontend.components.heatmap import build_month_grid, build_year_grid, get_heatmap_image
+
+
+def loop_month_grid(daily, year, month):
+    """原实现：补全当月日期后逐行填入网格"""
+    month_start = pd.Timestamp(year=year, month=month, day=1)
+    full_dates = pd.date_range(start=month_start, end=month_start + pd.offsets.MonthEnd(1), freq='D')
+    combined = pd.Series(0.0, index=full_dates)
+    combined.update(daily)
+    max_week = min((full_dates[-1].day - 1) // 7 + 1, 6)
+    grid = np.zeros((7, max_week))
+    for day, value in combined.items():
+        grid[day.weekday(), (day.day - 1) // 7] = value
+    return grid
+
+
+class TestHeatmapGrid(unittest.TestCase):
+    """
+    测试网格构建
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        days = pd.date_range("2024-01-01", "2024-12-31", freq="D")
+        self.daily = pd.Series(rng.integers(0, 11, len(days)).astype(float), index=days)
+
+    def test_month_grid_matches_loop(self):
+        for month in (2, 3, 9, 12):
+            with self.subTest(month=month):
+                np.testing.assert_array_equal(build_month_grid(self.daily, 2024, month),
+                                              loop_month_grid(self.daily, 2024, month))
+
+    def test_missing_days_are_zero(self):
+        grid = build_month_grid(pd.Series([7.0], index=[pd.Timestamp("2025-02-10")]), 2025, 2)
+        self.assertEqual(grid.shape, (7, 4))
+        self.assertEqual(grid.sum(), 7.0)
+        self.assertEqual(grid[0, 1], 7.0)  # 2025-02-10为周一，第2周
+        self.assertEqual(build_month_grid(pd.Series(dtype=float), 2025, 2).sum(), 0)
+
+    def test_year_grid_positions(self):
+        grid = build_year_grid(self.daily, 2024)
+        # 2024-01-01为周一，366天共53列
+        self.assertEqual(grid.shape, (7, 53))
+        self.assertEqual(np.isnan(grid).sum(), 7 * 53 - 366)
+        self.assertEqual(np.nansum(grid), self.daily.sum())
+        day = pd.Timestamp("2024-07-04")
+        column = (day.dayofyear - 1 + date(2024, 1, 1).weekday()) // 7
+        self.assertEqual(grid[day.weekday(), column], self.daily[day])
+        # 2025-01-01为周三：首列周一、周二不属于该年
+        grid_2025 = build_year_grid(pd.Series(dtype=float), 2025)
+        self.assertTrue(np.isnan(grid_2025[:2, 0]).all())
+        self.assertEqual(grid_2025[2, 0], 0)
+
+
+class TestHeatmapCache(unittest.TestCase):
+    """
+    测试图片缓存（绘制函数和数据版本替换为测试桩）
+    """
+
+    def setUp(self):
+        heatmap.heatmap_cache.clear()
+        self.addCleanup(heatmap.heatmap_cache.clear)
+        self.version = 1
+        self.loads = []
+        for target, value in (
+            ("render_month_heatmap", lambda grid, year, month, fmt: f"{month}:{grid.sum()}".encode()),
+            ("render_year_heatmap", lambda grid, year, fmt: f"year:{np.nansum(grid)}".encode()),
+        ):
+            patcher = mock.patch.object(heatmap, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(heatmap.version_tracker, "get", lambda user_id: self.version)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def load(self, start, end):
+        self.loads.append((start, end))
+        return pd.Series([5.0], index=[pd.Timestamp(start)])
+
+    def test_unchanged_version_returns_cached_bytes(self):
+        first = get_heatmap_image(1, 2025, 3, self.load)
+        self.assertEqual(first, b"3:5.0")
+        self.assertEqual(self.loads, [(date(2025, 3, 1), date(2025, 3, 31))])
+        self.assertIs(get_heatmap_image(1, 2025, 3, self.load), first)
+        self.assertEqual(len(self.loads), 1)
+
+        self.version = 2
+        get_heatmap_image(1, 2025, 3, self.load)
+        self.assertEqual(len(self.loads), 2)
+        # 其他用户、其他月份、其他格式各自缓存
+        get_heatmap_image(2, 2025, 3, self.load)
+        get_heatmap_image(1, 2025, 4, self.load)
+        get_heatmap_image(1, 2025, 3, self.load, fmt="svg")
+        self.assertEqual(len(self.loads), 5)
+
+    def test_whole_year(self):
+        self.assertEqual(get_heatmap_image(1, 2025, None, self.load), b"year:5.0")
+        self.assertEqual(self.loads, [(date(2025, 1, 1), date(2025, 12, 31))])
+
+    def test_empty_period_returns_none(self):
+        empty = lambda start, end: pd.Series(dtype=float)
+        self.assertIsNone(get_heatmap_image(1, 2025, 3, empty))
+        self.assertIsNone(get_heatmap_image(1, 2025, 3, self.load))  # 空结果同样被缓存
+        self.assertEqual(self.loads, [])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            get_heatmap_image(1, 2025, 3, self.load, fmt="gif")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库迁移测试模块
+验证旧结构数据库能按user_version升级，且迁移可重复执行
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.migrate import (
+    MIGRATIONS, migrate, update_in_batches, key_ranges, key_range_sql, get_schema_version, column_exists, DAILY_STATS_AGGREGATE
+)
+from data.dal.base_dal import to_day_key, to_ts
+
+
+class TestMigrate(unittest.TestCase):
+    """
+    测试版本化迁移
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "legacy.db")
+        # 构造缺少核心指标字段和索引的旧版数据库
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript('''
+            CREATE TABLE fitness_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                exercise_type TEXT NOT NULL,
+                duration REAL NOT NULL,
+                distance REAL,
+                calories INTEGER,
+                is_official BOOLEAN NOT NULL DEFAULT 0,
+                notes TEXT
+            );
+            CREATE TABLE fitness_goals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                goal_type TEXT NOT NULL,
+                target_value REAL NOT NULL,
+                current_value REAL NOT NULL DEFAULT 0,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                is_completed BOOLEAN NOT NULL DEFAULT 0
+            );
+            CREATE TABLE user_profile (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL UNIQUE,
+                name TEXT NOT NULL
+            );
+        ''')
+        conn.executemany(
+            "INSERT INTO fitness_records (user_id, date, exercise_type, duration) VALUES (?, ?, ?, ?)",
+            [(1, f"2025-01-{day:02d}T08:00:00", "跑步", 30.0) for day in range(1, 29)]
+        )
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_upgrades_legacy_database(self):
+        """
+        测试旧库升级到最新版本并补齐字段和索引
+        """
+        report = migrate(self.db_path, batch_size=7)
+        self.assertEqual([step["version"] for step in report], [m.version for m in MIGRATIONS])
+        self.assertTrue(all(step["seconds"] >= 0 for step in report))
+
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(get_schema_version(conn), MIGRATIONS[-1].version)
+        for column in ("is_checkin", "intensity", "recovery_quality"):
+            self.assertTrue(column_exists(conn, "fitness_records", column))
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertLessEqual({"idx_fitness_records_user_ts", "idx_fitness_records_user_day_stats",
+                              "idx_fitness_goals_user_open"}, indexes)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM fitness_records").fetchone()[0], 28)
+        # 存量记录已回填到按天汇总表（每天一条记录）
+        self.assertEqual(conn.execute("SELECT COUNT(*), SUM(duration) FROM daily_user_stats").fetchone(), (28, 840.0))
+        # 存量记录的整数日期键已分批回填，且与DAL的换算一致
+        for date_text, day_key, ts in conn.execute("SELECT date, day_key, ts FROM fitness_records"):
+            self.assertEqual(day_key, to_day_key(datetime.fromisoformat(date_text)))
+            self.assertEqual(ts, to_ts(datetime.fromisoformat(date_text)))
+        conn.close()
+
+    def test_time_key_triggers(self):
+        """
+        测试绕过DAL写入或修改日期时触发器维护整数日期键
+        """
+        migrate(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        samples = ["2025-03-01T23:59:59.999999", "2025-03-02", "2025-03-02 06:30:00"]
+        for text in samples:
+            conn.execute(
+                "INSERT INTO fitness_records (user_id, date, exercise_type, duration) VALUES (?, ?, ?, ?)",
+                (2, text, "游泳", 20.0)
+            )
+        conn.execute("UPDATE fitness_records SET date = ? WHERE date = ?", ("2024-12-31T12:00:00", samples[0]))
+        conn.execute(
+            "INSERT INTO fitness_goals (user_id, goal_type, target_value, start_date, end_date) VALUES (?, ?, ?, ?, ?)",
+            (2, "每周跑步次数", 3, "2025-03-01T00:00:00", "2025-03-07T00:00:00")
+        )
+        conn.commit()
+
+        rows = conn.execute("SELECT date, day_key, ts FROM fitness_records WHERE user_id = 2").fetchall()
+        self.assertEqual(len(rows), 3)
+        for date_text, day_key, ts in rows:
+            self.assertEqual(day_key, to_day_key(datetime.fromisoformat(date_text)))
+            self.assertEqual(ts, to_ts(datetime.fromisoformat(date_text)))
+        start_key, end_key = conn.execute("SELECT start_day_key, end_day_key FROM fitness_goals").fetchone()
+        self.assertEqual(end_key - start_key, 6)
+        self.assertEqual(start_key, to_day_key(datetime(2025, 3, 1)))
+        conn.close()
+
+    def test_data_version_triggers(self):
+        """
+        测试写入记录/目标/资料时对应用户的数据版本递增，修改user_id时新旧用户都递增
+        """
+        migrate(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        versions = lambda: dict(conn.execute("SELECT user_id, version FROM data_versions"))
+        before = versions()
+        conn.execute("INSERT INTO user_profile (user_id, name) VALUES (3, '张三')")
+        self.assertEqual(versions()[3], 1)
+        conn.execute(
+            "INSERT INTO fitness_goals (user_id, goal_type, target_value, start_date, end_date) VALUES (?, ?, ?, ?, ?)",
+            (3, "每周跑步次数", 3, "2025-03-01T00:00:00", "2025-03-07T00:00:00")
+        )
+        after_goal = versions()[3]
+        self.assertGreater(after_goal, 1)
+        conn.execute("UPDATE fitness_records SET user_id = 3 WHERE date = '2025-01-01T08:00:00'")
+        self.assertGreater(versions()[3], after_goal)
+        self.assertGreater(versions().get(1, 0), before.get(1, 0))
+        version_1 = versions()[1]
+        conn.execute("DELETE FROM fitness_records WHERE user_id = 1")
+        self.assertEqual(versions()[1], version_1 + 27)  # 行级触发器，每删除一行加1
+        conn.close()
+
+    def test_daily_stats_backfill_in_key_ranges(self):
+        """
+        测试按天汇总表按(user_id, day_key)区间分批回填：各批首尾相接，结果与一次聚合相同，重复执行可修正汇总行
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.executemany(
+            "INSERT INTO fitness_records (user_id, date, exercise_type, duration) VALUES (?, ?, ?, ?)",
+            [(user_id, f"2025-01-{day:02d}T{hour:02d}:00:00", "跑步", 10.0)
+             for user_id in (2, 3) for day in range(1, 6) for hour in (7, 19)]
+        )
+        migrate(self.db_path, target=4, batch_size=3)
+
+        keys = ("user_id", "day_key")
+        ranges = list(key_ranges(conn, "fitness_records", keys, "day_key IS NOT NULL", batch_size=3))
+        self.assertGreater(len(ranges), 10)
+        self.assertEqual((ranges[0][0], ranges[-1][1]), (None, None))
+        for (_, high), (low, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(high, low)
+        # 区间按键值划分，同一天的两条记录必然落在同一批；各批行数合计为全部记录
+        counts = [conn.execute(f"SELECT COUNT(*) FROM fitness_records WHERE {sql}", params).fetchone()[0]
+                  for sql, params in (key_range_sql(keys, low, high) for low, high in ranges)]
+        self.assertEqual(sum(counts), 48)
+        self.assertLessEqual(max(counts), 4)
+
+        migrate(self.db_path, target=5, batch_size=3)
+        expected = conn.execute(f"{DAILY_STATS_AGGREGATE} GROUP BY user_id, day_key ORDER BY 1, 2").fetchall()
+        actual = lambda: conn.execute("SELECT * FROM daily_user_stats ORDER BY 1, 2").fetchall()
+        self.assertEqual(actual(), expected)
+        self.assertEqual(len(expected), 38)
+
+        conn.execute("UPDATE daily_user_stats SET sessions = 99 WHERE user_id = 2")
+        conn.execute("INSERT INTO daily_user_stats (user_id, day_key) VALUES (9, 1)")
+        next(m for m in MIGRATIONS if m.version == 5).apply(conn, 4)
+        self.assertEqual(actual(), expected)
+        conn.close()
+
+    def test_migrate_is_idempotent(self):
+        """
+        测试已是最新版本时不再执行任何步骤
+        """
+        migrate(self.db_path)
+        self.assertEqual(migrate(self.db_path), [])
+
+    def test_target_version(self):
+        """
+        测试只迁移到指定版本
+        """
+        report = migrate(self.db_path, target=1)
+        self.assertEqual([step["version"] for step in report], [1])
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(get_schema_version(conn), 1)
+        conn.close()
+
+    def test_update_in_batches(self):
+        """
+        测试按rowid区间分批更新覆盖全部行，且只更新满足条件的行
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("ALTER TABLE fitness_records ADD COLUMN day TEXT")
+        conn.execute("UPDATE fitness_records SET day = 'x' WHERE rowid = 1")
+        updated = update_in_batches(conn, "fitness_records", "day = substr(date, 1, 10)",
+                                    "day IS NULL", batch_size=5)
+        self.assertEqual(updated, 27)
+        missing = conn.execute("SELECT COUNT(*) FROM fitness_records WHERE day IS NULL").fetchone()[0]
+        self.assertEqual(missing, 0)
+        self.assertEqual(conn.execute("SELECT day FROM fitness_records WHERE rowid = 1").fetchone()[0], "x")
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
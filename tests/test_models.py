@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据模型测试模块
+验证模型使用slots且日期默认值在创建实例时生成
+"""
+
+import os
+import pickle
+import sys
+import unittest
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.model.exercise_model import FitnessRecord
+from self_health_mis.data.model.goal_model import FitnessGoal
+from self_health_mis.data.model.user_model import UserProfile
+
+
+class TestModels(unittest.TestCase):
+    """
+    测试数据模型
+    """
+
+    def test_slots(self):
+        """
+        测试实例不带__dict__，且不能设置未声明的属性
+        """
+        for model in (FitnessRecord(), FitnessGoal(), UserProfile()):
+            with self.subTest(model=type(model).__name__):
+                self.assertFalse(hasattr(model, "__dict__"))
+                with self.assertRaises(AttributeError):
+                    model.unknown_field = 1
+
+    def test_date_defaults_are_per_instance(self):
+        """
+        测试日期默认值取创建实例时的时间，而不是导入模块时的时间
+        """
+        before = datetime.now()
+        record, goal = FitnessRecord(), FitnessGoal()
+        self.assertGreaterEqual(record.date, before)
+        self.assertGreaterEqual(goal.start_date, before)
+        self.assertGreaterEqual(goal.end_date, before)
+        self.assertIsNot(UserProfile().preferred_exercises, UserProfile().preferred_exercises)
+
+    def test_pickle_round_trip(self):
+        """
+        测试可序列化（会话状态中保存记录列表）
+        """
+        record = FitnessRecord(id=1, user_id=2, exercise_type="跑步", duration=30.0, notes="晨跑")
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录预取测试模块
+验证首页数据并发读取、超时不阻塞、出错不影响其他数据集，以及预取结果能被首页读取命中
+"""
+
+import os
+import sys
+import threading
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.core import data_context
+from self_health_mis.core.data_context import RerunDataContext, dashboard_requests
+from self_health_mis.core.prefetch import prefetch_user_data
+from self_health_mis.core.read_cache import cached_per_user, read_cache
+
+LOADER_NAMES = {
+    "profile": "get_user_profile",
+    "goals": "get_user_fitness_goals",
+    "stats_totals": "get_user_stats_totals",
+    "daily_stats": "get_user_daily_stats",
+}
+
+
+class TestPrefetch(unittest.TestCase):
+    """
+    测试prefetch_user_data（各读取函数替换为测试函数）
+    """
+
+    def setUp(self):
+        read_cache.clear()
+        self.addCleanup(read_cache.clear)
+        self.calls = []
+
+    def patch_loaders(self, make_loader):
+        for name, attribute in LOADER_NAMES.items():
+            patcher = mock.patch.object(data_context, attribute, make_loader(name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_loads_run_concurrently(self):
+        """
+        测试各数据集同时读取：只有全部读取都已开始，栅栏才会放行
+        """
+        barrier = threading.Barrier(len(LOADER_NAMES), timeout=2)
+
+        def make_loader(name):
+            def loader(user_id, *args):
+                barrier.wait()
+                return name
+            return loader
+
+        self.patch_loaders(make_loader)
+        report = prefetch_user_data(1, timeout=5)
+        self.assertEqual(report["loaded"], sorted(LOADER_NAMES))
+        self.assertEqual((report["failed"], report["pending"]), ({}, []))
+
+    def test_timeout_and_failure(self):
+        """
+        测试慢查询超时后不再等待、出错的数据集单独报告
+        """
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def make_loader(name):
+            def loader(user_id, *args):
+                if name == "daily_stats":
+                    release.wait(5)
+                if name == "profile":
+                    raise RuntimeError("数据库忙")
+                return name
+            return loader
+
+        self.patch_loaders(make_loader)
+        report = prefetch_user_data(1, timeout=0.2)
+        self.assertEqual(report["pending"], ["daily_stats"])
+        self.assertEqual(report["loaded"], ["goals", "stats_totals"])
+        self.assertEqual(list(report["failed"]), ["profile"])
+        self.assertLess(report["seconds"], 2)
+
+    def test_warms_cache_for_dashboard(self):
+        """
+        测试预取写入的缓存项与首页通过RerunDataContext读取的是同一项
+        """
+        def make_loader(name):
+            @cached_per_user(f"test_{name}")
+            def loader(user_id, *args):
+                self.calls.append(name)
+                return [name]
+            return loader
+
+        self.patch_loaders(make_loader)
+        prefetch_user_data(1, timeout=5)
+        self.assertEqual(sorted(self.calls), sorted(LOADER_NAMES))
+
+        context = RerunDataContext(1)
+        end = date.today()
+        context.profile()
+        context.goals()
+        context.stats_totals()
+        context.daily_stats(end - timedelta(days=data_context.DASHBOARD_DAYS - 1), end)
+        self.assertEqual(len(self.calls), len(LOADER_NAMES))
+
+    def test_requests_cover_dashboard_window(self):
+        start, end = dict((name, args) for name, _, args in dashboard_requests(7))["daily_stats"]
+        self.assertEqual((end - start).days, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询计划测试模块
+用EXPLAIN QUERY PLAN校验DAL热点查询命中索引，防止修改查询后悄悄退化为全表扫描
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from data.sqlite_conn import SQLiteDatabase
+from self_health_mis.data.dal.exercise_dal import (
+    _build_fitness_records_query, _build_fitness_records_page_query, _build_fitness_goals_query,
+    _build_export_query, EXERCISE_STATS_QUERY
+)
+
+
+class TestQueryPlans(unittest.TestCase):
+    """
+    测试锻炼记录/目标查询的执行计划
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.db = SQLiteDatabase(db_name=os.path.join(cls.tmp_dir.name, "plan_test.db"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        cls.tmp_dir.cleanup()
+
+    def explain(self, query, params):
+        """
+        返回查询计划中每一步的描述
+        """
+        with self.db._connect() as conn:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+        return [row["detail"] for row in rows]
+
+    def assertUsesIndex(self, plan, index_name, covering=False):
+        prefix = "USING COVERING INDEX " if covering else "USING "
+        self.assertTrue(
+            any(step.startswith("SEARCH") and prefix in step and index_name in step for step in plan),
+            f"查询未命中索引 {index_name}: {plan}"
+        )
+        self.assertFalse(any(step.startswith("SCAN") for step in plan), f"查询出现全表扫描: {plan}")
+
+    def test_fitness_records_range_query(self):
+        """
+        测试按日期范围查询记录走(user_id, ts)索引且无需额外排序
+        """
+        query, params = _build_fitness_records_query(
+            1, datetime(2025, 1, 1), datetime(2025, 2, 1), is_official=True
+        )
+        plan = self.explain(query, params)
+        self.assertUsesIndex(plan, "idx_fitness_records_user_ts")
+        self.assertFalse(any("TEMP B-TREE" in step for step in plan), f"ORDER BY未利用索引: {plan}")
+
+    def test_fitness_records_all_query(self):
+        """
+        测试不带过滤条件的记录查询同样走索引
+        """
+        plan = self.explain(*_build_fitness_records_query(1))
+        self.assertUsesIndex(plan, "idx_fitness_records_user_ts")
+        self.assertFalse(any("TEMP B-TREE" in step for step in plan), f"ORDER BY未利用索引: {plan}")
+
+    def test_fitness_records_page_query(self):
+        """
+        测试键集分页的游标条件作为索引范围条件，无需额外排序
+        """
+        query, params = _build_fitness_records_page_query(
+            1, datetime(2025, 1, 1), is_official=False, after=(datetime(2025, 3, 1), 42), limit=20
+        )
+        plan = self.explain(query, params)
+        self.assertUsesIndex(plan, "idx_fitness_records_user_ts")
+        self.assertTrue(any("ts<?" in step for step in plan), f"游标未作为索引范围条件: {plan}")
+        self.assertFalse(any("TEMP B-TREE" in step for step in plan), f"ORDER BY未利用索引: {plan}")
+
+    def test_cohort_export_query(self):
+        """
+        测试按用户集合导出沿(user_id, ts)索引输出且无需额外排序
+        """
+        plan = self.explain(*_build_export_query(None, user_ids=[3, 1, 2], start_date=datetime(2025, 1, 1)))
+        self.assertUsesIndex(plan, "idx_fitness_records_user_ts")
+        self.assertFalse(any("TEMP B-TREE" in step for step in plan), f"ORDER BY未利用索引: {plan}")
+
+    def test_exercise_stats_query_is_covered(self):
+        """
+        测试统计查询完全由覆盖索引满足
+        """
+        plan = self.explain(EXERCISE_STATS_QUERY, (1, 20089, 20120))
+        self.assertUsesIndex(plan, "idx_fitness_records_user_day_stats", covering=True)
+
+    def test_open_goals_query(self):
+        """
+        测试未完成目标查询走(user_id, is_completed, end_date)索引且无需额外排序
+        """
+        plan = self.explain(*_build_fitness_goals_query(1, include_completed=False))
+        self.assertUsesIndex(plan, "idx_fitness_goals_user_open")
+        self.assertFalse(any("TEMP B-TREE" in step for step in plan), f"ORDER BY未利用索引: {plan}")
+
+    def test_all_goals_query(self):
+        """
+        测试全部目标查询至少按user_id走索引
+        """
+        plan = self.explain(*_build_fitness_goals_query(1, include_completed=True))
+        self.assertUsesIndex(plan, "idx_fitness_goals_user_open")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按用户读缓存测试模块
+验证LRU淘汰、TTL过期、DAL写入后按用户失效以及命中率/内存统计
+"""
+
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.core.read_cache import UserReadCache, cached_per_user, read_cache, estimate_size
+from self_health_mis.data.dal import exercise_dal
+from self_health_mis.data.dal.write_events import notify_write
+from test_exercise_dal import ExerciseDalTestCase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestUserReadCache(unittest.TestCase):
+    """
+    测试UserReadCache
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = UserReadCache(max_entries=3, ttl_seconds=10, clock=self.clock)
+        self.loads = 0
+
+    def load(self, value="结果"):
+        self.loads += 1
+        return [value]
+
+    def test_hit_returns_copy(self):
+        """
+        测试第二次读取命中缓存，且调用方修改返回值不影响缓存
+        """
+        first = self.cache.get_or_load(1, "q", (), self.load)
+        first.append("修改")
+        self.assertEqual(self.cache.get_or_load(1, "q", (), self.load), ["结果"])
+        self.assertEqual(self.loads, 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 0.5)
+
+    def test_lru_eviction(self):
+        """
+        测试超过容量时淘汰最久未使用的项
+        """
+        for user_id in (1, 2, 3):
+            self.cache.get_or_load(user_id, "q", (), self.load)
+        self.cache.get_or_load(1, "q", (), self.load)   # 用户1变为最近使用
+        self.cache.get_or_load(4, "q", (), self.load)   # 淘汰用户2
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.assertFalse(self.cache.get((2, "q", ()))[0])
+        self.assertTrue(self.cache.get((1, "q", ()))[0])
+
+    def test_ttl_expiry(self):
+        """
+        测试超过TTL的项重新加载
+        """
+        self.cache.get_or_load(1, "q", (), self.load)
+        self.clock.now = 9.9
+        self.cache.get_or_load(1, "q", (), self.load)
+        self.assertEqual(self.loads, 1)
+        self.clock.now = 10.0
+        self.cache.get_or_load(1, "q", (), self.load)
+        self.assertEqual(self.loads, 2)
+
+    def test_invalidate_only_given_users(self):
+        """
+        测试按用户失效只影响指定用户，None清空全部
+        """
+        self.cache.get_or_load(1, "q", (), self.load)
+        self.cache.get_or_load(2, "q", (), self.load)
+        self.cache.invalidate_users(frozenset({1}))
+        self.assertEqual(self.cache.stats()["entries"], 1)
+        self.assertTrue(self.cache.get((2, "q", ()))[0])
+        self.cache.invalidate_users(None)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        self.assertEqual(self.cache.stats()["memory_bytes"], 0)
+
+    def test_write_during_load_not_cached(self):
+        """
+        测试加载期间该用户发生写入时，结果只返回不缓存
+        """
+        def load_with_write():
+            self.cache.invalidate_users(frozenset({1}))
+            return self.load()
+
+        self.assertEqual(self.cache.get_or_load(1, "q", (), load_with_write), ["结果"])
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_memory_estimate(self):
+        """
+        测试内存统计随缓存项增减
+        """
+        df = pd.DataFrame({"duration": range(1000)})
+        self.cache.get_or_load(1, "df", (), lambda: df)
+        self.assertEqual(self.cache.stats()["memory_bytes"], estimate_size(df))
+        self.assertGreaterEqual(self.cache.stats()["memory_bytes"], 8000)
+        self.cache.invalidate_users(frozenset({1}))
+        self.assertEqual(self.cache.stats()["memory_bytes"], 0)
+
+
+class TestCachedPerUserDal(ExerciseDalTestCase):
+    """
+    测试经过缓存的读函数在DAL写入后按用户失效
+    """
+
+    def setUp(self):
+        super().setUp()
+        read_cache.clear()
+        self.addCleanup(read_cache.clear)
+
+        @cached_per_user("test_records")
+        def records(user_id, is_official=None):
+            return exercise_dal.get_fitness_records(user_id, is_official=is_official)
+
+        self.records = records
+
+    def test_write_invalidates_only_writer(self):
+        exercise_dal.add_fitness_record(self.make_record(user_id=1))
+        exercise_dal.add_fitness_record(self.make_record(user_id=2))
+        self.assertEqual(len(self.records(1)), 1)
+        self.assertEqual(len(self.records(2)), 1)
+        self.assertEqual(read_cache.stats()["entries"], 2)
+
+        exercise_dal.add_fitness_record(self.make_record(user_id=1, days_ago=2))
+        self.assertEqual(read_cache.stats()["users"], 1)
+        hits = read_cache.stats()["hits"]
+        self.assertEqual(len(self.records(2)), 1)
+        self.assertEqual(read_cache.stats()["hits"], hits + 1)
+        self.assertEqual(len(self.records(1)), 2)
+
+    def test_goal_write_invalidates(self):
+        exercise_dal.add_fitness_record(self.make_record())
+        self.assertEqual(len(self.records(1)), 1)
+        self.add_goal()
+        self.assertEqual(read_cache.stats()["entries"], 0)
+
+    def test_global_write_clears_all(self):
+        self.records(1)
+        self.records(2)
+        notify_write(None)
+        self.assertEqual(read_cache.stats()["entries"], 0)
+
+    def test_invalid_user_bypasses_cache(self):
+        self.records(0)
+        self.assertEqual(read_cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式查询测试模块
+验证get_fitness_records_columnar与逐条查询结果一致，且转换为DataFrame时不复制数据
+"""
+
+import os
+import sys
+import unittest
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.dal import exercise_dal
+from self_health_mis.data.dal.record_batch import RecordBatch, COLUMN_SPECS
+from test_exercise_dal import ExerciseDalTestCase
+
+
+class TestColumnarRecords(ExerciseDalTestCase):
+    """
+    测试按列查询
+    """
+
+    def setUp(self):
+        super().setUp()
+        types = ["跑步", "游泳", "跳绳"]
+        exercise_dal.add_fitness_records_bulk([
+            self.make_record(days_ago=i, exercise_type=types[i % 3], duration=10.0 + i,
+                             distance=None if i % 4 == 0 else float(i), calories=None if i % 5 == 0 else 100 + i,
+                             is_official=i % 2 == 0, notes=f"第{i}次" if i % 3 == 0 else None,
+                             is_checkin=i % 2 == 1, intensity=float(i % 10) if i % 2 else None)
+            for i in range(30)
+        ])
+
+    def test_matches_row_records(self):
+        """
+        测试各列与get_fitness_records逐条结果一致（按时间正序）
+        """
+        batch = exercise_dal.get_fitness_records_columnar(1, list(COLUMN_SPECS))
+        records = sorted(exercise_dal.get_fitness_records(1), key=lambda r: (r.date, r.id))
+        self.assertEqual(len(batch), 30)
+        self.assertEqual(batch["date"].dtype, np.dtype("datetime64[s]"))
+        self.assertEqual(list(batch["id"]), [r.id for r in records])
+        self.assertEqual(list(batch["date"].astype(object)), [r.date.replace(microsecond=0) for r in records])
+        self.assertEqual(list(batch.decode("exercise_type")), [r.exercise_type for r in records])
+        self.assertEqual(list(batch["is_official"]), [r.is_official for r in records])
+        self.assertEqual(list(batch["notes"]), [r.notes for r in records])
+        for name in ("duration", "distance", "calories", "intensity"):
+            expected = np.array([getattr(r, name) for r in records], dtype=float)
+            np.testing.assert_array_equal(batch[name], expected)
+
+    def test_filters_and_masks(self):
+        """
+        测试过滤条件下推，分类列按编码比较
+        """
+        batch = exercise_dal.get_fitness_records_columnar(
+            1, ["exercise_type", "distance"], start_date=self.now - timedelta(days=10), is_official=False
+        )
+        expected = [r for r in exercise_dal.get_fitness_records(1, start_date=self.now - timedelta(days=10),
+                                                                is_official=False)]
+        self.assertEqual(len(batch), len(expected))
+        self.assertEqual(int(batch.mask_equals("exercise_type", "游泳").sum()),
+                         sum(r.exercise_type == "游泳" for r in expected))
+        self.assertFalse(batch.mask_equals("exercise_type", "篮球").any())
+
+    def test_to_pandas_is_zero_copy(self):
+        """
+        测试DataFrame各列与RecordBatch共享内存
+        """
+        batch = exercise_dal.get_fitness_records_columnar(1, ["date", "exercise_type", "duration", "is_checkin"])
+        df = batch.to_pandas()
+        self.assertIsInstance(df["exercise_type"].dtype, pd.CategoricalDtype)
+        self.assertTrue(np.shares_memory(df["duration"].to_numpy(), batch["duration"]))
+        self.assertTrue(np.shares_memory(df["date"].to_numpy(), batch["date"]))
+        self.assertTrue(np.shares_memory(df["is_checkin"].to_numpy(), batch["is_checkin"]))
+        self.assertTrue(np.shares_memory(df["exercise_type"].array.codes, batch["exercise_type"]))
+        self.assertEqual(list(df["exercise_type"].astype(str)), list(batch.decode("exercise_type")))
+
+    def test_empty_and_invalid(self):
+        self.assertEqual(len(exercise_dal.get_fitness_records_columnar(99)), 0)
+        self.assertTrue(exercise_dal.get_fitness_records_columnar(99).to_pandas().empty)
+        self.assertEqual(len(exercise_dal.get_fitness_records_columnar(1, ["password"])), 0)
+        self.assertEqual(list(RecordBatch.empty(["duration"]).to_pandas().columns), ["duration"])
+
+
+if __name__ == "__main__":
+    unittest.main()
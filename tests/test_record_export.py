@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+锻炼记录流式导出测试模块
+验证分块导出、过滤/投影条件和各导出格式
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.sqlite_conn import SQLiteDatabase
+from self_health_mis.data.model.exercise_model import FitnessRecord
+from self_health_mis.data.dal import exercise_dal
+from self_health_mis.core import record_export
+
+
+class TestRecordExport(unittest.TestCase):
+    """
+    测试锻炼记录导出
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = SQLiteDatabase(db_name=os.path.join(self.tmp_dir.name, "export_test.db"))
+        patcher = mock.patch.object(exercise_dal, "db_instance", self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        base = datetime(2025, 3, 1, 7, 30)
+        exercise_dal.add_fitness_records_bulk([
+            FitnessRecord(user_id=user_id, date=base + timedelta(days=day), exercise_type="跑步",
+                          duration=30.0 + day, distance=5.0, is_official=day % 2 == 0, notes="晨跑")
+            for user_id in (1, 2, 3) for day in range(10)
+        ], update_goals=False)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_chunks_respect_size_and_filters(self):
+        """
+        测试按块大小分块，且用户/日期/官方过滤生效
+        """
+        chunks = list(exercise_dal.iter_fitness_record_chunks(
+            ["user_id", "date", "is_official"], user_ids=[3, 1],
+            start_date=datetime(2025, 3, 3), end_date=datetime(2025, 3, 8, 23, 59),
+            is_official=True, chunk_size=2
+        ))
+        self.assertTrue(all(len(chunk) <= 2 for chunk in chunks))
+        rows = [row for chunk in chunks for row in chunk]
+        # 每个用户3/3、3/5、3/7三天为官方记录，按user_id、时间排序
+        self.assertEqual([row[0] for row in rows], [1, 1, 1, 3, 3, 3])
+        self.assertEqual(rows[0][1][:10], "2025-03-03")
+        self.assertTrue(all(row[2] == 1 for row in rows))
+
+    def test_rejects_unknown_columns(self):
+        """
+        测试投影只允许白名单中的列
+        """
+        with self.assertRaises(ValueError):
+            record_export.export_records(io.BytesIO(), "csv", columns=["user_id", "1; DROP TABLE x"])
+
+    def test_csv_export(self):
+        """
+        测试CSV导出包含表头和全部记录
+        """
+        path = os.path.join(self.tmp_dir.name, "out.csv")
+        total = record_export.export_records_to_file(path, columns=["id", "user_id", "notes"], chunk_size=7)
+        self.assertEqual(total, 30)
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["id", "user_id", "notes"])
+        self.assertEqual(len(rows), 31)
+        self.assertFalse(os.path.exists(path + ".part"))
+
+    def test_jsonl_export_restores_booleans(self):
+        """
+        测试JSONL导出把0/1布尔列还原为true/false
+        """
+        buffer = io.BytesIO()
+        record_export.export_records(buffer, "jsonl", user_ids=[2], chunk_size=4)
+        items = [json.loads(line) for line in buffer.getvalue().decode("utf-8").splitlines()]
+        self.assertEqual(len(items), 10)
+        self.assertIs(items[0]["is_official"], True)
+        self.assertEqual(items[0]["notes"], "晨跑")
+
+    def test_iter_export_bytes_matches_file_export(self):
+        """
+        测试分段产出的字节与一次性导出完全一致
+        """
+        for fmt in ("csv", "jsonl"):
+            whole = io.BytesIO()
+            record_export.export_records(whole, fmt, chunk_size=4)
+            parts = list(record_export.iter_export_bytes(fmt, chunk_size=4))
+            self.assertGreater(len(parts), 1)
+            self.assertEqual(b"".join(parts), whole.getvalue())
+
+    def test_parquet_schema_independent_of_first_chunk(self):
+        """
+        测试parquet表结构取自导出列类型：第一块某列全为空时后续块仍能写入
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("未安装pyarrow")
+        exercise_dal.add_fitness_records_bulk([
+            FitnessRecord(user_id=4, date=datetime(2025, 4, 1, 7, 0), exercise_type="跳绳", duration=10.0,
+                          distance=None, calories=None, intensity=None, is_checkin=True),
+            FitnessRecord(user_id=4, date=datetime(2025, 4, 2, 7, 0), exercise_type="跑步", duration=20.0,
+                          distance=3.0, calories=200, intensity=6.0),
+        ], update_goals=False)
+        out = io.BytesIO()
+        total = record_export.export_records(out, "parquet", user_ids=[4], chunk_size=1)
+        self.assertEqual(total, 2)
+        table = pq.read_table(io.BytesIO(out.getvalue()))
+        self.assertEqual(table.schema.field("distance").type, pa.float64())
+        self.assertEqual(table.schema.field("is_checkin").type, pa.bool_())
+        self.assertEqual(table.column("calories").to_pylist(), [None, 200.0])
+        self.assertEqual(table.column("is_checkin").to_pylist(), [True, False])
+
+        empty = io.BytesIO()
+        self.assertEqual(record_export.export_records(empty, "parquet", user_ids=[99]), 0)
+        self.assertEqual(pq.read_table(io.BytesIO(empty.getvalue())).schema.field("id").type, pa.int64())
+
+    def test_empty_csv_has_header(self):
+        """
+        测试无匹配记录时CSV仍输出表头
+        """
+        data = b"".join(record_export.iter_export_bytes("csv", columns=["id"], user_ids=[99]))
+        self.assertEqual(data.decode("utf-8-sig").strip(), "id")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+锻炼记录流式导入测试模块
+验证CSV/JSONL导入、拒绝文件和断点续传
+"""
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.sqlite_conn import SQLiteDatabase
+from self_health_mis.data.dal import exercise_dal
+from self_health_mis.core import record_import
+
+FIELDS = ["username", "date", "exercise_type", "duration", "distance", "calories", "is_official", "notes"]
+
+
+class TestRecordImport(unittest.TestCase):
+    """
+    测试锻炼记录文件导入
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = SQLiteDatabase(db_name=os.path.join(self.tmp_dir.name, "import_test.db"))
+        for patcher in (
+            mock.patch.object(exercise_dal, "db_instance", self.db),
+            mock.patch.object(record_import, "get_user_id_map", return_value={"alice": 1, "bob": 2}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def write_csv(self, rows):
+        path = os.path.join(self.tmp_dir.name, "records.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def make_rows(self, count):
+        return [
+            {"username": "Alice" if i % 2 else "bob", "date": f"2025-03-{i % 28 + 1:02d}T07:30:00",
+             "exercise_type": "跑步", "duration": "30", "distance": "5.2", "calories": "320.0",
+             "is_official": "是" if i % 3 == 0 else "", "notes": ""}
+            for i in range(count)
+        ]
+
+    def count_records(self):
+        with self.db._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM fitness_records").fetchone()[0]
+
+    def test_csv_import_with_rejects(self):
+        """
+        测试合法行批量写入、非法行写入拒绝文件
+        """
+        rows = self.make_rows(10)
+        rows[3]["duration"] = "-5"
+        rows[7]["username"] = "nobody"
+        rows[8]["date"] = "not-a-date"
+        path = self.write_csv(rows)
+
+        report = record_import.import_records(path, chunk_size=4)
+        self.assertEqual((report.rows_read, report.inserted, report.rejected), (10, 7, 3))
+        self.assertEqual(self.count_records(), 7)
+        self.assertFalse(os.path.exists(path + ".checkpoint.json"))
+
+        with open(path + ".rejects.jsonl", encoding="utf-8") as f:
+            rejects = [json.loads(line) for line in f]
+        self.assertEqual([r["line"] for r in rejects], [4, 8, 9])
+        with self.db._connect() as conn:
+            official = conn.execute("SELECT COUNT(*) FROM fitness_records WHERE is_official = 1").fetchone()[0]
+        self.assertEqual(official, 3)
+
+    def test_jsonl_import_forced_official(self):
+        """
+        测试JSONL格式导入并统一标记为官方记录
+        """
+        path = os.path.join(self.tmp_dir.name, "records.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for row in self.make_rows(5):
+                f.write(json.dumps(dict(row, user_id=None, calories=None), ensure_ascii=False) + "\n")
+
+        report = record_import.import_records(path, force_official=True)
+        self.assertEqual(report.inserted, 5)
+        with self.db._connect() as conn:
+            official = conn.execute("SELECT COUNT(*) FROM fitness_records WHERE is_official = 1").fetchone()[0]
+        self.assertEqual(official, 5)
+
+    def test_resume_from_checkpoint(self):
+        """
+        测试中断后从断点继续，不重复写入已提交的块
+        """
+        path = self.write_csv(self.make_rows(10))
+        real_bulk = record_import.add_fitness_records_bulk
+        calls = []
+
+        def failing_bulk(records, update_goals=True, progress=None):
+            calls.append(len(records))
+            if len(calls) == 2:
+                raise RuntimeError("模拟进程中断")
+            return real_bulk(records, update_goals, progress)
+
+        with mock.patch.object(record_import, "add_fitness_records_bulk", side_effect=failing_bulk):
+            with self.assertRaises(RuntimeError):
+                record_import.import_records(path, chunk_size=4)
+        self.assertEqual(self.count_records(), 4)
+        with open(path + ".checkpoint.json", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["rows_done"], 4)
+
+        report = record_import.import_records(path, chunk_size=4)
+        self.assertEqual(report.resumed_from, 4)
+        self.assertEqual(report.rows_read, 6)
+        self.assertEqual(self.count_records(), 10)
+
+
+    def test_crash_between_commit_and_checkpoint(self):
+        """
+        测试块已提交、断点文件未保存时中断：续传不重复写入该块，拒绝行和目标进度不丢失也不重复
+        """
+        rows = self.make_rows(10)
+        rows[5]["username"] = "nobody"
+        path = self.write_csv(rows)
+        real_save = record_import._save_checkpoint
+        saves = []
+
+        def crashing_save(checkpoint_path, checkpoint):
+            saves.append(checkpoint["rows_done"])
+            if len(saves) == 2:
+                raise RuntimeError("模拟进程中断")
+            real_save(checkpoint_path, checkpoint)
+
+        with mock.patch.object(record_import, "_save_checkpoint", side_effect=crashing_save):
+            with self.assertRaises(RuntimeError):
+                record_import.import_records(path, chunk_size=4)
+        self.assertEqual(self.count_records(), 7)
+        self.assertEqual(exercise_dal.get_import_progress(os.path.abspath(path)), 8)
+
+        with mock.patch.object(record_import, "auto_update_goal_progress") as update_goals:
+            report = record_import.import_records(path, chunk_size=4)
+        self.assertEqual(report.resumed_from, 8)
+        self.assertEqual((report.rows_read, report.inserted), (2, 2))
+        self.assertEqual(self.count_records(), 9)
+        self.assertEqual(sorted(c.args[0] for c in update_goals.call_args_list), [1, 2])
+        self.assertEqual(exercise_dal.get_import_progress(os.path.abspath(path)), 0)
+        with open(path + ".rejects.jsonl", encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["line"] for line in f], [6])
+
+
+if __name__ == "__main__":
+    unittest.main()
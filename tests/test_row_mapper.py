@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行映射测试模块
+验证生成的映射函数与按列名逐行转换结果一致，坏行被跳过
+"""
+
+import os
+import sqlite3
+import sys
+import unittest
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.model.exercise_model import FitnessRecord
+from self_health_mis.data.model.goal_model import FitnessGoal
+from self_health_mis.data.dal.row_mapper import (
+    get_row_mapper, map_rows, fetch_tuples, select_columns, parse_iso_datetime
+)
+
+
+class TestRowMapper(unittest.TestCase):
+    """
+    测试行映射
+    """
+
+    def test_record_mapper(self):
+        """
+        测试按默认列顺序映射锻炼记录，布尔与日期字段被转换
+        """
+        row = (1, 2, "2025-03-01T00:00:00", "跑步", 30.0, None, 200, 1, "晨跑", 0, 6.5, None)
+        record = get_row_mapper(FitnessRecord)(row)
+        self.assertEqual(record, FitnessRecord(
+            id=1, user_id=2, date=datetime(2025, 3, 1), exercise_type="跑步", duration=30.0, distance=None,
+            calories=200, is_official=True, notes="晨跑", is_checkin=False, intensity=6.5, recovery_quality=None
+        ))
+        self.assertIs(type(record.is_official), bool)
+        self.assertIs(get_row_mapper(FitnessRecord), get_row_mapper(FitnessRecord))
+
+    def test_custom_columns_and_shared_dates(self):
+        """
+        测试自定义列顺序，相同日期文本只解析一次
+        """
+        mapper = get_row_mapper(FitnessGoal, ("end_date", "id", "start_date", "is_completed"))
+        first = mapper(("2025-03-31T00:00:00", 1, "2025-03-01T00:00:00", 0))
+        second = mapper(("2025-03-31T00:00:00", 2, "2025-03-01T00:00:00", 1))
+        self.assertEqual((first.id, first.start_date, first.is_completed), (1, datetime(2025, 3, 1), False))
+        self.assertIs(first.end_date, second.end_date)
+        self.assertEqual(first.goal_type, "")  # 未查询的字段取默认值
+
+    def test_bad_rows_are_skipped(self):
+        """
+        测试无法解析的行被跳过，其余行正常返回
+        """
+        mapper = get_row_mapper(FitnessGoal)
+        rows = [(1, 1, "每周跑步次数", 3.0, 0.0, "2025-03-01", "2025-03-07", 0),
+                (2, 1, "每周跑步次数", 3.0, 0.0, "不是日期", "2025-03-07", 0),
+                (3, 1, "每周跑步次数", 3.0, 0.0, "2025-03-01", "2025-03-07", 1)]
+        self.assertEqual([g.id for g in map_rows(mapper, rows, "锻炼目标")], [1, 3])
+        parse_iso_datetime.cache_clear()
+
+    def test_fetch_tuples_ignores_row_factory(self):
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"CREATE TABLE fitness_goals (seq INTEGER, {select_columns(FitnessGoal)})")
+        conn.execute("INSERT INTO fitness_goals VALUES (0, 1, 2, '每周跑步次数', 3, 1, '2025-03-01', '2025-03-07', 0)")
+        rows = fetch_tuples(conn, f"SELECT {select_columns(FitnessGoal)} FROM fitness_goals")
+        self.assertIs(type(rows[0]), tuple)
+        self.assertEqual(get_row_mapper(FitnessGoal)(rows[0]).current_value, 1)
+        self.assertIs(type(conn.execute("SELECT 1").fetchone()), sqlite3.Row)
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
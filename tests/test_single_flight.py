@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相同读请求合并测试模块
+验证并发的相同调用只执行一次、异常共享、写入后不再复用进行中的查询
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.dal.single_flight import SingleFlight, coalesced, read_flight
+from self_health_mis.data.dal import exercise_dal
+from test_exercise_dal import ExerciseDalTestCase
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    测试SingleFlight
+    """
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.release = threading.Event()
+        self.executions = 0
+
+    def slow_query(self, value="结果"):
+        self.executions += 1
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return [value]
+
+    def run_callers(self, count, key, fn):
+        """启动count个并发调用，待其余调用都已挂到同一查询上后再放行"""
+        results, errors = [None] * count, [None] * count
+
+        def call(i):
+            try:
+                results[i] = self.flight.do(key, fn)
+            except Exception as e:
+                errors[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        while self.flight.stats()["calls"] < count:
+            threading.Event().wait(0.001)
+        self.release.set()
+        for t in threads:
+            t.join()
+        return results, errors
+
+    def test_identical_calls_share_one_query(self):
+        """
+        测试相同键的并发调用只查询一次，每个调用方（含执行查询的调用方）拿到结果的浅拷贝
+        """
+        returned = []
+        results, errors = self.run_callers(8, ("get_fitness_goals", (1,), ()),
+                                           lambda: returned.append(self.slow_query()) or returned[0])
+        self.assertEqual(self.executions, 1)
+        self.assertEqual(errors, [None] * 8)
+        self.assertTrue(all(r == ["结果"] for r in results))
+        self.assertEqual(len({id(r) for r in results}), 8)
+        self.assertFalse(any(r is returned[0] for r in results))
+        results[0].append("被修改")
+        self.assertEqual((returned[0], results[1]), (["结果"], ["结果"]))
+        stats = self.flight.stats()
+        self.assertEqual((stats["calls"], stats["executed"], stats["deduplicated"]), (8, 1, 7))
+        self.assertEqual(stats["by_function"], {"get_fitness_goals": 7})
+
+    def test_page_results_do_not_share_rows(self):
+        """
+        测试分页结果(rows, cursor)合并后各调用方的行列表互不影响
+        """
+        page = lambda: (self.slow_query("记录"), (20250301, 7))
+        results, errors = self.run_callers(2, ("get_fitness_records_page", (1,), ()), page)
+        self.assertEqual(errors, [None, None])
+        self.assertEqual(self.executions, 1)
+        results[0][0].append("被修改")
+        self.assertEqual(results[1], (["记录"], (20250301, 7)))
+        self.assertIsNot(results[0][0], results[1][0])
+
+    def test_errors_are_shared(self):
+        """
+        测试查询出错时所有等待者收到同一异常，之后的调用重新执行
+        """
+        _, errors = self.run_callers(4, ("f", (), ()), lambda: self.slow_query(RuntimeError("数据库忙")))
+        self.assertTrue(all(isinstance(e, RuntimeError) for e in errors))
+        self.assertEqual(self.executions, 1)
+        self.assertEqual(self.flight.do(("f", (), ()), lambda: self.slow_query()), ["结果"])
+        self.assertEqual(self.executions, 2)
+
+    def test_invalidate_starts_new_flight(self):
+        """
+        测试写入后到达的调用不会合并到写入前开始的查询
+        """
+        first = threading.Thread(target=self.flight.do, args=(("f", (), ()), self.slow_query))
+        first.start()
+        while self.flight.stats()["executed"] < 1:
+            threading.Event().wait(0.001)
+        self.flight.invalidate()
+        second = threading.Thread(target=self.flight.do, args=(("f", (), ()), self.slow_query))
+        second.start()
+        while self.flight.stats()["calls"] < 2:
+            threading.Event().wait(0.001)
+        self.release.set()
+        first.join()
+        second.join()
+        self.assertEqual(self.flight.stats()["deduplicated"], 0)
+        self.assertEqual(self.executions, 2)
+
+
+class TestCoalescedDal(ExerciseDalTestCase):
+    """
+    测试DAL读函数经过合并层后行为不变
+    """
+
+    def test_reads_and_writes(self):
+        calls = read_flight.stats()["calls"]
+        self.assertEqual(exercise_dal.get_fitness_records(1), [])
+        exercise_dal.add_fitness_record(self.make_record())
+        self.assertEqual(len(exercise_dal.get_fitness_records(1)), 1)
+        self.assertEqual(len(exercise_dal.get_fitness_records_columnar(1, ["duration"])), 1)
+        self.assertGreaterEqual(read_flight.stats()["calls"], calls + 3)
+        self.assertEqual(exercise_dal.get_fitness_records.__name__, "get_fitness_records")
+
+    def test_same_name_in_different_scopes_not_merged(self):
+        """
+        测试不同类（或模块）中的同名读函数不会被合并：两者都在栅栏处等待对方，合并则会超时
+        """
+        barrier = threading.Barrier(2, timeout=2)
+
+        class First:
+            @staticmethod
+            @coalesced
+            def load(user_id):
+                barrier.wait()
+                return ["first"]
+
+        class Second:
+            @staticmethod
+            @coalesced
+            def load(user_id):
+                barrier.wait()
+                return ["second"]
+
+        results = {}
+        threads = [threading.Thread(target=lambda c=c: results.setdefault(c.__name__, c.load(1)))
+                   for c in (First, Second)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, {"First": ["first"], "Second": ["second"]})
+
+    def test_unhashable_arguments_bypass(self):
+        @coalesced
+        def echo(value):
+            return value
+        self.assertEqual(echo({"a": 1}), {"a": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
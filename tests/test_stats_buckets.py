@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+锻炼统计分桶测试模块
+验证各粒度的向量化分桶与pandas逐行分组结果一致，以及DAL统计结果的缓存与失效
+"""
+
+import os
+import random
+import sys
+import unittest
+from datetime import date, timedelta
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.dal.stats_buckets import bucketize, pivot_buckets, stats_cache, GRANULARITIES
+from self_health_mis.data.dal.base_dal import to_day_key
+from self_health_mis.data.dal import exercise_dal
+from test_exercise_dal import ExerciseDalTestCase
+
+
+def reference_buckets(rows, granularity):
+    """pandas逐行换算分桶后分组求和，作为对照"""
+    df = pd.DataFrame(rows, columns=["day_key", "exercise_type", "sessions", "duration", "distance", "calories"])
+    dates = pd.to_datetime([date(1970, 1, 1) + timedelta(days=k) for k in df["day_key"]])
+    if granularity in ("week", "isoweek"):
+        dates = dates - pd.to_timedelta(dates.weekday, unit="D")
+    elif granularity == "month":
+        dates = dates.to_period("M").to_timestamp()
+    elif granularity == "year":
+        dates = dates.to_period("Y").to_timestamp()
+    df["bucket"] = dates
+    return (df.fillna(0).groupby(["bucket", "exercise_type"], as_index=False)
+              [["sessions", "duration", "distance", "calories"]].sum())
+
+
+class TestBucketize(unittest.TestCase):
+    """
+    测试向量化分桶
+    """
+
+    def setUp(self):
+        rng = random.Random(5)
+        start = to_day_key(date(2024, 11, 20))
+        self.rows = [
+            (start + rng.randint(0, 120), rng.choice(["跑步", "游泳", "跳绳"]), rng.randint(1, 3),
+             rng.uniform(10, 60), rng.choice([None, rng.uniform(1, 10)]), rng.choice([None, rng.randint(50, 400)]))
+            for _ in range(300)
+        ]
+
+    def test_matches_reference(self):
+        """
+        测试每种粒度与对照结果一致
+        """
+        for granularity in GRANULARITIES:
+            with self.subTest(granularity=granularity):
+                result = bucketize(self.rows, granularity)
+                expected = reference_buckets(self.rows, granularity)
+                self.assertEqual(list(result["bucket"]), list(expected["bucket"]))
+                self.assertEqual(list(result["exercise_type"]), list(expected["exercise_type"]))
+                for metric in ("sessions", "duration", "distance", "calories"):
+                    self.assertTrue(((result[metric] - expected[metric]).abs() < 1e-9).all(), metric)
+
+    def test_labels(self):
+        """
+        测试周从周一开始，ISO周标签跨年时取ISO年份
+        """
+        rows = [(to_day_key(date(2024, 12, 29)), "跑步", 1, 10, None, None),   # 周日，属于2024-12-23这一周
+                (to_day_key(date(2024, 12, 30)), "跑步", 1, 20, None, None)]   # 周一，ISO周为2025-W01
+        week = bucketize(rows, "week")
+        self.assertEqual(list(week["label"]), ["2024-12-23", "2024-12-30"])
+        self.assertEqual(list(bucketize(rows, "isoweek")["label"]), ["2024-W52", "2025-W01"])
+        self.assertEqual(list(bucketize(rows, "month")["label"]), ["2024-12"])
+        self.assertEqual(list(bucketize(rows, "year")["label"]), ["2024"])
+
+        wide = pivot_buckets(bucketize(self.rows, "month"), "duration")
+        self.assertEqual(list(wide.index), sorted(wide.index))
+        self.assertEqual(set(wide.columns), {"跑步", "游泳", "跳绳"})
+
+    def test_empty_and_invalid(self):
+        self.assertTrue(bucketize([], "day").empty)
+        with self.assertRaises(ValueError):
+            bucketize(self.rows, "hour")
+
+
+class TestGetExerciseStats(ExerciseDalTestCase):
+    """
+    测试DAL统计入口
+    """
+
+    def test_buckets_and_cache(self):
+        """
+        测试按周期过滤、按粒度分桶，结果缓存且新记录写入后失效
+        """
+        exercise_dal.add_fitness_record(self.make_record(days_ago=0, duration=30.0))
+        exercise_dal.add_fitness_record(self.make_record(days_ago=0, exercise_type="游泳", duration=20.0))
+        exercise_dal.add_fitness_record(self.make_record(days_ago=3, duration=40.0))
+        exercise_dal.add_fitness_record(self.make_record(days_ago=40, duration=50.0))
+
+        month = exercise_dal.get_exercise_stats(1, "month")
+        self.assertEqual(month["sessions"].sum(), 3)
+        self.assertEqual(set(month["label"]), {(self.now - timedelta(days=d)).strftime("%Y-%m-%d") for d in (0, 3)})
+        self.assertAlmostEqual(month[month["exercise_type"] == "跑步"]["duration"].sum(), 70.0)
+
+        year = exercise_dal.get_exercise_stats(1, "year")
+        self.assertEqual(year["sessions"].sum(), 4)
+        self.assertTrue(all(len(label) == 7 for label in year["label"]))  # 默认按月分桶
+
+        hits = stats_cache.hits
+        exercise_dal.get_exercise_stats(1, "month")
+        self.assertEqual(stats_cache.hits, hits + 1)
+
+        exercise_dal.add_fitness_record(self.make_record(days_ago=1, duration=15.0))
+        self.assertEqual(exercise_dal.get_exercise_stats(1, "month")["sessions"].sum(), 4)
+        self.assertEqual(stats_cache.hits, hits + 1)
+
+    def test_invalid_arguments(self):
+        self.assertTrue(exercise_dal.get_exercise_stats(1, "decade").empty)
+        self.assertTrue(exercise_dal.get_exercise_stats(1, "month", "hour").empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
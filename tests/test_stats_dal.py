@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按天汇总表测试模块
+验证触发器在写入/修改/删除记录时维护daily_user_stats，以及重建和一致性校验
+"""
+
+import os
+import sys
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(ROOT_DIR))
+
+from self_health_mis.data.dal import exercise_dal, stats_dal
+from self_health_mis.data.dal.base_dal import to_day_key
+from test_exercise_dal import ExerciseDalTestCase
+
+
+class TestDailyUserStats(ExerciseDalTestCase):
+    """
+    测试按天汇总表
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(stats_dal, "db_instance", self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def execute(self, sql, params=()):
+        with self.db._connect() as conn:
+            conn.execute(sql, params)
+
+    def day_row(self, df, days_ago):
+        target = (self.now - timedelta(days=days_ago)).date()
+        return df[df["date"].dt.date == target].iloc[0]
+
+    def test_insert_maintains_daily_rows(self):
+        """
+        测试单条和批量写入在同一事务内累加到当天汇总
+        """
+        exercise_dal.add_fitness_record(self.make_record(days_ago=1, duration=30.0, intensity=6.0,
+                                                         recovery_quality=8.0, is_checkin=True))
+        exercise_dal.add_fitness_records_bulk([
+            self.make_record(days_ago=1, exercise_type="游泳", duration=20.0, distance=None, intensity=9.0),
+            self.make_record(days_ago=3, duration=45.0, calories=300),
+        ])
+
+        df = stats_dal.get_daily_stats(1, (self.now - timedelta(days=4)).date(), self.now.date())
+        self.assertEqual(len(df), 5)  # 补齐了没有记录的日期
+        day1 = self.day_row(df, 1)
+        self.assertEqual(day1["sessions"], 2)
+        self.assertAlmostEqual(day1["duration"], 50.0)
+        self.assertAlmostEqual(day1["distance"], 5.0)
+        self.assertEqual(day1["max_intensity"], 9.0)
+        self.assertAlmostEqual(day1["intensity"], 7.5)
+        self.assertAlmostEqual(day1["recovery_quality"], 8.0)
+        self.assertTrue(day1["is_checkin"])
+        day3 = self.day_row(df, 3)
+        self.assertEqual(day3["calories"], 300)
+        self.assertFalse(day3["is_checkin"])
+        self.assertEqual(self.day_row(df, 2)["sessions"], 0)
+
+        sparse = stats_dal.get_daily_stats(1, (self.now - timedelta(days=4)).date(), self.now.date(),
+                                           fill_missing=False)
+        self.assertEqual(len(sparse), 2)
+        self.assertEqual(stats_dal.check_daily_stats(), [])
+
+    def test_writes_bypassing_dal(self):
+        """
+        测试不带整数日期键的直接插入、修改日期/数值和删除后汇总仍与原始记录一致
+        """
+        date_text = (self.now - timedelta(days=2)).isoformat()
+        self.execute("INSERT INTO fitness_records (user_id, date, exercise_type, duration, intensity) "
+                     "VALUES (?, ?, ?, ?, ?)", (2, date_text, "跑步", 25.0, 5.0))
+        self.execute("INSERT INTO fitness_records (user_id, date, exercise_type, duration, intensity) "
+                     "VALUES (?, ?, ?, ?, ?)", (2, date_text, "跑步", 35.0, 7.0))
+        totals = stats_dal.get_stats_totals(2)
+        self.assertEqual(totals["sessions"], 2)
+        self.assertEqual(totals["active_days"], 1)
+        self.assertAlmostEqual(totals["duration"], 60.0)
+
+        # 修改数值：最大强度需从剩余记录重算
+        self.execute("UPDATE fitness_records SET intensity = 3.0 WHERE user_id = 2 AND intensity = 7.0")
+        # 修改日期：旧的一天减少、新的一天增加
+        moved_to = (self.now - timedelta(days=5)).isoformat()
+        self.execute("UPDATE fitness_records SET date = ? WHERE user_id = 2 AND duration = 25.0", (moved_to,))
+        df = stats_dal.get_daily_stats(2, (self.now - timedelta(days=5)).date(), self.now.date())
+        self.assertEqual(self.day_row(df, 2)["max_intensity"], 3.0)
+        self.assertAlmostEqual(self.day_row(df, 2)["duration"], 35.0)
+        self.assertAlmostEqual(self.day_row(df, 5)["duration"], 25.0)
+        self.assertEqual(stats_dal.check_daily_stats(2), [])
+
+        # 删除当天最后一条记录后汇总行一并删除
+        self.execute("DELETE FROM fitness_records WHERE user_id = 2 AND duration = 25.0")
+        sparse = stats_dal.get_daily_stats(2, (self.now - timedelta(days=5)).date(), self.now.date(),
+                                           fill_missing=False)
+        self.assertEqual(len(sparse), 1)
+        self.assertEqual(stats_dal.check_daily_stats(), [])
+
+    def test_range_totals(self):
+        """
+        测试区间合计只统计区间内的天
+        """
+        for days_ago in (1, 2, 10):
+            exercise_dal.add_fitness_record(self.make_record(days_ago=days_ago, duration=10.0 * days_ago))
+        recent = stats_dal.get_stats_totals(1, (self.now - timedelta(days=7)).date(), self.now.date())
+        self.assertEqual(recent["sessions"], 2)
+        self.assertAlmostEqual(recent["duration"], 30.0)
+        self.assertEqual(stats_dal.get_stats_totals(1)["sessions"], 3)
+        self.assertEqual(stats_dal.get_stats_totals(99)["duration"], 0)
+
+    def test_check_and_rebuild(self):
+        """
+        测试校验发现缺行/数值不一致/多余行，重建后恢复一致
+        """
+        exercise_dal.add_fitness_record(self.make_record(user_id=1, days_ago=1))
+        exercise_dal.add_fitness_record(self.make_record(user_id=1, days_ago=2))
+        exercise_dal.add_fitness_record(self.make_record(user_id=3, days_ago=1))
+        day1, day2 = to_day_key(self.now - timedelta(days=1)), to_day_key(self.now - timedelta(days=2))
+        self.execute("UPDATE daily_user_stats SET duration = duration + 1 WHERE user_id = 1 AND day_key = ?",
+                     (day1,))
+        self.execute("DELETE FROM daily_user_stats WHERE user_id = 1 AND day_key = ?", (day2,))
+        self.execute("INSERT INTO daily_user_stats (user_id, day_key, sessions) VALUES (3, 1, 1)")
+
+        issues = {(i["user_id"], to_day_key(i["date"]), i["issue"]) for i in stats_dal.check_daily_stats()}
+        self.assertEqual(issues, {(1, day1, "mismatch"), (1, day2, "missing"), (3, 1, "orphan")})
+        self.assertEqual([i["issue"] for i in stats_dal.check_daily_stats(3)], ["orphan"])
+
+        self.assertEqual(stats_dal.rebuild_daily_stats(1), 2)
+        self.assertEqual([i["user_id"] for i in stats_dal.check_daily_stats()], [3])
+        self.assertEqual(stats_dal.rebuild_daily_stats(), 3)
+        self.assertEqual(stats_dal.check_daily_stats(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()